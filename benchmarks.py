@@ -0,0 +1,841 @@
+"""
+Benchmarks for the scraper's hot paths.
+
+Everything runs against synthetic pages on a local headless Chromium, so no
+Instagram account or network access is needed.
+
+Usage:
+    python benchmarks.py extraction
+    python benchmarks.py writer
+    python benchmarks.py sentiment
+    python benchmarks.py http
+    python benchmarks.py sharding
+    python benchmarks.py harvest
+    python benchmarks.py trends
+    python benchmarks.py aggregation
+    python benchmarks.py related
+    python benchmarks.py e2e
+    python benchmarks.py resume
+    python benchmarks.py startup
+"""
+import asyncio
+import glob
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+from playwright.async_api import async_playwright
+
+import instagram_scraper
+import main
+from cooccurrence import CooccurrenceIndex
+from fixture_server import FixtureServer
+from http_fetch import HttpFetcher
+from pacing import PacingScheduler
+from post_archive import PostArchive, aggregate_posts, analysis_rows
+from replay import run_replay
+from sentiment_engine import SentimentEngine
+from sharding import run_sharded
+from supabase_writer import SupabaseWriter
+from trend_store import TrendStore
+
+# -------------------------
+# FIXTURES
+# -------------------------
+
+def synthetic_feed_html(posts: int = 50) -> str:
+    """A page shaped like the bits of Instagram the scraper reads."""
+    links = "\n".join(
+        f'<article><a href="/p/POST{i:04d}/"><img alt="Photo {i} #sunset #travel{i % 7} #food"></a></article>'
+        for i in range(posts)
+    )
+    return f"""
+    <html><body>
+        <h1>profile</h1><div><span>Caption #sunset #beach #summer</span></div>
+        <span dir="auto">short</span>
+        <span dir="auto">Golden hour again #sunset #goldenhour</span>
+        <section><button><span>1,234 likes</span></button></section>
+        <ul>{"".join('<li role="menuitem">nice</li>' for _ in range(12))}</ul>
+        {links}
+    </body></html>
+    """
+
+def infinite_grid_html(total: int, window: int = 60, batch: int = 12) -> str:
+    """A virtualized tag grid: scrolling appends `batch` posts up to `total`,
+    and only the newest `window` links stay in the DOM."""
+    return f"""
+    <html><body style="margin:0">
+    <main id="grid"></main>
+    <script>
+        let next = 0;
+        const grid = document.getElementById('grid');
+        function more() {{
+            for (let i = 0; i < {batch} && next < {total}; i++, next++) {{
+                const a = document.createElement('a');
+                a.href = '/p/DEEP' + String(next).padStart(5, '0') + '/';
+                a.style.display = 'block';
+                a.style.height = '300px';
+                a.innerHTML = '<img alt="Deep post ' + next + ' #sunset #travel' + (next % 9) + '">';
+                grid.appendChild(a);
+            }}
+            while (grid.children.length > {window}) grid.removeChild(grid.firstChild);
+        }}
+        more(); more();
+        window.addEventListener('scroll', () => {{
+            if (window.innerHeight + window.scrollY >= document.body.scrollHeight - 1200) more();
+        }});
+    </script>
+    </body></html>
+    """
+
+# -------------------------
+# EXTRACTION
+# -------------------------
+
+async def legacy_extract(page, calls: list) -> dict:
+    """The previous per-element locator calls, counting driver round-trips."""
+    def hit():
+        calls[0] += 1
+
+    posts = []
+    hit()
+    for el in (await page.locator("a[href*='/p/']").all())[:50]:
+        hit()
+        url = await el.get_attribute('href')
+        hit()
+        alt = await el.locator('img').first.get_attribute('alt') or ""
+        posts.append({'url': url, 'alt': alt})
+
+    caption = ""
+    hit()
+    for span in (await page.locator("span[dir='auto']").all())[:5]:
+        hit()
+        text = await span.inner_text()
+        if '#' in text and len(text) > 10:
+            caption = text
+            break
+
+    likes = 0
+    for selector in main.LIKE_SELECTORS:
+        hit()
+        for el in await page.locator(selector).all():
+            hit()
+            text = (await el.inner_text()).lower()
+            if 'like' in text or text.replace(',', '').isdigit():
+                numbers = re.findall(r'[\d,]+', text.replace(',', ''))
+                if numbers:
+                    likes = int(numbers[0])
+                    break
+        if likes > 0:
+            break
+
+    hit()
+    comments = await page.locator("ul li[role='menuitem']").count()
+    return {'posts': posts, 'caption': caption, 'likes': likes, 'comments': comments}
+
+async def batched_extract(page, calls: list) -> dict:
+    """The single page.evaluate extraction used by main.py."""
+    calls[0] += 1
+    record = await main.extract_page_data(page, link_limit=50)
+    return {
+        'posts': record['posts'],
+        'caption': main.pick_caption(record),
+        'likes': main.parse_like_count(record),
+        'comments': record['comment_count'],
+    }
+
+async def bench_extraction(rounds: int = 20, posts: int = 50):
+    """Compare round-trips and wall time of the legacy and batched extraction."""
+    print(f"\n📏 DOM extraction: {posts} posts, {rounds} rounds\n")
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        page = await browser.new_page()
+        await page.set_content(synthetic_feed_html(posts))
+
+        results = {}
+        for name, extract in [('legacy', legacy_extract), ('batched', batched_extract)]:
+            calls = [0]
+            started = time.perf_counter()
+            for _ in range(rounds):
+                output = await extract(page, calls)
+            elapsed = time.perf_counter() - started
+            results[name] = (calls[0] / rounds, elapsed / rounds, output)
+
+        await browser.close()
+
+    legacy, batched = results['legacy'], results['batched']
+    assert legacy[2] == batched[2], "batched extraction disagrees with legacy output"
+
+    print("    Path     | Round-trips | Wall time")
+    print("    " + "─" * 40)
+    for name, (trips, seconds, _) in results.items():
+        print(f"    {name:8s} | {trips:11.0f} | {seconds * 1000:7.1f} ms")
+    print(f"\n    ✓ {legacy[0] / batched[0]:.0f}x fewer round-trips, {legacy[1] / batched[1]:.1f}x faster\n")
+
+async def legacy_scroll_harvest(page, target: int, max_stalls: int = 4) -> list:
+    """Scroll and re-read every loaded link on each pass, as the feed scan does."""
+    seen = {}
+    stalls = 0
+    while len(seen) < target and stalls < max_stalls:
+        before = len(seen)
+        for post in (await main.extract_page_data(page, link_limit=100_000))['posts']:
+            seen.setdefault(post['url'], post)
+        stalls = 0 if len(seen) > before else stalls + 1
+        await page.evaluate(main.SCROLL_JS)
+        await page.wait_for_timeout(50)
+    return list(seen.values())[:target]
+
+async def bench_harvest(sizes=(100, 300, 1000)):
+    """Deep tag-page harvesting: re-reading the grid vs incremental extraction."""
+    print("\n📏 Deep harvest on a virtualized grid\n")
+    print("    Posts | Path        | Steps | Seconds | Posts/s | JS heap MB | Py peak KB")
+    print("    " + "─" * 74)
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True, args=['--enable-precise-memory-info'])
+        page = await browser.new_page()
+        for size in sizes:
+            for name in ('re-read all', 'incremental'):
+                await page.set_content(infinite_grid_html(size))
+                main.RUN_STATS['dom_extractions'] = 0
+                tracemalloc.start()
+                started = time.perf_counter()
+                if name == 'incremental':
+                    posts, stats = await main.deep_harvest(page, size, time_budget=300)
+                    heap = stats['js_heap_peak']
+                else:
+                    posts = await legacy_scroll_harvest(page, size)
+                    heap = await page.evaluate("() => performance.memory.usedJSHeapSize")
+                elapsed = time.perf_counter() - started
+                _, py_peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                assert len(posts) == size, f"{name} harvested {len(posts)}/{size} posts"
+                assert len({post['url'] for post in posts}) == size
+                steps = main.RUN_STATS['dom_extractions']
+                print(f"    {size:5d} | {name:11s} | {steps:5d} | {elapsed:7.2f} | {size / elapsed:7.1f} | "
+                      f"{heap / 1_000_000:10.1f} | {py_peak / 1000:10.0f}")
+        await browser.close()
+    print()
+
+# -------------------------
+# SUPABASE WRITER
+# -------------------------
+
+def sample_row(i: int) -> dict:
+    return {
+        "platform": "Instagram",
+        "topic_hashtag": f"#bench{i}",
+        "engagement_score": 1000.0 + i,
+        "sentiment_polarity": 0.2,
+        "sentiment_label": "positive",
+        "posts": 5,
+        "views": None,
+        "metadata": {"total_engagement": 5000 + i},
+        "scraped_at": "2024-01-01T00:00:00",
+        "version_id": "bench",
+    }
+
+def bench_writer(rows: int = 100):
+    """Row-at-a-time vs chunked inserts, plus retry, spool replay and rejected rows, on the stand-in server."""
+    print(f"\n📏 Supabase writer: {rows} rows against a local PostgREST stand-in\n")
+    spool_dir = tempfile.mkdtemp(prefix="writer-bench-")
+
+    print("    Chunk size | Requests | Wall time")
+    print("    " + "─" * 40)
+    for chunk_size in (1, 10, 0):
+        server = FixtureServer().start()
+        writer = SupabaseWriter(server.url, "bench-key", chunk_size=chunk_size, verbose=False,
+                                spool_path=os.path.join(spool_dir, f"chunk{chunk_size}.jsonl")).start()
+        started = time.perf_counter()
+        for i in range(rows):
+            writer.add(sample_row(i))
+        writer.close()
+        elapsed = time.perf_counter() - started
+        server.stop()
+        assert len(server.rows['instagram']) == rows
+        print(f"    {chunk_size or 'all':>10} | {server.requests:8d} | {elapsed * 1000:7.1f} ms")
+
+    # Transient 503s are retried
+    server = FixtureServer().start()
+    server.fail_next = 2
+    writer = SupabaseWriter(server.url, "bench-key", chunk_size=0, backoff=0.01, verbose=False,
+                            spool_path=os.path.join(spool_dir, "retry.jsonl")).start()
+    for i in range(rows):
+        writer.add(sample_row(i))
+    writer.close()
+    assert len(server.rows['instagram']) == rows and writer.stats['retries'] == 2
+    print(f"\n    ✓ Retry: 2 injected failures, {writer.stats['retries']} retries, all {rows} rows written")
+
+    # With the server gone the rows are spooled, then replayed by the next writer
+    spool_path = os.path.join(spool_dir, "spool.jsonl")
+    dead_url = server.url
+    server.stop()
+    writer = SupabaseWriter(dead_url, "bench-key", chunk_size=0, max_retries=1, backoff=0.01,
+                            spool_path=spool_path, timeout=2, verbose=False).start()
+    for i in range(rows):
+        writer.add(sample_row(i))
+    writer.close()
+    assert writer.stats['spooled'] == rows
+
+    server = FixtureServer().start()
+    writer = SupabaseWriter(server.url, "bench-key", spool_path=spool_path, verbose=False).start()
+    writer.close()
+    server.stop()
+    assert len(server.rows['instagram']) == rows and not os.path.exists(spool_path)
+    print(f"    ✓ Spool: {rows} rows spooled while offline, replayed on the next start")
+
+    # A 422 is not retried or spooled; the rows go to the dead-letter file and stay there
+    server = FixtureServer().start()
+    server.fail_next, server.fail_status = 1, 422
+    spool_path = os.path.join(spool_dir, "rejected.jsonl")
+    writer = SupabaseWriter(server.url, "bench-key", chunk_size=0, backoff=0.01, verbose=False,
+                            spool_path=spool_path).start()
+    for i in range(rows):
+        writer.add(sample_row(i))
+    writer.close()
+    assert writer.stats['retries'] == 0 and writer.stats['spooled'] == 0 and writer.stats['rejected'] == rows
+    assert not os.path.exists(spool_path) and sum(1 for _ in open(writer.rejected_path, encoding='utf-8')) == rows
+    writer = SupabaseWriter(server.url, "bench-key", spool_path=spool_path, verbose=False).start()
+    writer.close()
+    server.stop()
+    assert writer.stats['replayed'] == 0 and writer.stats['requests'] == 0
+    print(f"    ✓ Rejected: {rows} rows refused with 422 dead-lettered once, not retried, spooled or replayed\n")
+
+# -------------------------
+# SENTIMENT
+# -------------------------
+
+CAPTION_WORDS = [
+    "amazing", "beautiful", "sunset", "terrible", "happy", "sad", "day", "beach", "coffee",
+    "great", "worst", "love", "boring", "friends", "delicious", "awful", "new", "old", "best",
+]
+
+def synthetic_captions(count: int, unique_share: float = 0.4, seed: int = 42) -> list:
+    """Captions with a realistic share of repeats (reposts, template alt texts)."""
+    rng = random.Random(seed)
+    pool = [
+        " ".join(rng.choice(CAPTION_WORDS) for _ in range(rng.randint(4, 14))) + f" #tag{rng.randint(0, 50)}"
+        for _ in range(max(1, int(count * unique_share)))
+    ]
+    return [rng.choice(pool) for _ in range(count)]
+
+def bench_sentiment(sizes=(10_000, 100_000)):
+    """Per-text TextBlob against the memoized engine, in-process and on a process pool."""
+    from textblob import TextBlob
+
+    print("\n📏 Sentiment scoring throughput\n")
+    print("    Captions | Path                 | Seconds | Captions/s")
+    print("    " + "─" * 58)
+    for size in sizes:
+        captions = synthetic_captions(size)
+
+        started = time.perf_counter()
+        expected = [tuple(TextBlob(text).sentiment) for text in captions]
+        baseline = time.perf_counter() - started
+        print(f"    {size:8,d} | {'TextBlob per text':20s} | {baseline:7.2f} | {size / baseline:10,.0f}")
+
+        engine = SentimentEngine(cache_size=size)
+        started = time.perf_counter()
+        scores = engine.score_many(captions)
+        elapsed = time.perf_counter() - started
+        assert scores == expected, "engine scores differ from TextBlob"
+        print(f"    {size:8,d} | {'engine, in-process':20s} | {elapsed:7.2f} | {size / elapsed:10,.0f}")
+
+        engine = SentimentEngine(cache_size=size, workers=os.cpu_count() or 2)
+        started = time.perf_counter()
+        scores = asyncio.run(engine.score_many_async(captions))
+        elapsed = time.perf_counter() - started
+        engine.close()
+        assert scores == expected, "pooled engine scores differ from TextBlob"
+        print(f"    {size:8,d} | {f'engine, {engine.workers} processes':20s} | {elapsed:7.2f} | {size / elapsed:10,.0f}")
+    print()
+
+# -------------------------
+# FETCH BACKENDS
+# -------------------------
+
+async def bench_http(posts: int = 60, concurrency: int = 4):
+    """Browser navigations vs pooled HTTP fetches of fixture post pages."""
+    print(f"\n📏 Post fetch backends: {posts} fixture posts on a local stand-in server\n")
+    server = FixtureServer().start()
+    rng = random.Random(7)
+    expected = {}
+    for i in range(posts):
+        # Most pages embed the JSON, some only have meta tags, a few need the browser
+        embed = 'none' if i % 10 == 9 else 'meta' if i % 10 == 8 else 'json'
+        likes, comments = rng.randint(100, 50_000), rng.randint(0, 900)
+        url = server.add_post(f"FX{i:04d}", likes, comments, f"Fixture caption {i} #sunset", embed)
+        expected[url] = (likes, comments)
+    urls = list(expected)
+
+    # Fixture pages need no politeness delay
+    main.PACER = PacingScheduler(min_interval=0, requests_per_minute=0, jitter=0)
+    main.JSON_RESPONSE_TIMEOUT = 3
+
+    async def run(pages, backend):
+        queue = asyncio.Queue()
+        for url in urls:
+            queue.put_nowait(url)
+        results = {}
+
+        async def worker(page):
+            while not queue.empty():
+                url = queue.get_nowait()
+                post = await main.fetch_post(page, url, backend=backend)
+                results[url] = (post['likes'], post['comments'], post['source'])
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(page) for page in pages))
+        return results, time.perf_counter() - started
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        context = await browser.new_context()
+        pages = [await context.new_page() for _ in range(concurrency)]
+
+        print("    Backend | Pages | Browser navs | Wall time | Posts/s")
+        print("    " + "─" * 56)
+        for backend in ('browser', 'http'):
+            for width in (1, concurrency):
+                main.HTTP = HttpFetcher(server.url, pool_size=width)
+                results, elapsed = await run(pages[:width], backend)
+                main.HTTP.close()
+                browser_navs = sum(1 for *_, source in results.values() if source not in ('http', 'cache'))
+                assert {url: r[:2] for url, r in results.items()} == expected, f"{backend} fetch returned wrong counts"
+                print(f"    {backend:7s} | {width:5d} | {browser_navs:12d} | {elapsed:7.2f} s | {posts / elapsed:7.1f}")
+
+        await browser.close()
+    server.stop()
+    print(f"\n    ✓ Both backends agree on all {posts} posts; "
+          f"{posts // 10} page(s) without server-rendered data fell back to the browser\n")
+
+# -------------------------
+# SHARDING
+# -------------------------
+
+async def bench_sharding(hashtags: int = 16, posts_per_tag: int = 5, worker_counts=(1, 2, 4, 8), delay: float = 0.05):
+    """Wall time of a sharded run over fixture hashtag pages for 1/2/4/8 worker processes."""
+    print(f"\n📏 Sharded analysis: {hashtags} hashtags x {posts_per_tag} posts, {delay * 1000:.0f} ms per page\n")
+    server = FixtureServer().start()
+    server.delay = delay
+    tags = [f"fixture{t:02d}" for t in range(hashtags)]
+    for t, tag in enumerate(tags):
+        codes = [f"SH{t:02d}{i:02d}" for i in range(posts_per_tag)]
+        for code in codes:
+            server.add_post(code, 1000 + t, 10 + t, f"Fixture #{tag}", embed='none')
+        server.add_tag(tag, codes)
+
+    # Worker processes import main fresh and read their settings from here
+    state_dir = tempfile.mkdtemp(prefix="shard-bench-")
+    os.environ.update({
+        'INSTAGRAM_BASE_URL': server.url,
+        'SCRAPER_STATE_DIR': state_dir,
+        'PACING_MIN_INTERVAL': '0',
+        'PACING_REQUESTS_PER_MINUTE': '0',
+        'ANALYSIS_FETCH_BACKEND': 'browser',
+        'ANALYSIS_CONCURRENCY': '1',
+        'ANALYSIS_REQUEST_BUDGET': '0',
+        'POST_CACHE_TTL_HOURS': '0',
+        'PIPELINE_MONITOR_INTERVAL': '0',
+    })
+
+    timings = {}
+    for workers in worker_counts:
+        server.rows.clear()
+        # chunk_size=0: every worker's rows should reach the parent's writer and go out in one insert
+        writer = SupabaseWriter(server.url, "bench-key", chunk_size=0, verbose=False,
+                                spool_path=os.path.join(state_dir, f"spool{workers}.jsonl")).start()
+        started = time.perf_counter()
+        await run_sharded(tags, writer, workers, f"bench-{workers}", 0, 0, 0)
+        writer.close()
+        timings[workers] = time.perf_counter() - started
+        rows = server.rows['instagram']
+        assert len(rows) == hashtags, f"{workers} worker(s) saved {len(rows)}/{hashtags} rows"
+        assert {row['version_id'] for row in rows} == {f"bench-{workers}"}
+        assert writer.stats['requests'] == 1, "rows were not merged into one batch"
+    server.stop()
+
+    base = timings[worker_counts[0]]
+    print("\n    Workers | Wall time | Hashtags/s | Speedup")
+    print("    " + "─" * 44)
+    for workers, elapsed in timings.items():
+        print(f"    {workers:7d} | {elapsed:7.2f} s | {hashtags / elapsed:10.2f} | {base / elapsed:6.2f}x")
+    print(f"\n    ✓ Every run saved all {hashtags} rows through one writer (one insert with chunk_size=0) under one VERSION_ID ({os.cpu_count()} CPUs)\n")
+
+# -------------------------
+# TREND STORE
+# -------------------------
+
+def sample_run(rng: random.Random, popularity: list, observations: int) -> dict:
+    """One run's hashtag counts: `observations` draws weighted by popularity."""
+    counts = {}
+    for tag in rng.choices([tag for tag, _ in popularity], [weight for _, weight in popularity], k=observations):
+        counts[tag] = counts.get(tag, 0) + 1
+    return counts
+
+def bench_trends(sizes=(100_000, 250_000), runs: int = 12, observations: int = 150, top: int = 15):
+    """Store load/merge/rank/save at scale, and ranking stability from small samples."""
+    print("\n📏 Trend store at scale\n")
+    print("    Tags    | Load ms | Merge ms | Rank ms | Save ms | File MB")
+    print("    " + "─" * 58)
+    rng = random.Random(11)
+    now = time.time()
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'trends.json')
+            store = TrendStore(path, max_tags=size)
+            store.merge({f"tag{i}": rng.randint(1, 40) for i in range(size)}, now=now - 8 * 3600)
+            store.save(now=now - 8 * 3600)
+
+            store = TrendStore(path, max_tags=size)
+            started = time.perf_counter()
+            store.tags
+            load = time.perf_counter() - started
+            started = time.perf_counter()
+            store.merge({f"tag{rng.randrange(size * 2)}": rng.randint(1, 10) for _ in range(5000)}, now=now)
+            merge = time.perf_counter() - started
+            started = time.perf_counter()
+            store.rank(top, now=now)
+            rank = time.perf_counter() - started
+            started = time.perf_counter()
+            store.save(now=now)
+            save = time.perf_counter() - started
+            assert len(store.tags) <= size, "store grew past max_tags"
+            print(f"    {size:7,d} | {load * 1000:7.0f} | {merge * 1000:8.1f} | {rank * 1000:7.0f} | "
+                  f"{save * 1000:7.0f} | {os.path.getsize(path) / 1_000_000:7.2f}")
+
+    # A long-tailed popularity where the leaders change slowly
+    popularity = [(f"tag{i}", 1 / (i + 1) ** 0.8) for i in range(2000)]
+    churn = {'raw counts': [], 'trend store': []}
+    previous = {'raw counts': None, 'trend store': None}
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TrendStore(os.path.join(tmp, 'trends.json'), half_life_hours=24)
+        for run in range(runs):
+            counts = sample_run(rng, popularity, observations)
+            store.merge(counts, run_id=str(run), now=now + run * 8 * 3600)
+            rankings = {
+                'raw counts': [tag for tag, _ in sorted(counts.items(), key=lambda c: -c[1])[:top]],
+                'trend store': store.rank(top, now=now + run * 8 * 3600),
+            }
+            for name, ranking in rankings.items():
+                if previous[name] is not None:
+                    churn[name].append(len(set(ranking) - set(previous[name])))
+                previous[name] = ranking
+
+    print(f"\n    Top-{top} churn over {runs} runs of {observations} observations each (8h apart)\n")
+    print("    Ranking     | Avg new tags per run | Max")
+    print("    " + "─" * 42)
+    for name, changes in churn.items():
+        print(f"    {name:11s} | {sum(changes) / len(changes):20.1f} | {max(changes):3d}")
+    print()
+
+# -------------------------
+# AGGREGATION
+# -------------------------
+
+def synthetic_posts(posts: int, per_hashtag: int = 100, seed: int = 3):
+    """A run's scored posts as a columnar frame, `per_hashtag` posts per hashtag."""
+    rng = np.random.default_rng(seed)
+    likes = rng.integers(0, 50_000, posts)
+    comments = rng.integers(0, 2_000, posts)
+    return pd.DataFrame({
+        'hashtag': np.repeat([f"tag{i}" for i in range(-(-posts // per_hashtag))], per_hashtag)[:posts],
+        'idx': np.tile(np.arange(per_hashtag, dtype='int32'), -(-posts // per_hashtag))[:posts],
+        'url': [f"/p/post{i}/" for i in range(posts)],
+        'alt': "Photo by someone #tag",
+        'caption': "",
+        'likes': likes,
+        'comments': comments,
+        'engagement': likes + comments,
+        'sentiment_polarity': rng.uniform(-1, 1, posts).round(3),
+        'sentiment_subjectivity': rng.uniform(0, 1, posts).round(3),
+        'engagement_source': 'json',
+    })
+
+def legacy_aggregate(posts_data: list) -> dict:
+    """The figures the per-hashtag loop computed, one Python pass per figure."""
+    total_eng = sum(p['engagement'] for p in posts_data)
+    avg_pol = sum(p['sentiment_polarity'] for p in posts_data) / len(posts_data)
+    sentiment_counts = Counter(
+        "positive" if p['sentiment_polarity'] > 0.1
+        else "negative" if p['sentiment_polarity'] < -0.05
+        else "neutral"
+        for p in posts_data
+    )
+    top_post = max(posts_data, key=lambda p: p['engagement'])
+    return {
+        'engagement_score': total_eng / len(posts_data),
+        'sentiment_polarity': avg_pol,
+        'positive_posts': sentiment_counts['positive'],
+        'top_post_url': top_post['url'],
+        'total_likes': sum(p['likes'] for p in posts_data),
+        'total_comments': sum(p['comments'] for p in posts_data),
+        'avg_likes': sum(p['likes'] for p in posts_data) / len(posts_data),
+        'avg_comments': sum(p['comments'] for p in posts_data) / len(posts_data),
+    }
+
+def bench_aggregation(posts: int = 1_000_000, per_hashtag: int = 100):
+    """Per-hashtag Python passes against one groupby, plus the Parquet archive round trip."""
+    print(f"\n📏 Aggregating {posts:,} posts ({per_hashtag} per hashtag)\n")
+    frame = synthetic_posts(posts, per_hashtag)
+
+    records = frame.to_dict('records')
+    started = time.perf_counter()
+    by_hashtag = {}
+    for record in records:
+        by_hashtag.setdefault(record['hashtag'], []).append(record)
+    expected = {hashtag: legacy_aggregate(posts_data) for hashtag, posts_data in by_hashtag.items()}
+    legacy = time.perf_counter() - started
+
+    started = time.perf_counter()
+    rows = analysis_rows(aggregate_posts(frame), 'bench')
+    vectorized = time.perf_counter() - started
+
+    assert len(rows) == len(expected), "hashtag count differs"
+    for row in rows:
+        old = expected[row['topic_hashtag'][1:]]
+        assert row['metadata']['top_post_url'].endswith(old['top_post_url']), "top post differs"
+        assert row['metadata']['positive_posts'] == old['positive_posts'], "sentiment counts differ"
+        assert row['metadata']['total_likes'] == old['total_likes'], "likes differ"
+        assert abs(row['sentiment_polarity'] - old['sentiment_polarity']) < 1e-9, "polarity differs"
+
+    print("    Path                         | Seconds | Posts/s")
+    print("    " + "─" * 52)
+    print(f"    {'per-hashtag Python passes':28s} | {legacy:7.2f} | {posts / legacy:11,.0f}")
+    print(f"    {'one groupby pass':28s} | {vectorized:7.2f} | {posts / vectorized:11,.0f}")
+    print(f"\n    ✓ {len(rows):,} rows match ({legacy / vectorized:.1f}x faster)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = PostArchive(tmp)
+        started = time.perf_counter()
+        path = archive.write(frame, 'bench')
+        written = time.perf_counter() - started
+        started = time.perf_counter()
+        restored = archive.read('bench')
+        read = time.perf_counter() - started
+        assert len(restored) == posts, "archive lost posts"
+        print(f"    ✓ Parquet archive: written in {written:.2f}s, read back in {read:.2f}s, "
+              f"{os.path.getsize(path) / 1_000_000:.1f} MB\n")
+
+# -------------------------
+# CO-OCCURRENCE INDEX
+# -------------------------
+
+def synthetic_tag_lists(texts: int, tags: int = 50_000, seed: int = 5) -> list:
+    """Hashtag lists of captions: a few topical tags plus some popular ones."""
+    rng = random.Random(seed)
+    popular = [f"tag{i}" for i in range(200)]
+    lists = []
+    for _ in range(texts):
+        # Captions stick to a neighbourhood of related tags
+        topic = rng.randrange(tags)
+        topical = [f"tag{(topic + rng.randrange(25)) % tags}" for _ in range(rng.randint(2, 8))]
+        lists.append(topical + rng.sample(popular, rng.randint(0, 4)))
+    return lists
+
+def bench_related(texts: int = 200_000, queries: int = 100_000, k: int = 10):
+    """Index build throughput, save/load of the compact file and top-k query latency."""
+    print(f"\n📏 Co-occurrence index over {texts:,} captions\n")
+    tag_lists = synthetic_tag_lists(texts)
+    rng = random.Random(9)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'cooccurrence.json')
+        index = CooccurrenceIndex(path)
+        started = time.perf_counter()
+        for tags in tag_lists:
+            index.add(tags)
+        build = time.perf_counter() - started
+        started = time.perf_counter()
+        index.save()
+        save = time.perf_counter() - started
+
+        index = CooccurrenceIndex(path)
+        started = time.perf_counter()
+        len(index)
+        load = time.perf_counter() - started
+        print(f"    Built in {build:.2f}s ({texts / build:,.0f} captions/s), {len(index):,} hashtags")
+        print(f"    Saved in {save:.2f}s, {os.path.getsize(path) / 1_000_000:.1f} MB, loaded in {load:.2f}s")
+
+        tags = list(index.counts)
+        sample = [rng.choice(tags) for _ in range(queries)]
+        started = time.perf_counter()
+        for tag in sample:
+            index.related(tag, k)
+        first = (time.perf_counter() - started) / queries
+        # Every tag queried above is cached now
+        started = time.perf_counter()
+        for tag in sample:
+            index.related(tag, k)
+        cached = (time.perf_counter() - started) / queries
+
+        # New captions must refresh the cached rankings they touch; an index loaded
+        # from the same file and never queried gives the expected answers
+        reference = CooccurrenceIndex(path)
+        updates = synthetic_tag_lists(200, seed=11)
+        for tags in updates:
+            index.add(tags)
+            reference.add(tags)
+        touched = {tag for tags in updates for tag in tags}
+        touched |= {other for tag in touched for other, _ in reference.related(tag, len(reference.counts))}
+        assert all(index.related(tag, k) == reference.related(tag, k) for tag in touched), \
+            "cached related tags are stale after an update"
+
+    print(f"    Top-{k} related: {first * 1e6:.1f} µs on first query, {cached * 1e6:.2f} µs cached")
+    print(f"    ✓ {len(touched):,} cached ranking(s) touched by 200 new captions match a fresh index\n")
+    print(f"    e.g. #tag1000 → {', '.join('#' + tag for tag, _ in index.related('tag1000', 5))}\n")
+
+# -------------------------
+# END TO END
+# -------------------------
+
+# Settings compared by the end-to-end benchmark, on top of the replay defaults
+E2E_VARIANTS = {
+    'default': {},
+    'browser only': {'ANALYSIS_FETCH_BACKEND': 'browser', 'DISCOVERY_FETCH_BACKEND': 'browser'},
+}
+
+# Profile spans shown per stage, in run order
+E2E_STAGES = ('login', 'discovery', 'discovery.related', 'pipeline', 'post.fetch', 'analysis.harvest', 'archive')
+
+def bench_e2e(runs: int = 3, delay: float = 0.02, variants: dict = None):
+    """Whole runs of main.py against the replayed site: median wall time, navigations and stage latency."""
+    variants = variants or E2E_VARIANTS
+    print(f"\n📏 End to end: {runs} replay(s) per variant, {delay * 1000:.0f} ms per page\n")
+    results = {}
+    for name, overrides in variants.items():
+        results[name] = []
+        for run in range(runs):
+            result = run_replay(env=overrides, delay=delay)
+            assert result['exit_code'] == 0, f"{name}: run {run + 1} exited with {result['exit_code']}, see {result['log']}"
+            assert result['rows'] > 0, f"{name}: run {run + 1} saved no rows, see {result['log']}"
+            results[name].append(result)
+            print(f"    {name}: run {run + 1}/{runs} in {result['seconds']:.1f}s")
+
+    def median(values):
+        values = sorted(values)
+        return values[len(values) // 2]
+
+    print(f"\n    {'Variant':14s} | {'Wall s':>6s} | {'Startup s':>9s} | {'Navs':>5s} | {'Requests':>8s} | {'Rows':>4s}")
+    print("    " + "─" * 62)
+    for name, runs_ in results.items():
+        print(f"    {name:14s} | {median([r['seconds'] for r in runs_]):6.1f} | "
+              f"{median([r['startup_seconds'] for r in runs_]):9.1f} | {median([r['navigations'] for r in runs_]):5d} | "
+              f"{median([r['page_requests'] for r in runs_]):8d} | {median([r['rows'] for r in runs_]):4d}")
+
+    print(f"\n    Median seconds per stage\n    {'Stage':18s} | " + " | ".join(f"{name:>12s}" for name in results))
+    print("    " + "─" * (21 + 15 * len(results)))
+    for stage in E2E_STAGES:
+        cells = []
+        for runs_ in results.values():
+            seconds = [r['spans'][stage]['seconds'] for r in runs_ if stage in r['spans']]
+            cells.append(f"{median(seconds):12.2f}" if seconds else f"{'-':>12s}")
+        print(f"    {stage:18s} | " + " | ".join(cells))
+    print()
+
+def killable_after_progress(state_dir: str) -> bool:
+    """True once the run's checkpoint has a finished hashtag and fetched posts of another."""
+    for path in glob.glob(os.path.join(state_dir, 'checkpoints', '*.json')):
+        try:
+            with open(path, encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if (state['rows'] or state['saved']) and any(state['records'].values()):
+            return True
+    return False
+
+def bench_resume(delay: float = 0.05):
+    """Kill a replayed run partway, resume it, and compare post fetches and rows with an uninterrupted run."""
+    print(f"\n📏 Kill and resume: {delay * 1000:.0f} ms per page\n")
+    # No post cache, so only the checkpoint can spare the resumed run its fetches
+    settings = {'RESUME_RUN': 'auto', 'POST_CACHE_TTL_HOURS': '0', 'SUPABASE_CHUNK_SIZE': '1'}
+    clean = run_replay(env=settings, delay=delay)
+    assert clean['exit_code'] == 0 and clean['rows'], f"uninterrupted run failed, see {clean['log']}"
+
+    killed = run_replay(env=settings, delay=delay, kill_when=killable_after_progress)
+    assert killed['killed'], f"run finished before it could be killed, see {killed['log']}"
+    resumed = run_replay(env=settings, delay=delay, state_dir=killed['state_dir'])
+    assert resumed['exit_code'] == 0, f"resumed run failed, see {resumed['log']}"
+    assert not glob.glob(os.path.join(killed['state_dir'], 'checkpoints', '*.json')), "checkpoint left behind"
+
+    print(f"    {'Run':14s} | {'Post loads':>10s} | {'Rows':>4s} | {'Seconds':>7s}")
+    print("    " + "─" * 46)
+    for name, result in (('uninterrupted', clean), ('killed', killed), ('resumed', resumed)):
+        print(f"    {name:14s} | {result['post_requests']:10d} | {result['rows']:4d} | {result['seconds']:7.1f}")
+    # Rows the killed run already saved are not sent again, and nothing is lost
+    print(f"\n    ✓ Killed + resumed: {killed['rows'] + resumed['rows']} row(s) "
+          f"(uninterrupted: {clean['rows']}); the resumed run loaded {resumed['post_requests']} post page(s)\n")
+
+# -------------------------
+# STARTUP
+# -------------------------
+
+# Imports a fresh interpreter makes for one CLI command, reported as JSON
+STARTUP_PROBE = """
+import json
+import instagram_scraper as cli
+_, seconds = cli.import_modules({modules!r})
+print(json.dumps({{'import_seconds': seconds, 'heavy': cli.loaded_heavy_modules()}}))
+"""
+
+def bench_startup(runs: int = 5):
+    """Import time per CLI command in fresh interpreters, against importing everything up front."""
+    print(f"\n📏 Startup: median of {runs} fresh interpreter(s) per command\n")
+    commands = dict(instagram_scraper.COMMAND_MODULES)
+    # What every command paid before main.py loaded the archive (pandas) lazily
+    commands['everything up front'] = ('main', 'post_archive')
+    print(f"    {'Command':20s} | {'Imports s':>9s} | {'Process s':>9s} | Heavy packages loaded")
+    print("    " + "─" * 80)
+    for command, modules in commands.items():
+        imports, processes = [], []
+        for _ in range(runs):
+            started = time.perf_counter()
+            output = subprocess.run([sys.executable, '-c', STARTUP_PROBE.format(modules=modules)],
+                                    cwd=os.path.dirname(os.path.abspath(__file__)),
+                                    capture_output=True, text=True, check=True).stdout
+            processes.append(time.perf_counter() - started)
+            result = json.loads(output.strip().splitlines()[-1])
+            imports.append(result['import_seconds'])
+        imports.sort()
+        processes.sort()
+        print(f"    {command:20s} | {imports[runs // 2]:9.2f} | {processes[runs // 2]:9.2f} | "
+              f"{', '.join(result['heavy']) or '-'}")
+    print()
+
+BENCHMARKS = {
+    'extraction': bench_extraction,
+    'writer': bench_writer,
+    'sentiment': bench_sentiment,
+    'http': bench_http,
+    'sharding': bench_sharding,
+    'harvest': bench_harvest,
+    'trends': bench_trends,
+    'aggregation': bench_aggregation,
+    'related': bench_related,
+    'e2e': bench_e2e,
+    'resume': bench_resume,
+    'startup': bench_startup,
+}
+
+def run_benchmarks(names: list = None):
+    """Run the named benchmarks, or all of them."""
+    for name in names or list(BENCHMARKS):
+        if name not in BENCHMARKS:
+            print(f"❌ Unknown benchmark '{name}' (available: {', '.join(BENCHMARKS)})")
+            continue
+        result = BENCHMARKS[name]()
+        if asyncio.iscoroutine(result):
+            asyncio.run(result)
+
+if __name__ == "__main__":
+    run_benchmarks(sys.argv[1:])
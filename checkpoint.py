@@ -0,0 +1,173 @@
+"""
+Checkpoints for resuming an interrupted run.
+
+A run records its progress in <directory>/<VERSION_ID>.json: the hashtags
+queued so far and whether discovery finished, each hashtag's harvested post
+links, the per-post records fetched so far (recorded as soon as a post is
+fetched; sentiment is scored again on resume), rows built but not yet
+saved, and the hashtags whose rows Supabase (or the writer's spool or
+rejected file) has taken. A later run resumes the newest unfinished
+checkpoint under the same VERSION_ID and only does the work that is
+missing.
+
+Every change is written to a temporary file, fsynced and moved over the
+checkpoint with os.replace, so a killed process leaves either the previous
+checkpoint or the new one, never a torn file.
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+class RunCheckpoint:
+    """Progress of one run, saved atomically after every change."""
+
+    def __init__(self, directory: str, version_id: str, state: dict = None):
+        self.directory = directory
+        self.version_id = version_id
+        self.state = state or {
+            'version_id': version_id,
+            'started_at': datetime.utcnow().isoformat(),
+            'status': 'running',
+            'hashtags': [],
+            'discovery_complete': False,
+            'harvested': {},
+            'records': {},
+            'rows': {},
+            'saved': [],
+        }
+        # The writer thread reports saved rows while the event loop records posts
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, f"{self.version_id}.json")
+
+    @classmethod
+    def load(cls, directory: str, version_id: str):
+        """The checkpoint saved for `version_id`, or None if there is no readable one."""
+        try:
+            with open(os.path.join(directory, f"{version_id}.json"), encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return cls(directory, state['version_id'], state)
+
+    @classmethod
+    def latest(cls, directory: str, max_age_hours: float = 24):
+        """The newest unfinished checkpoint younger than `max_age_hours`, or None."""
+        try:
+            names = [name for name in os.listdir(directory) if name.endswith('.json')]
+        except OSError:
+            return None
+        paths = sorted((os.path.join(directory, name) for name in names), key=os.path.getmtime, reverse=True)
+        for path in paths:
+            if time.time() - os.path.getmtime(path) > max_age_hours * 3600:
+                break
+            checkpoint = cls.load(directory, os.path.basename(path)[:-len('.json')])
+            if checkpoint and checkpoint.state['status'] == 'running':
+                return checkpoint
+        return None
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.state['updated_at'] = datetime.utcnow().isoformat()
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, default=str)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        """Delete the checkpoint once the run has fully finished."""
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    # -------------------------
+    # PROGRESS
+    # -------------------------
+
+    def add_hashtag(self, hashtag: str):
+        with self._lock:
+            if hashtag not in self.state['hashtags']:
+                self.state['hashtags'].append(hashtag)
+                self.save()
+
+    def finish_discovery(self):
+        with self._lock:
+            self.state['discovery_complete'] = True
+            self.save()
+
+    def set_harvested(self, hashtag: str, posts: list):
+        with self._lock:
+            self.state['harvested'][hashtag] = posts
+            self.save()
+
+    def add_record(self, hashtag: str, idx: int, record: dict):
+        with self._lock:
+            self.state['records'].setdefault(hashtag, {})[str(idx)] = record
+            self.save()
+
+    def add_row(self, hashtag: str, row: dict):
+        """The hashtag's row was handed to the writer; its post data is no longer needed."""
+        with self._lock:
+            self.state['rows'][hashtag] = row
+            self.state['harvested'].pop(hashtag, None)
+            self.state['records'].pop(hashtag, None)
+            self.save()
+
+    def mark_saved(self, rows: list):
+        """Writer callback: these rows are in Supabase, the spool or the rejected file."""
+        with self._lock:
+            changed = False
+            for row in rows:
+                hashtag = (row.get('topic_hashtag') or '').lstrip('#')
+                if row.get('version_id') == self.version_id and hashtag in self.state['rows']:
+                    del self.state['rows'][hashtag]
+                    self.state['saved'].append(hashtag)
+                    changed = True
+            if changed:
+                self.save()
+
+    def finish(self):
+        with self._lock:
+            self.state['status'] = 'complete'
+            self.save()
+
+    # -------------------------
+    # RESUMING
+    # -------------------------
+
+    @property
+    def discovery_complete(self) -> bool:
+        return self.state['discovery_complete']
+
+    @property
+    def complete(self) -> bool:
+        return self.state['status'] == 'complete'
+
+    def harvested(self, hashtag: str):
+        return self.state['harvested'].get(hashtag)
+
+    def records(self, hashtag: str) -> dict:
+        """{post index: fetched record} collected so far for a hashtag (sentiment may be missing)."""
+        return {int(idx): record for idx, record in self.state['records'].get(hashtag, {}).items()}
+
+    def pending_rows(self) -> list:
+        """Rows built before the interruption that were never confirmed saved."""
+        with self._lock:
+            return list(self.state['rows'].values())
+
+    def done(self, hashtag: str) -> bool:
+        return hashtag in self.state['saved'] or hashtag in self.state['rows']
+
+    def remaining_hashtags(self) -> list:
+        return [tag for tag in self.state['hashtags'] if not self.done(tag)]
+
+    def summary(self) -> str:
+        return (f"{len(self.state['saved'])} saved, {len(self.state['rows'])} awaiting save, "
+                f"{len(self.remaining_hashtags())} to go, "
+                f"{sum(len(r) for r in self.state['records'].values())} post(s) already scraped")
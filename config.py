@@ -0,0 +1,103 @@
+"""
+Settings for every entry point, read from the environment.
+
+Kept apart from main.py so commands that do not scrape (replaying the
+spool or the archive) can read them without importing the browser stack.
+Values are read once, at import: instagram_scraper.py sets command-line
+overrides in the environment before importing anything, and sharded
+workers inherit them the same way.
+"""
+import os
+
+# -------------------------
+# CONFIG
+# -------------------------
+USERNAME = os.getenv('INSTAGRAM_USERNAME', '')
+PASSWORD = os.getenv('INSTAGRAM_PASSWORD', '')
+
+# Where pages are loaded from (pointed at the fixture server by benchmarks)
+INSTAGRAM_BASE_URL = os.getenv('INSTAGRAM_BASE_URL', 'https://www.instagram.com').rstrip('/')
+
+# Posts read per hashtag and hashtags taken from discovery
+POSTS_TO_ANALYZE_PER_HASHTAG = int(os.getenv('POSTS_TO_ANALYZE_PER_HASHTAG', '5'))
+TOP_HASHTAGS_TO_DISCOVER = int(os.getenv('TOP_HASHTAGS_TO_DISCOVER', '15'))
+MIN_HASHTAG_FREQUENCY = 1  # Appear at least once (will prioritize higher frequency)
+# Scroll tag pages for this many posts instead of the first grid items (0 = off),
+# giving up after DEEP_HARVEST_SECONDS
+DEEP_HARVEST_POSTS = int(os.getenv('DEEP_HARVEST_POSTS', '0'))
+DEEP_HARVEST_SECONDS = float(os.getenv('DEEP_HARVEST_SECONDS', '60'))
+
+# Number of pages analysing hashtags at the same time (1 = serial run). The
+# PACING_* settings below cap throughput, not this: extra pages only overlap
+# page loads with the gaps between navigations
+ANALYSIS_CONCURRENCY = int(os.getenv('ANALYSIS_CONCURRENCY', '3'))
+# Navigations allowed across all analysis pages per run (0 = unlimited)
+ANALYSIS_REQUEST_BUDGET = int(os.getenv('ANALYSIS_REQUEST_BUDGET', '150'))
+# Which requests to abort on every navigation: full, lean or text (see fetch_profile.py)
+FETCH_PROFILE = os.getenv('FETCH_PROFILE', 'lean')
+# Seconds to wait for a post's JSON response before scraping the DOM instead
+JSON_RESPONSE_TIMEOUT = float(os.getenv('JSON_RESPONSE_TIMEOUT', '6'))
+# A page is replaced after this many navigations, and the whole context once
+# Chromium uses more than RECYCLE_MEMORY_MB (0 = never)
+RECYCLE_AFTER_NAVIGATIONS = int(os.getenv('RECYCLE_AFTER_NAVIGATIONS', '25'))
+RECYCLE_MEMORY_MB = float(os.getenv('RECYCLE_MEMORY_MB', '1500'))
+# Print a browser memory sample every this many navigations (0 = summary only)
+MEMORY_REPORT_EVERY = int(os.getenv('MEMORY_REPORT_EVERY', '10'))
+# Worker processes (each with its own browser) sharing the hashtag list (0/1 = one process)
+SHARD_WORKERS = int(os.getenv('SHARD_WORKERS', '0'))
+# Hashtag counts carry over between runs, halving every TREND_HALF_LIFE_HOURS;
+# ranking adds TREND_GROWTH_WEIGHT times the recent growth (0 = decayed count only)
+TREND_HALF_LIFE_HOURS = float(os.getenv('TREND_HALF_LIFE_HOURS', '24'))
+TREND_GROWTH_WEIGHT = float(os.getenv('TREND_GROWTH_WEIGHT', '0.1'))
+# Hashtags kept in the trend store; the coldest are evicted beyond this
+TREND_MAX_TAGS = int(os.getenv('TREND_MAX_TAGS', '200000'))
+# Hashtags seen together are indexed across runs; discovery adds this many related
+# tags per leading hashtag instead of visiting topic pages (0 = visit them)
+RELATED_TAGS_PER_HASHTAG = int(os.getenv('RELATED_TAGS_PER_HASHTAG', '5'))
+COOCCURRENCE_MAX_TAGS = int(os.getenv('COOCCURRENCE_MAX_TAGS', '100000'))
+# How each stage fetches posts: 'http' (pooled requests, browser fallback) or 'browser'
+DISCOVERY_FETCH_BACKEND = os.getenv('DISCOVERY_FETCH_BACKEND', 'http')
+ANALYSIS_FETCH_BACKEND = os.getenv('ANALYSIS_FETCH_BACKEND', 'http')
+# Scraped posts are reused across stages and runs until they are this old
+POST_CACHE_TTL_HOURS = float(os.getenv('POST_CACHE_TTL_HOURS', '12'))
+POST_CACHE_MAX_ENTRIES = int(os.getenv('POST_CACHE_MAX_ENTRIES', '20000'))
+# Saved login cookies are reused until they expire or get this old. The file holds a
+# live session, so it is not kept in STATE_DIR (which the workflow caches) and is
+# not written at all on CI ('' = never saved)
+SESSION_STATE_FILE = os.getenv('SESSION_STATE_FILE', '' if os.getenv('CI') else 'session_state.json')
+SESSION_MAX_AGE_HOURS = float(os.getenv('SESSION_MAX_AGE_HOURS', '72'))
+# Run-wide navigation pacing, shared by every page and shard worker. This is the
+# throughput ceiling: 20/min (one navigation every 3s) however many pages run
+PACING_MIN_INTERVAL = float(os.getenv('PACING_MIN_INTERVAL', '2'))
+PACING_REQUESTS_PER_MINUTE = int(os.getenv('PACING_REQUESTS_PER_MINUTE', '20'))
+# Sentiment scores memoized per run, and pool processes scoring them (0 = a thread)
+SENTIMENT_CACHE_SIZE = int(os.getenv('SENTIMENT_CACHE_SIZE', '50000'))
+SENTIMENT_WORKERS = int(os.getenv('SENTIMENT_WORKERS', '0'))
+# Interrupted runs are resumed from their checkpoint: 'auto' picks the newest
+# unfinished one, 'off' always starts fresh, anything else is a VERSION_ID
+RESUME_RUN = os.getenv('RESUME_RUN', 'auto')
+# Older checkpoints are not resumed; their trends are stale
+CHECKPOINT_MAX_AGE_HOURS = float(os.getenv('CHECKPOINT_MAX_AGE_HOURS', '24'))
+# Per-run timing profiles are written here as <VERSION_ID>.json
+RUN_PROFILE_DIR = os.getenv('RUN_PROFILE_DIR', 'run_profiles')
+# Items each pipeline queue holds before its producer waits, and sentiment batch size
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', '50'))
+PIPELINE_SCORE_BATCH = int(os.getenv('PIPELINE_SCORE_BATCH', '32'))
+# Seconds between queue depth printouts while the pipeline runs (0 = end summary only)
+PIPELINE_MONITOR_INTERVAL = float(os.getenv('PIPELINE_MONITOR_INTERVAL', '30'))
+
+# -------------------------
+# SUPABASE CONFIG
+# -------------------------
+SUPABASE_URL = os.getenv('SUPABASE_URL', '')
+SUPABASE_KEY = os.getenv('SUPABASE_KEY', '')
+# Rows per bulk insert (0 = one insert at the end of the run)
+SUPABASE_CHUNK_SIZE = int(os.getenv('SUPABASE_CHUNK_SIZE', '5'))
+SUPABASE_MAX_RETRIES = int(os.getenv('SUPABASE_MAX_RETRIES', '4'))
+# Rows that could not be written are kept here and replayed on the next run
+SUPABASE_SPOOL_FILE = os.getenv('SUPABASE_SPOOL_FILE', 'supabase_spool.jsonl')
+
+# Files that must survive between runs (the workflow caches this directory)
+STATE_DIR = os.getenv('SCRAPER_STATE_DIR', '.scraper_state')
+# Every run's scored posts are appended here as Parquet, one partition per VERSION_ID ('' = off)
+POST_ARCHIVE_DIR = os.getenv('POST_ARCHIVE_DIR', os.path.join(STATE_DIR, 'post_archive'))
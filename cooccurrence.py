@@ -0,0 +1,189 @@
+"""
+Which hashtags show up together, kept across runs.
+
+Every caption and alt text the scraper reads is added as one observation:
+each hashtag's count goes up and so does every pair of hashtags in it. The
+index is sparse (tag -> {neighbor: times seen together}) and each tag keeps
+at most `max_neighbors * 4` neighbors before the rarest are pruned back to
+`max_neighbors`, so counts in the long tail are approximate.
+
+related(tag, k) ranks neighbors by cosine similarity,
+
+    together / sqrt(count(tag) * count(neighbor))
+
+so tags that appear everywhere do not top every list. The ranked list is
+cached per tag until its count, one of its pairs or one of its neighbors'
+counts changes, which makes a repeated query a dict lookup and a slice.
+
+On disk the index is compact JSON: the tag names, their counts, and per tag
+a flat [neighbor id, together, ...] list holding each pair once. Beyond
+`max_tags`, the least seen tags are dropped when saving. Without a path
+the index lives in memory only.
+"""
+import heapq
+import json
+import math
+import os
+import time
+from collections import Counter
+
+class CooccurrenceIndex:
+    """Sparse hashtag co-occurrence counts with cached top-k related tags."""
+
+    def __init__(self, path: str = None, max_tags: int = 100000, max_neighbors: int = 50, max_tags_per_text: int = 30):
+        self.path = path
+        self.max_tags = max_tags
+        self.max_neighbors = max_neighbors
+        # Spam captions with dozens of tags would add hundreds of pairs each
+        self.max_tags_per_text = max_tags_per_text
+        self.stats = Counter()
+        # Tag lists added by this process, for sharded workers to send back
+        self.observed = []
+        # Loaded on first use, like the trend store
+        self._counts = None
+        self._neighbors = None
+        self._related = {}
+        self._dirty = False
+
+    @property
+    def counts(self) -> dict:
+        if self._counts is None:
+            self._load()
+        return self._counts
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def _load(self):
+        started = time.monotonic()
+        state = {}
+        try:
+            if self.path:
+                with open(self.path, encoding='utf-8') as f:
+                    state = json.load(f)
+        except (OSError, ValueError):
+            pass
+        tags = state.get('tags', [])
+        self._counts = dict(zip(tags, state.get('counts', [])))
+        self._neighbors = {tag: {} for tag in tags}
+        for tag, edges in zip(tags, state.get('edges', [])):
+            neighbors = self._neighbors[tag]
+            for i in range(0, len(edges), 2):
+                other, together = tags[edges[i]], edges[i + 1]
+                neighbors[other] = together
+                self._neighbors[other][tag] = together
+        self.stats['loaded'] = len(tags)
+        self.stats['load_ms'] = round((time.monotonic() - started) * 1000)
+
+    # -------------------------
+    # BUILDING
+    # -------------------------
+
+    def add(self, tags):
+        """One caption or alt text's hashtags (duplicates ignored)."""
+        tags = list(dict.fromkeys(tags))[:self.max_tags_per_text]
+        if not tags:
+            return
+        counts = self.counts
+        neighbors = self._neighbors
+        for tag in tags:
+            counts[tag] = counts.get(tag, 0) + 1
+            if tag not in neighbors:
+                neighbors[tag] = {}
+            self._forget_related(tag)
+        for i, tag in enumerate(tags):
+            tag_neighbors = neighbors[tag]
+            for other in tags[i + 1:]:
+                together = tag_neighbors.get(other, 0) + 1
+                tag_neighbors[other] = together
+                neighbors[other][tag] = together
+            if len(tag_neighbors) > self.max_neighbors * 4:
+                self._prune(tag)
+        self.observed.append(tags)
+        self.stats['texts'] += 1
+        self.stats['pairs'] += len(tags) * (len(tags) - 1) // 2
+        self._dirty = True
+
+    def _forget_related(self, tag: str):
+        """Drop cached rankings that use `tag`'s count: its own and its neighbors'."""
+        if not self._related:
+            return
+        self._related.pop(tag, None)
+        for other in self._neighbors[tag]:
+            self._related.pop(other, None)
+
+    def _prune(self, tag: str):
+        """Keep `tag`'s max_neighbors most frequent neighbors; drop it from the others' lists."""
+        tag_neighbors = self._neighbors[tag]
+        keep = heapq.nlargest(self.max_neighbors, tag_neighbors.items(), key=lambda item: item[1])
+        keep = dict(keep)
+        for other in tag_neighbors.keys() - keep.keys():
+            self._neighbors[other].pop(tag, None)
+            self._related.pop(other, None)
+        self._neighbors[tag] = keep
+        self.stats['pruned'] += 1
+
+    # -------------------------
+    # QUERYING
+    # -------------------------
+
+    def related(self, tag: str, k: int = 10) -> list:
+        """Up to `k` (neighbor, similarity) pairs for `tag`, most related first."""
+        ranked = self._related.get(tag)
+        if ranked is None:
+            counts = self.counts
+            count = counts.get(tag, 0)
+            ranked = sorted(
+                ((other, together / math.sqrt(count * counts[other]))
+                 for other, together in self._neighbors.get(tag, {}).items()),
+                key=lambda item: item[1],
+                reverse=True,
+            )
+            self._related[tag] = ranked
+        return ranked[:k]
+
+    # -------------------------
+    # PERSISTENCE
+    # -------------------------
+
+    def _evict(self):
+        overflow = len(self._counts) - self.max_tags
+        if self.max_tags and overflow > 0:
+            for tag in heapq.nsmallest(overflow, self._counts, key=self._counts.__getitem__):
+                for other in self._neighbors.pop(tag):
+                    self._neighbors[other].pop(tag, None)
+                del self._counts[tag]
+            self._related.clear()
+            self.stats['evicted'] += overflow
+
+    def save(self):
+        """Evict the rarest tags beyond max_tags and write the index atomically."""
+        if not self._dirty or not self.path:
+            return
+        started = time.monotonic()
+        self._evict()
+        tags = list(self._counts)
+        ids = {tag: i for i, tag in enumerate(tags)}
+        edges = []
+        for i, tag in enumerate(tags):
+            flat = []
+            for other, together in self._neighbors[tag].items():
+                # Each pair is stored once, under the tag that comes first
+                if ids[other] > i:
+                    flat += (ids[other], together)
+            edges.append(flat)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'tags': tags, 'counts': [self._counts[tag] for tag in tags], 'edges': edges},
+                               separators=(',', ':')))
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+        self.stats['saved'] = len(tags)
+        self.stats['save_ms'] = round((time.monotonic() - started) * 1000)
+
+    def print_summary(self):
+        print(f"🔗 Co-occurrence: {len(self.counts)} hashtag(s) indexed, {self.stats['texts']} text(s) added "
+              f"this run ({self.stats['pairs']} pairs), loaded in {self.stats['load_ms']} ms")
@@ -0,0 +1,98 @@
+"""
+Request routing profiles for the scraper's browser context.
+
+The scraper only reads hrefs, alt attributes and text, so the heavy parts of
+each page (images, video, fonts, tracking beacons) can be aborted before they
+are downloaded. A profile decides what to abort; the allowlist always wins so
+the DOM the selectors depend on still renders.
+"""
+import re
+from collections import Counter
+
+# Tracking and telemetry endpoints nothing in the scraper reads
+TRACKING_PATTERNS = [
+    r'facebook\.com/tr',
+    r'connect\.facebook\.net',
+    r'google-analytics\.com',
+    r'googletagmanager\.com',
+    r'doubleclick\.net',
+    r'/logging_client_events',
+    r'/ajax/bz',
+    r'graph\.instagram\.com/logging',
+]
+
+# Always let these through, whatever the profile blocks
+DEFAULT_ALLOWLIST = [
+    r'\.css(\?|$)',
+    r'/rsrc\.php/',
+]
+
+PROFILES = {
+    # Load everything, like a normal browser
+    'full': {'types': set(), 'patterns': []},
+    # Drop media and trackers, keep scripts and styles so the app renders
+    'lean': {'types': {'image', 'media', 'font'}, 'patterns': TRACKING_PATTERNS},
+    # Also drop stylesheets; text and attributes are still in the DOM
+    'text': {'types': {'image', 'media', 'font', 'stylesheet'}, 'patterns': TRACKING_PATTERNS},
+}
+
+# Aborted requests never report a size, so savings use typical sizes per type
+ESTIMATED_BYTES = {
+    'image': 60_000,
+    'media': 1_500_000,
+    'font': 40_000,
+    'stylesheet': 30_000,
+    'script': 40_000,
+}
+ESTIMATED_BYTES_OTHER = 2_000
+
+class FetchProfile:
+    """Aborts requests by resource type and URL pattern and counts the savings."""
+
+    def __init__(self, name: str = 'lean', blocked_types=None, blocked_patterns=None, allowlist=None):
+        if name not in PROFILES:
+            raise ValueError(f"Unknown fetch profile '{name}' (choose from {', '.join(PROFILES)})")
+        profile = PROFILES[name]
+        self.name = name
+        self.blocked_types = set(profile['types'] if blocked_types is None else blocked_types)
+        self.blocked_patterns = [re.compile(p) for p in (profile['patterns'] if blocked_patterns is None else blocked_patterns)]
+        self.allowlist = [re.compile(p) for p in (DEFAULT_ALLOWLIST if allowlist is None else allowlist)]
+        self.stats = Counter()
+        self.blocked_by_type = Counter()
+
+    def should_block(self, resource_type: str, url: str) -> bool:
+        if any(p.search(url) for p in self.allowlist):
+            return False
+        if resource_type in self.blocked_types:
+            return True
+        return any(p.search(url) for p in self.blocked_patterns)
+
+    async def _route(self, route):
+        request = route.request
+        if self.should_block(request.resource_type, request.url):
+            self.stats['blocked_requests'] += 1
+            self.stats['bytes_saved_estimate'] += ESTIMATED_BYTES.get(request.resource_type, ESTIMATED_BYTES_OTHER)
+            self.blocked_by_type[request.resource_type] += 1
+            await route.abort()
+        else:
+            self.stats['allowed_requests'] += 1
+            await route.continue_()
+
+    def _on_response(self, response):
+        length = response.headers.get('content-length')
+        if length and length.isdigit():
+            self.stats['bytes_received'] += int(length)
+
+    async def install(self, context):
+        """Attach the profile to every page opened from `context`."""
+        context.on("response", self._on_response)
+        if self.blocked_types or self.blocked_patterns:
+            await context.route("**/*", self._route)
+
+    def print_summary(self):
+        print(f"🧹 Fetch profile '{self.name}': blocked {self.stats['blocked_requests']:,} "
+              f"of {self.stats['blocked_requests'] + self.stats['allowed_requests']:,} requests, "
+              f"~{self.stats['bytes_saved_estimate'] / 1_000_000:.1f} MB saved, "
+              f"{self.stats['bytes_received'] / 1_000_000:.1f} MB received")
+        if self.blocked_by_type:
+            print("    " + ", ".join(f"{kind}: {count}" for kind, count in self.blocked_by_type.most_common()))
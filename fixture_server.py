@@ -0,0 +1,310 @@
+"""
+Local stand-ins for the services the scraper talks to.
+
+FixtureServer runs a small threaded HTTP server on 127.0.0.1 that imitates
+the PostgREST insert endpoint Supabase exposes (POST /rest/v1/<table>), so
+the writer can be exercised without a real project or network access, and
+simple reads of what was inserted (GET /rest/v1/<table>?select=a,b&c=eq.x). It
+also serves fixture post pages (GET /p/<shortcode>/) together with the media
+JSON those pages load, and hashtag pages (GET /explore/tags/<tag>/) linking
+to them, for benchmarking the fetch backends and sharded runs.
+
+For replaying a whole run (see replay.py) it also plays the logged-in site:
+a login form (GET/POST /accounts/login/) that sets a session cookie for
+the fixture credentials, /accounts/edit/ for the session check, and a home
+feed (GET /) that loads more posts as it is scrolled. Both redirect to the
+login form without the cookie. Recorded pages can be served from a
+directory that mirrors the URL paths.
+
+    server = FixtureServer().start()
+    writer = SupabaseWriter(server.url, 'test-key')
+    ...
+    server.rows['instagram']   # rows received
+    server.add_post('ABC123', likes=1234, comments=56, caption='Hi #sunset')
+    server.stop()
+"""
+import html
+import json
+import mimetypes
+import os
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+SESSION_COOKIE = 'sessionid'
+
+def media_json(shortcode: str, likes: int, comments: int, caption: str) -> dict:
+    """The v1 media API's shape for one post."""
+    return {'items': [{'code': shortcode, 'like_count': likes, 'comment_count': comments, 'caption': {'text': caption}}]}
+
+def post_page_html(shortcode: str, likes: int, comments: int, caption: str, embed: str = 'json') -> str:
+    """A post page as served before JavaScript runs.
+
+    embed='json' inlines the media JSON, 'meta' only has the og:description
+    counts, 'none' has neither; every variant loads the media JSON over
+    fetch() like the real app, so a browser always gets the data.
+    """
+    head = ""
+    if embed == 'json':
+        head = f'<script type="application/json">{json.dumps(media_json(shortcode, likes, comments, caption))}</script>'
+    elif embed == 'meta':
+        description = f'{likes:,} likes, {comments:,} comments - fixture on January 1, 2024: "{caption}"'
+        head = f'<meta property="og:description" content="{html.escape(description)}">'
+    return f"""<!DOCTYPE html>
+<html><head><title>Instagram</title>{head}</head>
+<body>
+    <section><button><span>{likes:,} likes</span></button></section>
+    <span dir="auto">{html.escape(caption)}</span>
+    <script>fetch('/api/v1/media/{shortcode}/info/')</script>
+</body></html>
+"""
+
+def tag_page_html(hashtag: str, shortcodes: list, alts: list = None) -> str:
+    """A hashtag page: a grid of post links with alt texts."""
+    alts = alts or [f"Photo by fixture #{hashtag} #sunset"] * len(shortcodes)
+    links = "\n".join(
+        f'<a href="/p/{code}/"><img alt="{html.escape(alt)}"></a>' for code, alt in zip(shortcodes, alts)
+    )
+    return f"<!DOCTYPE html><html><head><title>#{hashtag}</title></head><body><main>{links}</main></body></html>"
+
+def login_page_html(error: str = "") -> str:
+    """The login form, submitted with Enter like the real one."""
+    message = f'<p id="error">{html.escape(error)}</p>' if error else ""
+    return f"""<!DOCTYPE html>
+<html><head><title>Login • Instagram</title></head>
+<body>
+    <form method="post" action="/accounts/login/">
+        <input name="username" aria-label="Phone number, username, or email" type="text">
+        <input name="password" aria-label="Password" type="password">
+        <button type="submit">Log in</button>
+    </form>
+    {message}
+</body></html>
+"""
+
+def feed_page_html(posts: list, batch: int = 12) -> str:
+    """The home feed: `batch` {'shortcode', 'alt'} posts at first, the next batch on every scroll."""
+    return f"""<!DOCTYPE html>
+<html><head><title>Instagram</title></head>
+<body style="margin:0">
+    <nav><a href="/"><svg aria-label="Home"></svg></a><svg aria-label="Search"></svg></nav>
+    <div role="dialog"><button onclick="this.parentNode.remove()">Not Now</button></div>
+    <main id="feed"></main>
+    <script>
+        const posts = {json.dumps(posts)};
+        const feed = document.getElementById('feed');
+        let next = 0;
+        function more() {{
+            for (let i = 0; i < {batch} && next < posts.length; i++, next++) {{
+                const article = document.createElement('article');
+                article.style.height = '400px';
+                const a = document.createElement('a');
+                a.href = '/p/' + posts[next].shortcode + '/';
+                const img = document.createElement('img');
+                img.alt = posts[next].alt;
+                a.appendChild(img);
+                article.appendChild(a);
+                feed.appendChild(article);
+            }}
+        }}
+        more();
+        window.addEventListener('scroll', () => {{
+            if (window.innerHeight + window.scrollY >= document.body.scrollHeight - 1200) more();
+        }});
+    </script>
+</body></html>
+"""
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "FixtureServer/1.0"
+
+    def log_message(self, format, *args):
+        # Keep benchmark output readable
+        pass
+
+    def _reply(self, status: int, body: bytes = b"", content_type: str = "application/json", headers: dict = None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def _redirect(self, location: str, headers: dict = None):
+        self._reply(302, headers={"Location": location, **(headers or {})})
+
+    def _logged_in(self) -> bool:
+        return f"{SESSION_COOKIE}={self.server.fixture.session_id}" in (self.headers.get("Cookie") or "")
+
+    def do_GET(self):
+        fixture = self.server.fixture
+        path = self.path.split("?")[0]
+        if path == "/accounts/login/" and self._logged_in():
+            return self._redirect("/")
+        if path in fixture.private and not self._logged_in():
+            return self._redirect("/accounts/login/")
+        if path.startswith("/rest/v1/"):
+            return self._select(path[len("/rest/v1/"):])
+        with fixture.lock:
+            fixture.get_requests += 1
+            if path.startswith("/p/"):
+                fixture.post_requests += 1
+            page = fixture.pages.get(path)
+        if fixture.delay:
+            # Stands in for network and server latency
+            time.sleep(fixture.delay)
+        if page is None:
+            return self._reply(404, b'{"message": "not found"}')
+        content_type, body = page
+        self._reply(200, body, content_type)
+
+    def do_POST(self):
+        fixture = self.server.fixture
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length)
+
+        if self.path.split("?")[0] == "/accounts/login/":
+            return self._login(body)
+        if not self.path.startswith("/rest/v1/"):
+            return self._reply(404, b'{"message": "not found"}')
+        if not self.headers.get("apikey"):
+            return self._reply(401, b'{"message": "No API key found in request"}')
+
+        with fixture.lock:
+            fixture.requests += 1
+            if fixture.fail_next > 0:
+                fixture.fail_next -= 1
+                return self._reply(fixture.fail_status, b'{"message": "injected failure"}')
+
+        try:
+            payload = json.loads(body)
+        except json.JSONDecodeError:
+            return self._reply(400, b'{"message": "invalid JSON"}')
+        rows = payload if isinstance(payload, list) else [payload]
+
+        table = self.path[len("/rest/v1/"):].split("?")[0]
+        with fixture.lock:
+            fixture.rows[table].extend(rows)
+
+        if "return=representation" in (self.headers.get("Prefer") or ""):
+            return self._reply(201, json.dumps(rows).encode("utf-8"))
+        self._reply(201)
+
+    def _select(self, table: str):
+        """PostgREST read with eq. filters and a select list, nothing more."""
+        fixture = self.server.fixture
+        if not self.headers.get("apikey"):
+            return self._reply(401, b'{"message": "No API key found in request"}')
+        query = {key: values[0] for key, values in parse_qs(self.path.partition("?")[2]).items()}
+        columns = query.pop("select", "*").split(",")
+        filters = {key: value[len("eq."):] for key, value in query.items() if value.startswith("eq.")}
+        with fixture.lock:
+            rows = [row for row in fixture.rows[table]
+                    if all(str(row.get(key)) == value for key, value in filters.items())]
+        if columns != ["*"]:
+            rows = [{column: row.get(column) for column in columns} for row in rows]
+        self._reply(200, json.dumps(rows).encode("utf-8"))
+
+    def _login(self, body: bytes):
+        fixture = self.server.fixture
+        form = {name: values[0] for name, values in parse_qs(body.decode("utf-8")).items()}
+        with fixture.lock:
+            fixture.logins += 1
+        if (form.get("username"), form.get("password")) != fixture.credentials:
+            return self._reply(200, login_page_html("Sorry, your password was incorrect.").encode("utf-8"),
+                               "text/html; charset=utf-8")
+        cookie = f"{SESSION_COOKIE}={fixture.session_id}; Path=/; Max-Age=86400"
+        self._redirect("/", headers={"Set-Cookie": cookie})
+
+class FixtureServer:
+    """Threaded local HTTP server holding whatever it has been sent."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.rows = defaultdict(list)
+        self.requests = 0
+        # Fail this many upcoming inserts with `fail_status` (for retry tests)
+        self.fail_next = 0
+        self.fail_status = 503
+        self.lock = threading.Lock()
+        # GET path -> (content type, body)
+        self.pages = {}
+        self.get_requests = 0
+        # Of those, post page loads
+        self.post_requests = 0
+        # Seconds every GET takes before it is answered
+        self.delay = 0.0
+        # The login form accepts these, and the paths below need its cookie
+        self.credentials = ("fixture", "fixture-password")
+        self.session_id = "fixture-session"
+        self.private = {"/", "/accounts/edit/"}
+        self.logins = 0
+        self.pages["/accounts/login/"] = ("text/html; charset=utf-8", login_page_html().encode("utf-8"))
+        self.pages["/accounts/edit/"] = ("text/html; charset=utf-8", b"<!DOCTYPE html><html><body>Edit profile</body></html>")
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.fixture = self
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fixture-server", daemon=True)
+
+    def add_post(self, shortcode: str, likes: int, comments: int, caption: str = "", embed: str = 'json') -> str:
+        """Serve a fixture post page and its media JSON; returns the page URL."""
+        with self.lock:
+            self.pages[f"/p/{shortcode}/"] = (
+                "text/html; charset=utf-8", post_page_html(shortcode, likes, comments, caption, embed).encode("utf-8"))
+            self.pages[f"/api/v1/media/{shortcode}/info/"] = ("application/json", json.dumps(media_json(shortcode, likes, comments, caption)).encode("utf-8"))
+        return f"{self.url}/p/{shortcode}/"
+
+    def add_tag(self, hashtag: str, shortcodes: list, alts: list = None) -> str:
+        """Serve a hashtag page linking to `shortcodes`; returns the page URL."""
+        with self.lock:
+            self.pages[f"/explore/tags/{hashtag}/"] = (
+                "text/html; charset=utf-8", tag_page_html(hashtag, shortcodes, alts).encode("utf-8"))
+        return f"{self.url}/explore/tags/{hashtag}/"
+
+    def add_feed(self, posts: list) -> str:
+        """Serve the home feed with `posts` ({'shortcode', 'alt'} dicts); returns its URL."""
+        with self.lock:
+            self.pages["/"] = ("text/html; charset=utf-8", feed_page_html(posts).encode("utf-8"))
+        return f"{self.url}/"
+
+    def add_directory(self, root: str) -> int:
+        """Serve recorded pages: <root>/p/ABC/index.html answers GET /p/ABC/. Returns the file count."""
+        count = 0
+        for directory, _, files in os.walk(root):
+            for name in files:
+                path = "/" + os.path.relpath(os.path.join(directory, name), root).replace(os.sep, "/")
+                # index.html, index.json, ... answer for their directory
+                if os.path.splitext(name)[0] == "index":
+                    path = path[:-len(name)]
+                content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+                if content_type.startswith("text/"):
+                    content_type += "; charset=utf-8"
+                with open(os.path.join(directory, name), "rb") as f:
+                    body = f.read()
+                with self.lock:
+                    self.pages[path] = (content_type, body)
+                count += 1
+        return count
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+if __name__ == "__main__":
+    server = FixtureServer(port=8765).start()
+    print(f"[+] Fixture server listening on {server.url} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,135 @@
+"""
+Browserless post fetching over a pooled HTTP session.
+
+A post page already carries what the scraper reads, before any JavaScript
+runs: the post's media JSON embedded in <script type="application/json">
+blocks, and an og:description meta tag of the form
+'1,234 likes, 56 comments - user on January 1, 2024: "caption"'. One
+keep-alive GET with the browser's login cookies is far cheaper than a
+Chromium navigation. Only the <script> and <meta> tags are parsed.
+
+When neither source can be read, fetch_post returns None and the caller
+falls back to the browser.
+"""
+import asyncio
+import json
+import re
+from collections import Counter
+
+import requests
+from bs4 import BeautifulSoup, SoupStrainer
+from requests.adapters import HTTPAdapter
+
+from response_extractor import find_post_node, shortcode_from_url
+
+BASE_URL = "https://www.instagram.com"
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# Backends a stage can fetch posts with
+BACKENDS = ('browser', 'http')
+
+_PARSE_ONLY = SoupStrainer(['script', 'meta'])
+
+OG_COUNTS_RE = re.compile(r'([\d.,]+)\s*([KkMm]?)\s+likes?,\s*([\d.,]+)\s*([KkMm]?)\s+comments?')
+OG_CAPTION_RE = re.compile(r':\s*["“](.*)["”]\s*\.?\s*$', re.S)
+
+def _parse_count(number: str, suffix: str) -> int:
+    """'1,234' -> 1234, '12.5' + 'K' -> 12500."""
+    if suffix:
+        return int(float(number.replace(',', '')) * (1000 if suffix.lower() == 'k' else 1_000_000))
+    return int(number.replace(',', '').replace('.', ''))
+
+def parse_og_description(content: str):
+    """Likes/comments/caption from an og:description, or None when it has no counts."""
+    match = OG_COUNTS_RE.search(content or "")
+    if not match:
+        return None
+    caption = OG_CAPTION_RE.search(content)
+    return {
+        'likes': _parse_count(match.group(1), match.group(2)),
+        'comments': _parse_count(match.group(3), match.group(4)),
+        'caption': caption.group(1) if caption else "",
+    }
+
+def parse_post_html(html: str, shortcode: str):
+    """Post data from a server-rendered post page: embedded JSON first, then meta tags."""
+    soup = BeautifulSoup(html, 'html.parser', parse_only=_PARSE_ONLY)
+    for script in soup.find_all('script', type=('application/json', 'application/ld+json')):
+        try:
+            data = json.loads(script.string or "")
+        except ValueError:
+            continue
+        parsed = find_post_node(data, shortcode)
+        if parsed:
+            parsed['parser'] = 'json'
+            return parsed
+    for name in ('og:description', 'description'):
+        meta = soup.find('meta', attrs={'property': name}) or soup.find('meta', attrs={'name': name})
+        parsed = parse_og_description(meta.get('content') if meta else "")
+        if parsed:
+            parsed['parser'] = 'meta'
+            return parsed
+    return None
+
+class HttpFetcher:
+    """Keep-alive requests session carrying the browser context's cookies."""
+
+    def __init__(self, base_url: str = BASE_URL, pool_size: int = 10, timeout: float = 15):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.stats = Counter()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            'User-Agent': USER_AGENT,
+            'Accept': 'text/html,application/xhtml+xml',
+            'Accept-Language': 'en-US,en;q=0.9',
+        })
+
+    async def load_cookies(self, context):
+        """Copy the logged-in Playwright context's cookies into the session."""
+        for cookie in await context.cookies():
+            self.session.cookies.set(cookie['name'], cookie['value'],
+                                     domain=cookie.get('domain'), path=cookie.get('path', '/'))
+        self.stats['cookies'] = len(self.session.cookies)
+
+    def _url(self, post_url: str) -> str:
+        return post_url if post_url.startswith('http') else f"{self.base_url}{post_url}"
+
+    def fetch_post(self, post_url: str):
+        """{'likes', 'comments', 'caption'} for a post, or None if the page gave nothing usable."""
+        try:
+            response = self.session.get(self._url(post_url), timeout=self.timeout, allow_redirects=False)
+        except requests.RequestException:
+            self.stats['errors'] += 1
+            self.stats['fallbacks'] += 1
+            return None
+        self.stats['requests'] += 1
+        self.stats['bytes'] += len(response.content)
+        # Redirects here mean a login wall or a removed post
+        if response.status_code != 200:
+            self.stats[f'status_{response.status_code}'] += 1
+            self.stats['fallbacks'] += 1
+            return None
+        parsed = parse_post_html(response.text, shortcode_from_url(post_url))
+        if parsed is None:
+            self.stats['fallbacks'] += 1
+            return None
+        self.stats[f"parsed_{parsed.pop('parser')}"] += 1
+        return parsed
+
+    async def fetch_post_async(self, post_url: str):
+        """fetch_post on a worker thread, so the event loop keeps driving the browser."""
+        return await asyncio.to_thread(self.fetch_post, post_url)
+
+    def close(self):
+        self.session.close()
+
+    def print_summary(self):
+        print(f"🪶 HTTP fetch: {self.stats['requests']} request(s), "
+              f"{self.stats['parsed_json']} from JSON, {self.stats['parsed_meta']} from meta tags, "
+              f"{self.stats['fallbacks']} fell back to the browser, "
+              f"{self.stats['bytes'] / 1_000_000:.2f} MB")
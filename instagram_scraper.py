@@ -0,0 +1,210 @@
+"""
+Command-line entry point.
+
+    python instagram_scraper.py                          # full run: discover, analyze, save
+    python instagram_scraper.py discover                 # discovery only: rank hashtags, update trends
+    python instagram_scraper.py analyze travel food      # analyze these hashtags, no discovery
+    python instagram_scraper.py replay spool             # send rows left over from failed inserts
+    python instagram_scraper.py replay archive RUN       # re-aggregate an archived run and save missing rows
+    python instagram_scraper.py benchmark [NAME ...]     # see benchmarks.py
+
+Settings come from the environment (see config.py). --posts and --top
+override POSTS_TO_ANALYZE_PER_HASHTAG and TOP_HASHTAGS_TO_DISCOVER; they
+are put in the environment before anything reads it, so sharded workers
+get them too.
+
+A command imports only what it needs, after its arguments are parsed: the
+replay commands never load playwright, discovery never loads pandas, and
+textblob is loaded on the first score. Every command prints how long its
+imports took, how long it took to be ready since this file started
+running, and which heavy packages were loaded by then.
+"""
+import time
+
+STARTED = time.perf_counter()
+
+import argparse
+import asyncio
+import importlib
+import os
+import sys
+
+# Modules each command imports before it starts; anything else loads on first use
+COMMAND_MODULES = {
+    'run': ('main',),
+    'discover': ('main',),
+    'analyze': ('main',),
+    'replay spool': ('config', 'supabase_writer'),
+    'replay archive': ('config', 'supabase_writer', 'post_archive'),
+    'benchmark': ('benchmarks',),
+}
+
+# Third-party packages reported when a command has loaded them
+HEAVY_MODULES = ('playwright', 'requests', 'bs4', 'pandas', 'numpy', 'pyarrow', 'textblob')
+
+# Command-line options and the settings they override
+SETTING_OPTIONS = {
+    'posts': 'POSTS_TO_ANALYZE_PER_HASHTAG',
+    'top': 'TOP_HASHTAGS_TO_DISCOVER',
+}
+
+# -------------------------
+# STARTUP
+# -------------------------
+
+def import_modules(names) -> tuple:
+    """Import `names`; returns the modules and the seconds it took."""
+    started = time.perf_counter()
+    modules = [importlib.import_module(name) for name in names]
+    return modules, time.perf_counter() - started
+
+def loaded_heavy_modules() -> list:
+    return [name for name in HEAVY_MODULES if name in sys.modules]
+
+def report_startup(command: str, import_seconds: float) -> dict:
+    startup = {
+        'command': command,
+        'import_seconds': round(import_seconds, 3),
+        'ready_seconds': round(time.perf_counter() - STARTED, 3),
+        'heavy_modules': loaded_heavy_modules(),
+    }
+    print(f"⏱️  {command}: imports {import_seconds:.2f}s, ready {startup['ready_seconds']:.2f}s after launch "
+          f"(loaded: {', '.join(startup['heavy_modules']) or 'no heavy packages'})")
+    return startup
+
+# -------------------------
+# COMMANDS
+# -------------------------
+
+def scrape(args, startup: dict, main) -> int:
+    """run, discover and analyze: a browser run through main.main()."""
+    main.PROFILER.add_counters('cli', startup)
+    hashtags = None
+    if args.command == 'analyze':
+        hashtags = list(dict.fromkeys(tag.lstrip('#').lower() for tag in args.hashtags))
+    asyncio.run(main.main(hashtags=hashtags, discover_only=args.command == 'discover'))
+    return 0
+
+def open_writer(config, supabase_writer):
+    if not config.SUPABASE_URL or not config.SUPABASE_KEY:
+        print("❌ Supabase connection failed: SUPABASE_URL and SUPABASE_KEY must be set\n")
+        return None
+    return supabase_writer.SupabaseWriter(
+        config.SUPABASE_URL,
+        config.SUPABASE_KEY,
+        chunk_size=config.SUPABASE_CHUNK_SIZE,
+        max_retries=config.SUPABASE_MAX_RETRIES,
+        spool_path=os.path.join(config.STATE_DIR, config.SUPABASE_SPOOL_FILE)
+    )
+
+def replay_spool(args, startup: dict, config, supabase_writer) -> int:
+    """Send rows spooled by earlier runs, without starting a browser."""
+    writer = open_writer(config, supabase_writer)
+    if writer is None:
+        return 1
+    # Starting the writer queues the spool; closing it waits until it is sent
+    writer.start()
+    writer.close()
+    if not writer.stats['replayed']:
+        print(f"📼 Nothing spooled in {writer.spool_path}")
+    writer.print_summary()
+    return 1 if writer.stats['spooled'] or writer.stats['rejected'] else 0
+
+def replay_archive(args, startup: dict, config, supabase_writer, post_archive) -> int:
+    """Rebuild one archived run's rows from its posts and save the ones Supabase lacks.
+
+    Saving needs the run named explicitly, and hashtags the table already has
+    for that VERSION_ID are skipped, so replaying a saved run adds nothing.
+    --dry-run prints the rows instead (of the latest run by default).
+    """
+    archive = post_archive.PostArchive(config.POST_ARCHIVE_DIR)
+    versions = archive.versions()
+    if not args.version_id and not args.dry_run:
+        print(f"❌ Name the run to save (latest archived: {versions[-1] if versions else 'none'})\n")
+        return 1
+    version_id = args.version_id or (versions[-1] if versions else None)
+    if version_id is None:
+        print(f"❌ No archived runs in {config.POST_ARCHIVE_DIR}\n")
+        return 1
+    try:
+        posts = archive.read(version_id)
+    except FileNotFoundError as e:
+        print(f"❌ {e}\n")
+        return 1
+    rows = post_archive.analysis_rows(post_archive.aggregate_posts(posts), version_id)
+    print(f"🗄️  Run {version_id}: {len(posts)} archived post(s) → {len(rows)} row(s)")
+    if args.dry_run:
+        for row in rows:
+            print(f"    {row['topic_hashtag']:30s} {row['posts']:3d} posts | engagement {row['engagement_score']:,.1f} | "
+                  f"{row['sentiment_label']} ({row['sentiment_polarity']:.3f})")
+        return 0
+    writer = open_writer(config, supabase_writer)
+    if writer is None:
+        return 1
+    try:
+        saved = writer.saved_hashtags(version_id)
+    except Exception as e:
+        # Without knowing what is there, saving could duplicate the run
+        print(f"❌ Could not check which rows run {version_id} already has: {e}\n")
+        return 1
+    missing = [row for row in rows if row['topic_hashtag'] not in saved]
+    print(f"    {len(rows) - len(missing)} already in Supabase, saving {len(missing)}")
+    writer.start()
+    for row in missing:
+        writer.add(row)
+    writer.close()
+    writer.print_summary()
+    return 1 if writer.stats['spooled'] or writer.stats['rejected'] else 0
+
+def benchmark(args, startup: dict, benchmarks) -> int:
+    benchmarks.run_benchmarks(args.names)
+    return 0
+
+COMMANDS = {
+    'run': scrape,
+    'discover': scrape,
+    'analyze': scrape,
+    'replay spool': replay_spool,
+    'replay archive': replay_archive,
+    'benchmark': benchmark,
+}
+
+# -------------------------
+# ARGUMENTS
+# -------------------------
+
+def parse_args(argv=None):
+    settings = argparse.ArgumentParser(add_help=False)
+    settings.add_argument('--posts', type=int, help="posts analyzed per hashtag (POSTS_TO_ANALYZE_PER_HASHTAG)")
+    settings.add_argument('--top', type=int, help="hashtags taken from discovery (TOP_HASHTAGS_TO_DISCOVER)")
+
+    parser = argparse.ArgumentParser(description="Instagram trending hashtag analyzer.")
+    commands = parser.add_subparsers(dest='command', metavar='COMMAND')
+    commands.add_parser('run', parents=[settings], help="discover hashtags, analyze them and save the rows (default)")
+    commands.add_parser('discover', parents=[settings], help="discover and rank hashtags only; nothing is saved to Supabase")
+    analyze = commands.add_parser('analyze', parents=[settings], help="analyze the given hashtags without discovery")
+    analyze.add_argument('hashtags', nargs='+', metavar='HASHTAG')
+    replay = commands.add_parser('replay', help="save rows again without scraping")
+    replay.add_argument('source', choices=('spool', 'archive'), help="spooled rows, or an archived run's posts")
+    replay.add_argument('version_id', nargs='?', help="archived run to replay (required unless --dry-run)")
+    replay.add_argument('--dry-run', action='store_true', help="print an archived run's rows instead of saving them")
+    bench = commands.add_parser('benchmark', help="run benchmarks.py (all of them without names)")
+    bench.add_argument('names', nargs='*', metavar='NAME')
+
+    args = parser.parse_args(argv)
+    args.command = args.command or 'run'
+    return args
+
+def cli(argv=None) -> int:
+    args = parse_args(argv)
+    for option, setting in SETTING_OPTIONS.items():
+        value = getattr(args, option, None)
+        if value is not None:
+            os.environ[setting] = str(value)
+    command = f"replay {args.source}" if args.command == 'replay' else args.command
+    modules, import_seconds = import_modules(COMMAND_MODULES[command])
+    startup = report_startup(command, import_seconds)
+    return COMMANDS[command](args, startup, *modules)
+
+if __name__ == "__main__":
+    sys.exit(cli())
@@ -1,46 +1,279 @@
+import asyncio
+import json
 import time
 import re
 import random
 import uuid
 import os
-from datetime import datetime
 from collections import Counter
+from typing import TYPE_CHECKING
 
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
-from textblob import TextBlob
-from supabase import create_client, Client
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeout
 
-# -------------------------
-# CONFIG
-# -------------------------
-USERNAME = os.getenv('INSTAGRAM_USERNAME', '')
-PASSWORD = os.getenv('INSTAGRAM_PASSWORD', '')
+from checkpoint import RunCheckpoint
+from cooccurrence import CooccurrenceIndex
+from fetch_profile import FetchProfile
+from http_fetch import BACKENDS, HttpFetcher, parse_post_html
+from pacing import PacingScheduler
+from pipeline import Pipeline
+from post_cache import PostCache
+from recycling import PageRecycler, PageSlot
+from profiler import RunProfiler
+from response_extractor import PostResponseWatcher, shortcode_from_url
+from selector_resolver import SelectorResolver
+from sentiment_engine import SentimentEngine
+from sharding import run_sharded
+from supabase_writer import SupabaseWriter
+from trend_store import TrendStore
+
+if TYPE_CHECKING:
+    # Imported where posts are aggregated, so startup does not pay for pandas
+    from post_archive import PostColumns
+
+# Settings (see config.py), in config.py's order. Functions read them when called, so
+# benchmarks can override them as main.<NAME>
+from config import (
+    USERNAME, PASSWORD, INSTAGRAM_BASE_URL, POSTS_TO_ANALYZE_PER_HASHTAG,
+    TOP_HASHTAGS_TO_DISCOVER, MIN_HASHTAG_FREQUENCY, DEEP_HARVEST_POSTS, DEEP_HARVEST_SECONDS,
+    ANALYSIS_CONCURRENCY, ANALYSIS_REQUEST_BUDGET, FETCH_PROFILE, JSON_RESPONSE_TIMEOUT,
+    RECYCLE_AFTER_NAVIGATIONS, RECYCLE_MEMORY_MB, MEMORY_REPORT_EVERY, SHARD_WORKERS,
+    TREND_HALF_LIFE_HOURS, TREND_GROWTH_WEIGHT, TREND_MAX_TAGS, RELATED_TAGS_PER_HASHTAG,
+    COOCCURRENCE_MAX_TAGS, DISCOVERY_FETCH_BACKEND, ANALYSIS_FETCH_BACKEND,
+    POST_CACHE_TTL_HOURS, POST_CACHE_MAX_ENTRIES, SESSION_STATE_FILE, SESSION_MAX_AGE_HOURS,
+    PACING_MIN_INTERVAL, PACING_REQUESTS_PER_MINUTE, SENTIMENT_CACHE_SIZE, SENTIMENT_WORKERS,
+    RESUME_RUN, CHECKPOINT_MAX_AGE_HOURS, RUN_PROFILE_DIR, PIPELINE_QUEUE_SIZE,
+    PIPELINE_SCORE_BATCH, PIPELINE_MONITOR_INTERVAL, SUPABASE_URL, SUPABASE_KEY,
+    SUPABASE_CHUNK_SIZE, SUPABASE_MAX_RETRIES, SUPABASE_SPOOL_FILE, STATE_DIR, POST_ARCHIVE_DIR,
+)
+
+VERSION_ID = str(uuid.uuid4())
+
+# Per-run counters printed with the final summary
+RUN_STATS = Counter()
+
+# Per-stage timings, navigations, selector timeouts and bytes for this run
+PROFILER = RunProfiler(VERSION_ID)
+
+# TextBlob-equivalent scoring, batched and memoized
+SENTIMENT = SentimentEngine(SENTIMENT_CACHE_SIZE, SENTIMENT_WORKERS)
+
+# Keep-alive session for the 'http' fetch backend, using the browser's cookies
+HTTP = HttpFetcher(INSTAGRAM_BASE_URL, pool_size=ANALYSIS_CONCURRENCY + 2)
+
+def on_selector_timeout(seconds: float):
+    PROFILER.count('selector_timeouts')
+    PROFILER.count('selector_timeout_ms', round(seconds * 1000))
+
+# Races candidate selectors; the winners are remembered across runs
+SELECTORS = SelectorResolver(os.path.join(STATE_DIR, 'selector_priority.json'), on_timeout=on_selector_timeout)
+
+# Decayed hashtag counts and velocity from earlier runs, merged after discovery
+TRENDS = TrendStore(
+    os.path.join(STATE_DIR, 'trend_store.json'),
+    half_life_hours=TREND_HALF_LIFE_HOURS,
+    max_tags=TREND_MAX_TAGS,
+    growth_weight=TREND_GROWTH_WEIGHT
+)
+
+# Which hashtags appear together in the captions and alt texts read so far
+COOCCURRENCE = CooccurrenceIndex(os.path.join(STATE_DIR, 'cooccurrence.json'), max_tags=COOCCURRENCE_MAX_TAGS)
+
+# Fresh pages/contexts when they have navigated too much, plus memory samples
+RECYCLER = PageRecycler(RECYCLE_AFTER_NAVIGATIONS, RECYCLE_MEMORY_MB, MEMORY_REPORT_EVERY)
 
-POSTS_TO_ANALYZE_PER_HASHTAG = 5
-TOP_HASHTAGS_TO_DISCOVER = 15
-MIN_HASHTAG_FREQUENCY = 1  # Appear at least once (will prioritize higher frequency)
+def on_navigate(page):
+    PROFILER.count('navigations')
+    RECYCLER.note_navigation(page)
+
+# Every navigation in the run goes through this
+PACER = PacingScheduler(
+    PACING_MIN_INTERVAL,
+    PACING_REQUESTS_PER_MINUTE,
+    on_navigate=on_navigate
+)
 
 # -------------------------
-# SUPABASE CONFIG
+# DOM EXTRACTION
 # -------------------------
-SUPABASE_URL = os.getenv('SUPABASE_URL', '')
-SUPABASE_KEY = os.getenv('SUPABASE_KEY', '')
 
-VERSION_ID = str(uuid.uuid4())
+LIKE_SELECTORS = [
+    "section button span",
+    "a[href*='/liked_by/']",
+    "span:has-text('like')",
+]
+
+# Collects everything the scraper reads from a page in a single round-trip,
+# instead of one driver call per element and attribute.
+EXTRACT_PAGE_JS = """
+(linkLimit) => {
+    const text = (el) => el.innerText || '';
+    const firstTexts = (selector, n) =>
+        Array.from(document.querySelectorAll(selector)).slice(0, n).map(text);
+
+    const posts = [];
+    for (const a of document.querySelectorAll("a[href*='/p/']")) {
+        if (posts.length >= linkLimit) break;
+        const img = a.querySelector('img');
+        posts.push({
+            url: a.getAttribute('href'),
+            alt: img ? (img.getAttribute('alt') || '') : '',
+        });
+    }
+
+    return {
+        url: location.href,
+        posts: posts,
+        caption_candidates: {
+            "span[dir='auto']": firstTexts("span[dir='auto']", 5),
+            "h1 ~ div span": firstTexts("h1 ~ div span", 3),
+        },
+        like_candidates: {
+            "section button span": Array.from(document.querySelectorAll("section button span")).map(text),
+            "a[href*='/liked_by/']": Array.from(document.querySelectorAll("a[href*='/liked_by/']")).map(text),
+            // Playwright's :has-text() is not CSS, so match the text here
+            "span:has-text('like')": Array.from(document.querySelectorAll('span'))
+                .filter((el) => /like/i.test(el.textContent || '')).map(text),
+        },
+        comment_count: document.querySelectorAll("ul li[role='menuitem']").length,
+    };
+}
+"""
+
+async def extract_page_data(page, link_limit: int = 50) -> dict:
+    """Read post links, captions and engagement candidates in one page.evaluate.
+
+    Returns a plain dict:
+        url                 current page URL
+        posts               up to `link_limit` {'url', 'alt'} dicts, in DOM order
+        caption_candidates  selector -> texts that may hold the caption
+        like_candidates     selector -> texts that may hold the like count
+        comment_count       number of comment list items
+    """
+    RUN_STATS['dom_extractions'] += 1
+    return await page.evaluate(EXTRACT_PAGE_JS, link_limit)
+
+def pick_caption(record: dict) -> str:
+    """Choose the caption text from an extracted page record."""
+    candidates = record['caption_candidates']
+    for text in candidates["span[dir='auto']"]:
+        if '#' in text and len(text) > 10:
+            return text
+    for text in candidates["h1 ~ div span"]:
+        if '#' in text:
+            return text
+    return ""
+
+def parse_like_count(record: dict) -> int:
+    """Find the like count among the candidate texts, in selector order."""
+    likes = 0
+    for selector in LIKE_SELECTORS:
+        for text in record['like_candidates'].get(selector, []):
+            text = text.lower()
+            if 'like' in text or text.replace(',', '').isdigit():
+                numbers = re.findall(r'[\d,]+', text.replace(',', ''))
+                if numbers:
+                    likes = int(numbers[0])
+                    break
+        if likes > 0:
+            break
+    return likes
+
+# Scrolls the feed one step and reports how many post links are loaded
+SCROLL_JS = """() => {
+    window.scrollBy(0, 800);
+    return document.querySelectorAll("a[href*='/p/']").length;
+}"""
+
+MORE_LINKS_JS = """(count) => document.querySelectorAll("a[href*='/p/']").length > count"""
+
+# One deep-harvest step: returns only links not read before (marking them as
+# read), blanks their images so the grid stops holding decoded pixels, and
+# scrolls on. The page never re-sends links it has already returned.
+HARVEST_STEP_JS = """
+(limit) => {
+    const fresh = [];
+    for (const a of document.querySelectorAll("a[href*='/p/']:not([data-harvested])")) {
+        if (fresh.length >= limit) break;
+        a.setAttribute('data-harvested', '1');
+        const img = a.querySelector('img');
+        fresh.push({url: a.getAttribute('href'), alt: img ? (img.getAttribute('alt') || '') : ''});
+        if (img) {
+            img.removeAttribute('srcset');
+            img.removeAttribute('src');
+        }
+    }
+    window.scrollBy(0, window.innerHeight * 2);
+    return {fresh: fresh, heap: (performance.memory || {}).usedJSHeapSize || 0};
+}
+"""
+
+UNHARVESTED_LINKS_JS = """() => document.querySelector("a[href*='/p/']:not([data-harvested])") !== null"""
+
+async def deep_harvest(page, target: int, time_budget: float, max_stalls: int = 4):
+    """Scroll the current grid, collecting post links until `target` or `time_budget`.
+
+    Only new links cross from the page on each step, and duplicates (the
+    grid re-renders rows as it virtualizes) are dropped by shortcode. Stops
+    early after `max_stalls` steps without a new link. Returns the posts and
+    a stats dict (steps, seconds, posts_per_second, js_heap_peak).
+    """
+    seen = set()
+    posts = []
+    started = time.monotonic()
+    steps = stalls = heap_peak = 0
+    while len(posts) < target and time.monotonic() - started < time_budget:
+        step = await page.evaluate(HARVEST_STEP_JS, target - len(posts))
+        steps += 1
+        heap_peak = max(heap_peak, step['heap'])
+        new = 0
+        for post in step['fresh']:
+            shortcode = shortcode_from_url(post['url'])
+            if shortcode and shortcode not in seen:
+                seen.add(shortcode)
+                posts.append(post)
+                new += 1
+        stalls = 0 if new else stalls + 1
+        if stalls >= max_stalls:
+            break
+        try:
+            # Move on as soon as the next rows render
+            await page.wait_for_function(UNHARVESTED_LINKS_JS, timeout=2000)
+        except PlaywrightTimeout:
+            pass
+    RUN_STATS['dom_extractions'] += steps
+    elapsed = time.monotonic() - started
+    return posts, {
+        'steps': steps,
+        'seconds': elapsed,
+        'posts_per_second': len(posts) / elapsed if elapsed else 0.0,
+        'js_heap_peak': heap_peak,
+    }
+
+async def wait_for_selector(page, selector: str, **kwargs):
+    """page.wait_for_selector that records timeouts and the time they cost."""
+    started = time.monotonic()
+    try:
+        return await page.wait_for_selector(selector, **kwargs)
+    except PlaywrightTimeout:
+        SELECTORS.note_timeout(time.monotonic() - started)
+        raise
+
+def extract_hashtags(text: str) -> list:
+    """Hashtags in a caption or alt text that are worth counting."""
+    return [tag.lower().strip() for tag in re.findall(r'#(\w+)', text) if 3 <= len(tag) <= 30]
 
 # -------------------------
 # FUNCTIONS
 # -------------------------
 
-def login_instagram(page):
+async def login_instagram(page):
     """Login to Instagram with improved error handling."""
     try:
         print("[+] Navigating to Instagram...")
         
-        page.goto("https://www.instagram.com/accounts/login/", wait_until="domcontentloaded")
-        time.sleep(3)
+        await PACER.goto(page, f"{INSTAGRAM_BASE_URL}/accounts/login/", wait_until="domcontentloaded")
         
-        if page.url.startswith("https://www.instagram.com") and "/accounts/login" not in page.url:
+        if page.url.startswith(INSTAGRAM_BASE_URL) and "/accounts/login" not in page.url:
             print("✅ Already logged in!\n")
             return
         
@@ -53,17 +286,14 @@ def login_instagram(page):
         ]
         
         username_field = None
-        for selector in username_selectors:
-            try:
-                page.wait_for_selector(selector, timeout=5000, state="visible")
-                username_field = selector
-                print(f"    ✓ Found username field")
-                break
-            except:
-                continue
+        try:
+            username_field = await SELECTORS.resolve(page, 'login.username', username_selectors, timeout=5000)
+            print(f"    ✓ Found username field")
+        except PlaywrightTimeout:
+            pass
         
         if not username_field:
-            page.screenshot(path="login_page_debug.png")
+            await page.screenshot(path="login_page_debug.png")
             raise Exception("Could not find username input field")
         
         password_selectors = [
@@ -73,30 +303,25 @@ def login_instagram(page):
         ]
         
         password_field = None
-        for selector in password_selectors:
-            try:
-                page.wait_for_selector(selector, timeout=5000, state="visible")
-                password_field = selector
-                print(f"    ✓ Found password field")
-                break
-            except:
-                continue
+        try:
+            password_field = await SELECTORS.resolve(page, 'login.password', password_selectors, timeout=5000)
+            print(f"    ✓ Found password field")
+        except PlaywrightTimeout:
+            pass
         
         if not password_field:
-            page.screenshot(path="login_page_debug.png")
+            await page.screenshot(path="login_page_debug.png")
             raise Exception("Could not find password input field")
         
         print("[+] Entering credentials...")
         for char in USERNAME:
-            page.type(username_field, char, delay=random.randint(50, 150))
-        time.sleep(random.uniform(0.5, 1.5))
+            await page.type(username_field, char, delay=random.randint(50, 150))
         
         for char in PASSWORD:
-            page.type(password_field, char, delay=random.randint(50, 150))
-        time.sleep(random.uniform(1, 2))
+            await page.type(password_field, char, delay=random.randint(50, 150))
         
         print("[+] Submitting login...")
-        page.press(password_field, "Enter")
+        await page.press(password_field, "Enter")
         
         print("[+] Waiting for login to complete...")
         
@@ -107,20 +332,17 @@ def login_instagram(page):
         ]
         
         success = False
-        for selector in success_selectors:
-            try:
-                page.wait_for_selector(selector, timeout=20000, state="visible")
-                success = True
-                break
-            except:
-                continue
+        try:
+            await SELECTORS.resolve(page, 'login.success', success_selectors, timeout=20000)
+            success = True
+        except PlaywrightTimeout:
+            pass
         
         if not success:
-            page.screenshot(path="login_failed_debug.png")
+            await page.screenshot(path="login_failed_debug.png")
             raise Exception("Login verification failed")
         
         print("✅ Login successful!\n")
-        time.sleep(2)
 
         print("[+] Handling popups...")
         popup_selectors = [
@@ -129,13 +351,12 @@ def login_instagram(page):
             "button:has-text('Save Info')",
         ]
         
-        for selector in popup_selectors:
+        # Dismiss popups as they appear, one at a time
+        for _ in popup_selectors:
             try:
-                page.wait_for_selector(selector, timeout=3000)
-                page.click(selector)
-                time.sleep(1)
-            except:
-                pass
+                await page.click(await SELECTORS.resolve(page, 'login.popup', popup_selectors, timeout=3000))
+            except Exception:
+                break
         
         print("✅ Ready to scrape!\n")
             
@@ -143,464 +364,861 @@ def login_instagram(page):
         print(f"❌ Login error: {e}")
         raise
 
-def discover_trending_hashtags_advanced(page):
+def load_session_state(path: str):
+    """Saved storage state if it still looks usable, otherwise None. No network."""
+    if not path:
+        return None
+    try:
+        if time.time() - os.path.getmtime(path) > SESSION_MAX_AGE_HOURS * 3600:
+            return None
+        with open(path, encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    
+    for cookie in state.get('cookies', []):
+        if cookie.get('name') == 'sessionid' and 'instagram.com' in cookie.get('domain', ''):
+            expires = cookie.get('expires', -1)
+            if expires == -1 or expires > time.time():
+                return state
+    return None
+
+async def save_session_state(context, path: str):
+    """Write the context's cookies and storage atomically for the next run ('' = don't)."""
+    if not path:
+        return
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + '.tmp'
+    await context.storage_state(path=tmp_path)
+    os.replace(tmp_path, path)
+
+async def session_is_valid(context) -> bool:
+    """Cheap live check: a logged-in session can open account settings without a redirect."""
+    try:
+        response = await context.request.get(f"{INSTAGRAM_BASE_URL}/accounts/edit/", max_redirects=0, timeout=10000)
+        return response.status == 200
+    except Exception:
+        return False
+
+# Common/generic hashtags that say nothing about a trend
+EXCLUDED_HASHTAGS = {
+    'love', 'instagood', 'instagram', 'follow', 'like', 'photooftheday',
+    'fashion', 'beautiful', 'happy', 'cute', 'followme', 'picoftheday',
+    'art', 'photography', 'reels', 'reel', 'viral', 'trending', 'explore',
+    'style', 'instadaily', 'nature', 'travel', 'followforfollowback'
+}
+
+def rank_hashtags(pending: Counter = None, limit: int = None, boost: Counter = None) -> list:
+    """Top hashtags by trend (decayed history plus `pending` counts not merged yet), without the generic ones."""
+    return TRENDS.rank(limit or TOP_HASHTAGS_TO_DISCOVER, exclude=EXCLUDED_HASHTAGS, min_score=MIN_HASHTAG_FREQUENCY,
+                       pending=pending, boost=boost)
+
+async def run_on_background_pages(context, jobs: list, worker, size: int = None) -> list:
+    """`await worker(page, job)` for every job, on up to `size` (ANALYSIS_CONCURRENCY) extra pages at once.
+
+    Results (or the exception a job raised) come back in job order. The
+    pages are recycled like any other and closed when all jobs are done.
+    """
+    size = size or ANALYSIS_CONCURRENCY
+    slots = asyncio.Queue()
+    for _ in range(max(1, min(size, len(jobs)))):
+        slots.put_nowait(PageSlot(await RECYCLER.new_page(context), RECYCLER))
+
+    async def run(job):
+        slot = await slots.get()
+        try:
+            return await worker(await slot.ready(), job)
+        finally:
+            slots.put_nowait(slot)
+
+    try:
+        return await asyncio.gather(*(run(job) for job in jobs), return_exceptions=True)
+    finally:
+        while not slots.empty():
+            await slots.get_nowait().page.close()
+
+async def discover_trending_hashtags_advanced(page, cache: PostCache = None, emit=None):
     """
     Advanced hashtag discovery from multiple sources:
     1. Home feed posts
     2. Post captions
-    3. Search suggestions
+    3. Related hashtags of the leaders, from the co-occurrence index
+       (popular topic pages while the index knows none of them)
+
+    The home feed is loaded once and never left: caption samples are
+    fetched on background pages in parallel and the topic pages load
+    concurrently when they are needed. Each post counts once per run, so a post on both the
+    feed and a topic page adds its alt-text hashtags only once.
+
+    Hashtags are ranked by TRENDS: this run's counts on top of the decayed
+    counts of earlier runs, plus their growth. The counts are merged into
+    the store once discovery is done. Related hashtags from method 3 are
+    guesses, not sightings: they only boost this run's ranking and are
+    never merged.
+
+    With `emit`, hashtags are streamed out as discovery goes: after each
+    method the current leaders are emitted (a third of the final count per
+    method), and the rest once the final ranking is known. Each hashtag is
+    emitted once, TOP_HASHTAGS_TO_DISCOVER at most.
     """
     print("[+] Discovering trending hashtags (Advanced Method)...\n")
     
     hashtag_counter = Counter()
+    # Related-tag boosts for this run's ranking only (see method 3)
+    related_boost = Counter()
+    emitted = []
+    
+    async def emit_ranked(quota: int, pending: Counter = hashtag_counter) -> list:
+        ranking = rank_hashtags(pending, boost=related_boost)
+        if emit:
+            for tag in ranking:
+                if len(emitted) >= quota:
+                    break
+                if tag not in emitted:
+                    emitted.append(tag)
+                    await emit(tag)
+        return ranking
+    
+    # Each post is counted once per run, whichever method reaches it first
+    seen_posts = set()
+    started = time.monotonic()
+    navigations_before = PACER.navigations
+
+    def count_alt_tags(posts: list) -> int:
+        """Alt-text hashtags (+1) of posts not counted yet; returns how many posts were new."""
+        new = 0
+        for post in posts:
+            key = shortcode_from_url(post['url']) or post['url']
+            if key in seen_posts:
+                RUN_STATS['discovery_duplicates_skipped'] += 1
+                continue
+            seen_posts.add(key)
+            new += 1
+            tags = extract_hashtags(post['alt'])
+            COOCCURRENCE.add(tags)
+            for tag in tags:
+                hashtag_counter[tag] += 1
+        return new
     
     # METHOD 1: Home Feed
-    try:
-        print("    [1/3] Scanning Home feed...")
-        page.goto("https://www.instagram.com/", wait_until="domcontentloaded")
-        time.sleep(random.uniform(3, 5))
-        
-        # Wait for feed to load
+    feed_posts = []
+    with PROFILER.span('discovery.feed'):
         try:
-            page.wait_for_selector("article", timeout=10000)
-        except:
-            page.wait_for_selector("img", timeout=10000)
+            print("    [1/3] Scanning Home feed...")
+            page = await RECYCLER.fresh(page)
+            await PACER.goto(page, f"{INSTAGRAM_BASE_URL}/", wait_until="domcontentloaded")
         
-        # Scroll to load more posts
-        for i in range(10):
-            page.evaluate("window.scrollBy(0, 800)")
-            time.sleep(random.uniform(1.5, 2.5))
+            # Wait for feed to load
+            await SELECTORS.resolve(page, 'feed.ready', ["article", "img"], timeout=10000)
         
-        # Get all post links from feed
-        post_links = page.locator("a[href*='/p/']").all()[:50]
+            # Scroll to load more posts, moving on as soon as new ones render
+            for i in range(10):
+                link_count = await page.evaluate(SCROLL_JS)
+                try:
+                    await page.wait_for_function(MORE_LINKS_JS, arg=link_count, timeout=2500)
+                except PlaywrightTimeout:
+                    pass
         
-        print(f"        Found {len(post_links)} posts in feed")
+            # Get all post links from feed
+            feed_posts = (await extract_page_data(page, link_limit=50))['posts']
         
-        for post_link in post_links:
-            try:
-                # Get hashtags from alt text
-                img = post_link.locator('img').first
-                alt_text = img.get_attribute('alt') or ""
-                hashtags = re.findall(r'#(\w+)', alt_text)
-                
-                for tag in hashtags:
-                    if 3 <= len(tag) <= 30:
-                        clean_tag = tag.lower().strip()
-                        hashtag_counter[clean_tag] += 1
-                            
-            except:
-                continue
+            print(f"        Found {len(feed_posts)} posts in feed")
         
-        print(f"        ✓ Found {len(hashtag_counter)} hashtags from alt text")
+            # Get hashtags from alt text
+            count_alt_tags(feed_posts)
         
-    except Exception as e:
-        print(f"        ⚠️  Home feed error: {str(e)[:60]}")
-    
-    # METHOD 2: Click on posts to extract hashtags from captions
-    try:
-        print("    [2/3] Extracting hashtags from post captions...")
+            print(f"        ✓ Found {len(hashtag_counter)} hashtags from alt text")
         
-        # Go back to home if not already there
-        current_url = page.url
-        if "/p/" not in current_url and "instagram.com" in current_url:
-            page.goto("https://www.instagram.com/", wait_until="domcontentloaded")
-            time.sleep(2)
+        except Exception as e:
+            print(f"        ⚠️  Home feed error: {str(e)[:60]}")
+    
+    await emit_ranked(TOP_HASHTAGS_TO_DISCOVER * 1 // 3)
+    
+    # METHOD 2: Open sampled posts to extract hashtags from captions
+    with PROFILER.span('discovery.captions'):
+        try:
+            print("    [2/3] Extracting hashtags from post captions...")
         
-        # Get post links
-        post_links = page.locator("a[href*='/p/']").all()[:25]
+            # Sample from the top of the feed already extracted; the feed page itself stays put
+            post_links = list(dict.fromkeys(post['url'] for post in feed_posts[:25]))
         
-        if len(post_links) == 0:
-            print(f"        ⚠️  No posts found to extract captions from")
-        else:
-            # Sample random posts
-            sample_size = min(12, len(post_links))
-            sample_posts = random.sample(post_links, sample_size)
+            if len(post_links) == 0:
+                print(f"        ⚠️  No posts found to extract captions from")
+            else:
+                # Sample random posts
+                sample_size = min(12, len(post_links))
+                sample_posts = random.sample(post_links, sample_size)
             
-            print(f"        Sampling {sample_size} posts for captions...")
+                print(f"        Sampling {sample_size} posts for captions on background pages...")
             
-            for idx, post_el in enumerate(sample_posts):
-                try:
-                    post_url = post_el.get_attribute('href')
-                    
-                    # Navigate to post
-                    page.goto(f"https://www.instagram.com{post_url}", wait_until="domcontentloaded")
-                    time.sleep(random.uniform(2, 3))
-                    
-                    # Try to find caption text with multiple methods
-                    caption_text = ""
-                    
-                    # Method 1: Look for spans with dir attribute
-                    try:
-                        spans = page.locator("span[dir='auto']").all()
-                        for span in spans[:5]:
-                            text = span.inner_text()
-                            if '#' in text and len(text) > 10:
-                                caption_text = text
-                                break
-                    except:
-                        pass
-                    
-                    # Method 2: Look for h1 sibling divs
-                    if not caption_text:
-                        try:
-                            divs = page.locator("h1 ~ div span").all()
-                            for div in divs[:3]:
-                                text = div.inner_text()
-                                if '#' in text:
-                                    caption_text = text
-                                    break
-                        except:
-                            pass
-                    
+                async def read_caption(page, post_url):
+                    # Cached posts need no navigation; fetched ones are cached for analysis
+                    return await fetch_post(page, post_url, cache, backend=DISCOVERY_FETCH_BACKEND)
+            
+                posts = await run_on_background_pages(page.context, sample_posts, read_caption)
+                for post in posts:
+                    if isinstance(post, Exception):
+                        continue
                     # Extract hashtags from caption
-                    if caption_text and '#' in caption_text:
-                        hashtags = re.findall(r'#(\w+)', caption_text)
-                        for tag in hashtags:
-                            if 3 <= len(tag) <= 30:
-                                clean_tag = tag.lower().strip()
-                                hashtag_counter[clean_tag] += 3  # Weight caption hashtags higher
-                    
-                    # Go back to home
-                    page.goto("https://www.instagram.com/", wait_until="domcontentloaded")
-                    time.sleep(random.uniform(1, 2))
-                    
-                except Exception as e:
-                    continue
+                    tags = extract_hashtags(post['caption'])
+                    COOCCURRENCE.add(tags)
+                    for tag in tags:
+                        hashtag_counter[tag] += 3  # Weight caption hashtags higher
             
-            print(f"        ✓ Extracted hashtags from {sample_size} captions")
+                print(f"        ✓ Extracted hashtags from {sample_size} captions")
         
-    except Exception as e:
-        print(f"        ⚠️  Caption extraction error: {str(e)[:60]}")
+        except Exception as e:
+            print(f"        ⚠️  Caption extraction error: {str(e)[:60]}")
     
-    # METHOD 3: Search for trending topics and popular hashtags
-    try:
-        print("    [3/3] Checking popular hashtags directly...")
+    await emit_ranked(TOP_HASHTAGS_TO_DISCOVER * 2 // 3)
+    
+    # METHOD 3: Expand the leaders with hashtags seen alongside them
+    with PROFILER.span('discovery.related'):
+        try:
+            print("    [3/3] Expanding leading hashtags with related ones...")
         
-        # Try visiting some popular/trending topic pages directly
-        trending_topics = ['today', 'new', 'trending', 'latest']
+            leaders = rank_hashtags(hashtag_counter)
+            related = {
+                tag: COOCCURRENCE.related(tag, RELATED_TAGS_PER_HASHTAG)
+                for tag in leaders
+            } if RELATED_TAGS_PER_HASHTAG else {}
         
-        for topic in trending_topics:
-            try:
-                page.goto(f"https://www.instagram.com/explore/tags/{topic}/", wait_until="domcontentloaded")
-                time.sleep(random.uniform(2, 3))
-                
-                # Get related hashtags or posts
-                post_links = page.locator("a[href*='/p/']").all()[:15]
-                
-                for post_link in post_links:
-                    try:
-                        img = post_link.locator('img').first
-                        alt_text = img.get_attribute('alt') or ""
-                        hashtags = re.findall(r'#(\w+)', alt_text)
-                        
-                        for tag in hashtags:
-                            if 3 <= len(tag) <= 30:
-                                hashtag_counter[tag.lower()] += 1
-                    except:
-                        continue
-                        
-            except:
-                continue
+            if any(related.values()):
+                # Each leader a tag is related to weighs like one alt-text sighting,
+                # in this ranking only
+                for tag, neighbors in related.items():
+                    for other, _ in neighbors:
+                        related_boost[other] += 1
+                expanded = {other for neighbors in related.values() for other, _ in neighbors}
+                RUN_STATS['discovery_related_tags'] += len(expanded)
+                print(f"        ✓ {len(expanded)} related hashtags for {len(leaders)} leaders from the index, no page loads")
+            else:
+                # Nothing indexed yet for these leaders: visit the topic pages instead
+                trending_topics = ['today', 'new', 'trending', 'latest']
+        
+                async def read_topic(page, topic):
+                    await PACER.goto(page, f"{INSTAGRAM_BASE_URL}/explore/tags/{topic}/", wait_until="domcontentloaded")
+                    await wait_for_selector(page, "a[href*='/p/']", timeout=10000)
+                    return (await extract_page_data(page, link_limit=15))['posts']
         
-        print(f"        ✓ Checked popular topic pages")
+                topic_pages = await run_on_background_pages(page.context, trending_topics, read_topic,
+                                                            size=len(trending_topics))
+                # Counted in topic order, so ties in the ranking come out as before
+                for posts in topic_pages:
+                    if not isinstance(posts, Exception):
+                        count_alt_tags(posts)
+        
+                print("        ✓ No related hashtags indexed yet, checked popular topic pages")
             
-    except Exception as e:
-        print(f"        ⚠️  Popular topics error: {str(e)[:60]}")
-    
-    # Filter and rank hashtags
-    print(f"\n    Processing {len(hashtag_counter)} unique hashtags...")
-    
-    # Exclude common/generic hashtags
-    exclude_list = {
-        'love', 'instagood', 'instagram', 'follow', 'like', 'photooftheday',
-        'fashion', 'beautiful', 'happy', 'cute', 'followme', 'picoftheday',
-        'art', 'photography', 'reels', 'reel', 'viral', 'trending', 'explore',
-        'style', 'instadaily', 'nature', 'travel', 'followforfollowback'
-    }
+        except Exception as e:
+            print(f"        ⚠️  Related hashtags error: {str(e)[:60]}")
     
-    # Get top hashtags with smart filtering
-    filtered_hashtags = []
-    for tag, count in hashtag_counter.most_common(100):
-        if tag not in exclude_list and count >= MIN_HASHTAG_FREQUENCY:
-            filtered_hashtags.append((tag, count))
+    RUN_STATS['discovery_navigations'] += PACER.navigations - navigations_before
+    RUN_STATS['discovery_seconds'] += time.monotonic() - started
+    print(f"\n    Discovery: {PACER.navigations - navigations_before} navigation(s) in {time.monotonic() - started:.1f}s, "
+          f"{len(seen_posts)} unique post(s), {RUN_STATS['discovery_duplicates_skipped']} duplicate(s) skipped")
     
-    # Take top N
-    top_hashtags = [tag for tag, count in filtered_hashtags[:TOP_HASHTAGS_TO_DISCOVER]]
+    print(f"\n    Processing {len(hashtag_counter)} unique hashtags...")
+    # This run's observed counts join the decayed history; ranking now comes from the
+    # store plus the related-tag boosts
+    new_tags = TRENDS.merge(hashtag_counter, run_id=VERSION_ID)
+    print(f"    Merged into {len(TRENDS.tags)} tracked hashtags ({new_tags} new)")
+    top_hashtags = await emit_ranked(TOP_HASHTAGS_TO_DISCOVER, pending=None)
     
     if top_hashtags:
         print(f"\n✅ Found {len(top_hashtags)} TRENDING hashtags!\n")
-        print("    Rank | Hashtag                   | Frequency")
-        print("    " + "─" * 50)
+        print("    Rank | Hashtag                   | This run | Score  | Growth/h")
+        print("    " + "─" * 64)
         for i, tag in enumerate(top_hashtags, 1):
-            print(f"    #{i:2d}  | #{tag:25s} | {hashtag_counter[tag]:2d}x")
+            trend = TRENDS.describe(tag)
+            print(f"    #{i:2d}  | #{tag:25s} | {hashtag_counter[tag]:7d}x | {trend['score']:6.1f} | {trend['velocity']:+8.2f}")
     else:
         print("    ⚠️  No hashtags found. Try running again or check filters.")
     
     return top_hashtags
 
-def get_post_engagement(page, post_url):
-    """Extract real engagement metrics from a post."""
+async def read_embedded_post(page, post_url: str):
+    """Post data the server rendered into the page (embedded JSON or og:description), or None.
+
+    The HTML is parsed on a worker thread so other pages keep running meanwhile.
+    """
     try:
-        full_url = f"https://www.instagram.com{post_url}" if not post_url.startswith('http') else post_url
-        page.goto(full_url)
-        page.wait_for_selector("section", timeout=10000)
-        time.sleep(random.uniform(2, 3))
+        html = await page.content()
+        return await asyncio.to_thread(parse_post_html, html, shortcode_from_url(post_url))
+    except Exception:
+        return None
+
+async def get_post_engagement(page, post_url, acquired: bool = False):
+    """Extract real engagement metrics from a post.
+
+    The post's JSON is preferred: a response that already arrived, then the
+    JSON embedded in the page, then a response arriving within
+    JSON_RESPONSE_TIMEOUT. Counts from the page's meta tags or DOM are used
+    otherwise. 'source' records which path was used: 'json', 'dom' or
+    'estimated' (zero counts when nothing could be read; never made up).
+    acquired=True navigates in a pacing slot the caller already holds.
+    """
+    watcher = PostResponseWatcher(shortcode_from_url(post_url))
+    watcher.attach(page)
+    try:
+        full_url = f"{INSTAGRAM_BASE_URL}{post_url}" if not post_url.startswith('http') else post_url
+        await PACER.goto(page, full_url, acquired=acquired, wait_until="domcontentloaded")
         
         engagement_data = {
             'likes': 0,
             'comments': 0,
-            'total_engagement': 0
+            'total_engagement': 0,
+            'caption': "",
+            'source': 'json'
         }
         
-        # Try to find likes
-        like_selectors = [
-            "section button span",
-            "a[href*='/liked_by/']",
-            "span:has-text('like')",
-        ]
-        
-        for selector in like_selectors:
-            try:
-                elements = page.locator(selector).all()
-                for el in elements:
-                    text = el.inner_text().lower()
-                    if 'like' in text or text.replace(',', '').isdigit():
-                        numbers = re.findall(r'[\d,]+', text.replace(',', ''))
-                        if numbers:
-                            engagement_data['likes'] = int(numbers[0])
-                            break
-                if engagement_data['likes'] > 0:
-                    break
-            except:
-                continue
-        
-        # Try to find comments
-        try:
-            comment_elements = page.locator("ul li[role='menuitem']").count()
-            if comment_elements > 0:
-                engagement_data['comments'] = comment_elements
-        except:
-            pass
+        # Pages that carry their data need no wait for the network response
+        post_json = watcher.result.result() if watcher.result.done() else None
+        if post_json is None:
+            with PROFILER.span('post.embedded'):
+                post_json = await read_embedded_post(page, post_url)
+            if post_json and post_json.pop('parser') == 'meta':
+                engagement_data['source'] = 'dom'
+        if post_json is None:
+            with PROFILER.span('post.json_wait'):
+                post_json = await watcher.wait(JSON_RESPONSE_TIMEOUT)
+        scraped_dom = not post_json
+        if post_json:
+            engagement_data.update(post_json)
+        else:
+            with PROFILER.span('post.dom'):
+                engagement_data['source'] = 'dom'
+                await wait_for_selector(page, "section", timeout=10000)
+                try:
+                    # Counts render after the frame; wait for them rather than sleeping
+                    await wait_for_selector(page, "section button span, a[href*='/liked_by/']", timeout=3000)
+                except PlaywrightTimeout:
+                    pass
+            
+                record = await extract_page_data(page, link_limit=0)
+                engagement_data['likes'] = parse_like_count(record)
+                engagement_data['comments'] = record['comment_count']
+                engagement_data['caption'] = pick_caption(record)
         
         engagement_data['total_engagement'] = engagement_data['likes'] + engagement_data['comments']
         
-        if engagement_data['total_engagement'] == 0:
-            engagement_data['likes'] = random.randint(500, 5000)
-            engagement_data['comments'] = random.randint(10, 200)
-            engagement_data['total_engagement'] = engagement_data['likes'] + engagement_data['comments']
+        # No counts found in the DOM usually means the scrape failed, not an unseen post
+        if engagement_data['total_engagement'] == 0 and scraped_dom:
+            engagement_data['source'] = 'estimated'
         
+        RUN_STATS[f"engagement_{engagement_data['source']}"] += 1
         return engagement_data
         
-    except Exception as e:
+    except Exception:
+        RUN_STATS['engagement_estimated'] += 1
         return {
-            'likes': random.randint(500, 5000),
-            'comments': random.randint(10, 200),
-            'total_engagement': random.randint(510, 5200)
+            'likes': 0,
+            'comments': 0,
+            'total_engagement': 0,
+            'caption': "",
+            'source': 'estimated'
         }
+    finally:
+        watcher.detach()
 
-def save_to_supabase(supabase: Client, data: dict):
-    """Save data to instagram table."""
-    try:
-        payload = {
-            "platform": data["platform"],
-            "topic_hashtag": data["topic_hashtag"],
-            "engagement_score": data["engagement_score"],
-            "sentiment_polarity": data["sentiment_polarity"],
-            "sentiment_label": data["sentiment_label"],
-            "posts": data["posts"],
-            "views": data["views"],
-            "metadata": data["metadata"],
-            "scraped_at": data["scraped_at"],
-            "version_id": data["version_id"]
-        }
-        
-        print(f"    Saving {payload['topic_hashtag']}...")
-        
-        result = supabase.table('instagram').insert(payload).execute()
-        
-        print(f"    ✅ Saved successfully!")
+class RequestBudget:
+    """Navigation budget shared by every analysis page in a run."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+
+    @property
+    def exhausted(self) -> bool:
+        return bool(self.limit) and self.used >= self.limit
+
+    def take(self) -> bool:
+        """Reserve one navigation. Returns False once the budget is spent."""
+        if self.exhausted:
+            return False
+        self.used += 1
         return True
-        
-    except Exception as e:
-        error_msg = str(e)
-        print(f"    ❌ Save failed: {error_msg}")
-        return False
 
-def analyze_and_store_hashtags(page, supabase: Client, hashtags: list):
-    """Analyze hashtags with REAL engagement data and save to database."""
+async def get_post_engagement_http(post_url: str):
+    """Engagement from the post page's HTML over HTTP, or None to use the browser."""
+    await PACER.acquire()
+    PROFILER.count('http_requests')
+    with PROFILER.span('post.http'):
+        data = await HTTP.fetch_post_async(post_url)
+    if data is None:
+        RUN_STATS['http_fallbacks'] += 1
+        return None
+    data['total_engagement'] = data['likes'] + data['comments']
+    data['source'] = 'http'
+    RUN_STATS['engagement_http'] += 1
+    return data
+
+async def fetch_post(page, post_url: str, cache: PostCache = None, lookup: bool = True, backend: str = 'browser') -> dict:
+    """Engagement for a post: from the cache when fresh, otherwise scraped and cached.
+
+    backend='http' tries a plain HTTP fetch first and only navigates `page`
+    when that cannot extract the post, in the pacing slot the HTTP fetch took.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown fetch backend '{backend}' (choose from {', '.join(BACKENDS)})")
+    if cache and lookup:
+        cached = cache.get(post_url)
+        if cached:
+            RUN_STATS['engagement_cache'] += 1
+            return cached
+    with PROFILER.span('post.fetch'):
+        engagement = await get_post_engagement_http(post_url) if backend == 'http' else None
+        if engagement is None:
+            engagement = await get_post_engagement(page, post_url, acquired=backend == 'http')
+    if cache:
+        cache.put(post_url, engagement)
+    return engagement
+
+def build_analysis_data(columns: 'PostColumns') -> list:
+    """Aggregate per-post columns into one instagram-table row per hashtag."""
+    from post_archive import aggregate_posts, analysis_rows
+    rows = analysis_rows(aggregate_posts(columns.frame()), VERSION_ID)
+    for row in rows:
+        metadata = row['metadata']
+        print(f"\n    📊 Summary for {row['topic_hashtag']}:")
+        print(f"       Posts: {row['posts']} | Avg Engagement: {row['engagement_score']:,.0f}")
+        print(f"       Likes: {metadata['total_likes']:,} | Comments: {metadata['total_comments']:,}")
+        print(f"       Sentiment: {row['sentiment_label']} ({row['sentiment_polarity']:.2f})")
+    return rows
+
+async def harvest_tag_posts(page, hashtag: str, budget: RequestBudget, limit: int = None):
+    """Load a tag page once and capture its post links as plain data.
+
+    Returns a list of up to `limit` (POSTS_TO_ANALYZE_PER_HASHTAG) {'url', 'alt'}
+    dicts, or None when the budget is spent.
+    Nothing returned holds a locator, so the grid never has to be reloaded.
+    With DEEP_HARVEST_POSTS set, the grid is scrolled for that many posts.
+    """
+    if not budget.take():
+        print(f"    ⚠️  #{hashtag}: request budget spent, skipping")
+        return None
+
+    await PACER.goto(page, f"{INSTAGRAM_BASE_URL}/explore/tags/{hashtag}/", wait_until="domcontentloaded")
+    await wait_for_selector(page, "a[href*='/p/']", timeout=15000)
+
+    if DEEP_HARVEST_POSTS:
+        harvested, stats = await deep_harvest(page, DEEP_HARVEST_POSTS, DEEP_HARVEST_SECONDS)
+        RUN_STATS['deep_harvest_posts'] += len(harvested)
+        print(f"    #{hashtag}: harvested {len(harvested)} post links in {stats['seconds']:.1f}s "
+              f"({stats['posts_per_second']:.1f} posts/s, {stats['steps']} scrolls, "
+              f"JS heap peak {stats['js_heap_peak'] / 1_000_000:.1f} MB)")
+        return harvested
+
+    harvested = (await extract_page_data(page, link_limit=limit or POSTS_TO_ANALYZE_PER_HASHTAG))['posts']
+
+    print(f"    #{hashtag}: harvested {len(harvested)} post links")
+    return harvested
+
+def post_record(post: dict, engagement: dict) -> dict:
+    """Per-post record used for scoring and aggregation."""
+    return {
+        'url': post['url'],
+        'alt': post['alt'],
+        'engagement': engagement['total_engagement'],
+        'likes': engagement['likes'],
+        'comments': engagement['comments'],
+        # Cached posts may already carry a score; the rest are scored in batches
+        'sentiment_polarity': engagement.get('sentiment_polarity'),
+        'sentiment_subjectivity': engagement.get('sentiment_subjectivity'),
+        'caption': engagement['caption'],
+        'engagement_source': engagement['source']
+    }
+
+async def run_pipeline(context, writer: SupabaseWriter, cache: PostCache = None, discovery_page=None,
+                       hashtags: list = None, concurrency: int = None,
+                       checkpoint: RunCheckpoint = None, budget: RequestBudget = None) -> list:
+    """Discover, fetch, score and save hashtags as one streaming pipeline.
+
+    Stages are joined by bounded queues (hashtags -> post URLs -> raw records
+    -> scored records -> rows), so the first hashtags are analyzed while
+    discovery is still running on `discovery_page` and rows are saved while
+    later posts are scraped. Pass `hashtags` instead to analyze a fixed list.
+    With a `checkpoint`, progress is recorded as it happens and whatever an
+    interrupted run already finished is skipped. `budget` defaults to a fresh
+    ANALYSIS_REQUEST_BUDGET (sharded workers pass one shared across processes).
+    Returns the hashtags that went into the pipeline.
+    """
+    concurrency = max(1, concurrency or ANALYSIS_CONCURRENCY)
+    # pandas comes in with the first stage that aggregates, not at startup
+    from post_archive import PostColumns
+    budget = budget or RequestBudget(ANALYSIS_REQUEST_BUDGET)
+    started = time.monotonic()
+
     print(f"\n{'='*70}")
-    print(f"🚀 ANALYZING {len(hashtags)} HASHTAGS")
+    print(f"🚀 STREAMING ANALYSIS ({concurrency} page(s) fetching posts in parallel)")
     print(f"📋 Version ID: {VERSION_ID}")
     print(f"{'='*70}\n")
 
-    successful = 0
-    failed = 0
+    pipe = Pipeline(monitor_interval=PIPELINE_MONITOR_INTERVAL)
+    tag_queue = pipe.queue('hashtags', TOP_HASHTAGS_TO_DISCOVER)
+    url_queue = pipe.queue('post_urls', PIPELINE_QUEUE_SIZE)
+    raw_queue = pipe.queue('raw', PIPELINE_QUEUE_SIZE)
+    scored_queue = pipe.queue('scored', PIPELINE_QUEUE_SIZE)
+    row_queue = pipe.queue('rows', PIPELINE_QUEUE_SIZE)
 
-    for i, hashtag in enumerate(hashtags):
-        print(f"\n[{i+1}/{len(hashtags)}] Analyzing #{hashtag}")
+    queued = []
+    saved = []
+    # Every scored post of the run, archived once the pipeline is done
+    run_columns = PostColumns()
+    # hashtag -> posts expected, posts seen so far and the records collected
+    pending = {}
+
+    async def produce():
+        async def emit(hashtag):
+            if hashtag in queued or (checkpoint and checkpoint.done(hashtag)):
+                return
+            queued.append(hashtag)
+            if checkpoint:
+                checkpoint.add_hashtag(hashtag)
+            await tag_queue.put((len(queued) - 1, hashtag))
+
+        async def discovered(hashtag):
+            # Hashtags resumed from the checkpoint count towards the total
+            if not checkpoint or len(checkpoint.state['hashtags']) < TOP_HASHTAGS_TO_DISCOVER:
+                await emit(hashtag)
+
+        if checkpoint:
+            # Whatever the interrupted run had queued but not finished goes first
+            for hashtag in checkpoint.remaining_hashtags():
+                await emit(hashtag)
+        if hashtags is not None:
+            for hashtag in hashtags:
+                await emit(hashtag)
+        elif checkpoint and checkpoint.discovery_complete:
+            print("[+] Discovery finished in the interrupted run, skipping it")
+        else:
+            with PROFILER.span('discovery'):
+                await discover_trending_hashtags_advanced(discovery_page, cache, emit=discovered)
+            if checkpoint:
+                checkpoint.finish_discovery()
+
+    async def harvest(item, slot):
+        i, hashtag = item
+        print(f"\n[{i+1}] Analyzing #{hashtag}")
         print("─" * 50)
-        
-        try:
-            page.goto(f"https://www.instagram.com/explore/tags/{hashtag}/")
-            page.wait_for_selector("a[href*='/p/']", timeout=15000)
-            time.sleep(random.uniform(3, 5))
-            
-            posts_data = []
-            post_elements = page.locator("a[href*='/p/']").all()[:POSTS_TO_ANALYZE_PER_HASHTAG]
+        posts = checkpoint.harvested(hashtag) if checkpoint else None
+        if posts:
+            print(f"    #{hashtag}: {len(posts)} post links restored from checkpoint")
+        else:
+            with PROFILER.span('analysis.harvest'):
+                posts = await harvest_tag_posts(await slot.ready(), hashtag, budget)
+            if posts and checkpoint:
+                checkpoint.set_harvested(hashtag, posts)
+        if not posts:
+            print(f"    ⚠️  #{hashtag}: no posts harvested")
+            return []
+        pending[hashtag] = {
+            'expected': len(posts),
+            'seen': 0,
+            'records': [],
+            # Posts the interrupted run already scraped and scored
+            'resumed': checkpoint.records(hashtag) if checkpoint else {},
+        }
+        return [(hashtag, idx, post) for idx, post in enumerate(posts)]
 
-            print(f"    Collecting data from {len(post_elements)} posts...")
-            
-            for idx, post_el in enumerate(post_elements):
-                try:
-                    post_url = post_el.get_attribute('href')
-                    img = post_el.locator('img').first
-                    alt_text = img.get_attribute('alt') or ""
-                    
-                    print(f"      [{idx+1}/{len(post_elements)}] Getting engagement data...")
-                    engagement = get_post_engagement(page, post_url)
-                    
-                    sentiment = TextBlob(alt_text).sentiment
-                    
-                    posts_data.append({
-                        'url': post_url,
-                        'engagement': engagement['total_engagement'],
-                        'likes': engagement['likes'],
-                        'comments': engagement['comments'],
-                        'sentiment_polarity': sentiment.polarity,
-                        'sentiment_subjectivity': sentiment.subjectivity
-                    })
-                    
-                    print(f"      ✓ Likes: {engagement['likes']:,} | Comments: {engagement['comments']:,}")
-                    
-                    page.goto(f"https://www.instagram.com/explore/tags/{hashtag}/")
-                    page.wait_for_selector("a[href*='/p/']", timeout=10000)
-                    time.sleep(random.uniform(2, 3))
-                    
-                except Exception as e:
-                    print(f"      ⚠️  Skipped post: {str(e)[:50]}")
-                    continue
-            
-            if not posts_data:
-                print("    ⚠️  No data collected")
-                failed += 1
-                continue
+    async def fetch(item, slot):
+        hashtag, idx, post = item
+        if idx in pending[hashtag]['resumed']:
+            RUN_STATS['posts_resumed'] += 1
+            return [(hashtag, idx, pending[hashtag]['resumed'][idx])]
+        engagement = cache.get(post['url']) if cache else None
+        if engagement:
+            RUN_STATS['engagement_cache'] += 1
+        elif not budget.take():
+            print(f"      ⚠️  #{hashtag}: request budget spent, skipping post {idx+1}")
+            return [(hashtag, idx, None)]
+        else:
+            print(f"      [#{hashtag} {idx+1}/{pending[hashtag]['expected']}] Getting engagement data...")
+            with PROFILER.span('analysis.visit'):
+                engagement = await fetch_post(await slot.ready(), post['url'], cache, lookup=False, backend=ANALYSIS_FETCH_BACKEND)
+            # The old loop reloaded the tag grid after every post
+            RUN_STATS['navigations_saved'] += 1
+        print(f"      ✓ #{hashtag} Likes: {engagement['likes']:,} | Comments: {engagement['comments']:,} ({engagement['source']})")
+        record = post_record(post, engagement)
+        if checkpoint:
+            # Recorded before it waits for scoring, so a resume never fetches it again;
+            # a copy, since sentiment is scored again on resume anyway
+            checkpoint.add_record(hashtag, idx, dict(record))
+        return [(hashtag, idx, record)]
 
-            total_eng = sum(p['engagement'] for p in posts_data)
-            avg_eng = total_eng / len(posts_data)
-            avg_pol = sum(p['sentiment_polarity'] for p in posts_data) / len(posts_data)
-            
-            sentiment_label = "positive" if avg_pol > 0.1 else "negative" if avg_pol < -0.05 else "neutral"
-            
-            sentiment_counts = Counter(
-                "positive" if p['sentiment_polarity'] > 0.1 
-                else "negative" if p['sentiment_polarity'] < -0.05 
-                else "neutral" 
-                for p in posts_data
-            )
-            
-            top_post = max(posts_data, key=lambda p: p['engagement'])
+    async def score(batch, _):
+        unscored = [record for _, _, record in batch if record and record['sentiment_polarity'] is None]
+        if unscored:
+            with PROFILER.span('sentiment'):
+                scores = await SENTIMENT.score_many_async([record['alt'] for record in unscored])
+            for record, (polarity, subjectivity) in zip(unscored, scores):
+                record['sentiment_polarity'], record['sentiment_subjectivity'] = polarity, subjectivity
+                if cache:
+                    cache.set_sentiment(record['url'], polarity, subjectivity)
+        return batch
 
-            print(f"\n    📊 Summary:")
-            print(f"       Posts: {len(posts_data)} | Avg Engagement: {avg_eng:,.0f}")
-            print(f"       Likes: {sum(p['likes'] for p in posts_data):,} | Comments: {sum(p['comments'] for p in posts_data):,}")
-            print(f"       Sentiment: {sentiment_label} ({avg_pol:.2f})")
-            
-            analysis_data = {
-                "platform": "Instagram",
-                "topic_hashtag": f"#{hashtag}",
-                "engagement_score": avg_eng,
-                "sentiment_polarity": avg_pol,
-                "sentiment_label": sentiment_label,
-                "posts": len(posts_data),
-                "views": None,
-                "metadata": {
-                    "positive_posts": sentiment_counts['positive'],
-                    "negative_posts": sentiment_counts['negative'],
-                    "neutral_posts": sentiment_counts['neutral'],
-                    "top_post_url": f"https://www.instagram.com{top_post['url']}",
-                    "top_post_engagement": top_post['engagement'],
-                    "top_post_likes": top_post['likes'],
-                    "top_post_comments": top_post['comments'],
-                    "total_engagement": total_eng,
-                    "total_likes": sum(p['likes'] for p in posts_data),
-                    "total_comments": sum(p['comments'] for p in posts_data),
-                    "avg_likes": sum(p['likes'] for p in posts_data) / len(posts_data),
-                    "avg_comments": sum(p['comments'] for p in posts_data) / len(posts_data)
-                },
-                "scraped_at": datetime.utcnow().isoformat(),
-                "version_id": VERSION_ID
-            }
-
-            if save_to_supabase(supabase, analysis_data):
-                successful += 1
-            else:
-                failed += 1
+    async def aggregate(item, _):
+        hashtag, idx, record = item
+        entry = pending[hashtag]
+        entry['seen'] += 1
+        if record:
+            entry['records'].append((idx, record))
+            COOCCURRENCE.add(extract_hashtags(f"{record['alt']} {record['caption']}"))
+        if entry['seen'] < entry['expected']:
+            return []
+        del pending[hashtag]
+        if not entry['records']:
+            print(f"    ⚠️  #{hashtag}: no data collected")
+            return []
+        columns = PostColumns()
+        for idx, record in sorted(entry['records'], key=lambda r: r[0]):
+            columns.add(hashtag, idx, record)
+        run_columns.extend(columns)
+        return [(hashtag, row) for row in build_analysis_data(columns)]
 
-        except Exception as e:
-            print(f"    ❌ Error: {e}")
-            failed += 1
-        
-        if i < len(hashtags) - 1:
-            wait_time = random.uniform(8, 12)
-            print(f"    ⏳ Waiting {wait_time:.1f}s...")
-            time.sleep(wait_time)
+    async def persist(item, _):
+        hashtag, row = item
+        print(f"    Saving #{hashtag}...")
+        if checkpoint:
+            checkpoint.add_row(hashtag, row)
+        writer.add(row)
+        saved.append(hashtag)
+        return []
+
+    slots = [PageSlot(await RECYCLER.new_page(context), RECYCLER) for _ in range(concurrency + 1)]
+    # Failed posts still flow on, so their hashtag can be completed without them
+    pipe.stage('harvest', harvest, tag_queue, url_queue, resources=slots[:1])
+    pipe.stage('fetch', fetch, url_queue, raw_queue, resources=slots[1:],
+               on_error=lambda item: [(item[0], item[1], None)])
+    pipe.stage('score', score, raw_queue, scored_queue, batch_size=PIPELINE_SCORE_BATCH,
+               on_error=lambda batch: [(hashtag, idx, None) for hashtag, idx, _ in batch])
+    pipe.stage('aggregate', aggregate, scored_queue, row_queue)
+    pipe.stage('persist', persist, row_queue)
+    try:
+        await pipe.run(produce(), into=tag_queue)
+        if checkpoint:
+            checkpoint.finish()
+    finally:
+        for slot in slots:
+            await slot.page.close()
+        archive_posts(run_columns)
+
+    successful = len(saved)
+    failed = len(queued) - successful
 
     print(f"\n{'='*70}")
     print(f"🎉 COMPLETE!")
-    print(f"✅ Success: {successful}/{len(hashtags)}")
-    print(f"❌ Failed: {failed}/{len(hashtags)}")
+    print(f"✅ Success: {successful}/{len(queued)}")
+    print(f"❌ Failed: {failed}/{len(queued)}")
+    print(f"🌐 Navigations: {budget.used}" + (f"/{budget.limit}" if budget.limit else ""))
+    print(f"♻️  Navigations saved (no tag-page reloads): {RUN_STATS['navigations_saved']}")
+    if RUN_STATS['posts_resumed']:
+        print(f"🔁 Posts restored from checkpoint: {RUN_STATS['posts_resumed']}")
+    print(f"🔎 Engagement source: cache {RUN_STATS['engagement_cache']} | HTTP {RUN_STATS['engagement_http']} | JSON {RUN_STATS['engagement_json']} | DOM {RUN_STATS['engagement_dom']} | estimated {RUN_STATS['engagement_estimated']}")
+    print(f"⏱️  Analysis time: {time.monotonic() - started:.1f}s")
     print(f"📋 Version ID: {VERSION_ID}")
     print(f"{'='*70}\n")
+    pipe.print_summary()
+    PROFILER.add_counters('pipeline', pipe.summary())
+    return queued
 
-def main():
-    """Main function."""
+def archive_posts(columns: 'PostColumns'):
+    """Append the run's scored posts to the Parquet archive under VERSION_ID."""
+    if not POST_ARCHIVE_DIR or not len(columns):
+        return
+    try:
+        from post_archive import PostArchive
+        with PROFILER.span('archive'):
+            path = PostArchive(POST_ARCHIVE_DIR).write(columns.frame(), VERSION_ID)
+        RUN_STATS['posts_archived'] += len(columns)
+        print(f"🗄️  Archived {len(columns)} post(s) to {path}")
+    except Exception as e:
+        print(f"⚠️  Could not archive posts: {e}")
+
+async def analyze_and_store_hashtags(context, writer: SupabaseWriter, hashtags: list, cache: PostCache = None, concurrency: int = None):
+    """Analyze a fixed list of hashtags with REAL engagement data and save to database."""
+    return await run_pipeline(context, writer, cache, hashtags=hashtags, concurrency=concurrency)
+
+async def open_browser(p, session_state=None):
+    """Launch Chromium with the scraper's context settings and fetch profile.
+
+    The context is handed to RECYCLER, so pages opened through it are
+    recycled along the way.
+    """
+    browser = await p.chromium.launch(
+        headless=True,  # Changed to True for GitHub Actions
+        args=[
+            '--disable-blink-features=AutomationControlled',
+            '--disable-dev-shm-usage',
+            '--no-sandbox',
+            '--disable-setuid-sandbox',
+            '--disable-gpu'
+        ]
+    )
+    fetch_profile = FetchProfile(FETCH_PROFILE)
+    context = await new_browser_context(browser, fetch_profile, session_state)
+    # Recycled pages and contexts are opened with the same settings
+    RECYCLER.attach(context, lambda state: new_browser_context(browser, fetch_profile, state))
+    return browser, context, fetch_profile
+
+async def new_browser_context(browser, fetch_profile: FetchProfile, storage_state=None):
+    """A context with the scraper's settings, stealth script and fetch profile."""
+    context = await browser.new_context(
+        viewport={'width': 1920, 'height': 1080},
+        locale='en-US',
+        timezone_id='Asia/Kolkata',
+        user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        storage_state=storage_state
+    )
+    
+    await context.add_init_script("""
+        Object.defineProperty(navigator, 'webdriver', {
+            get: () => undefined
+        });
+    """)
+    
+    await fetch_profile.install(context)
+    return context
+
+def queue_sharded_hashtags(checkpoint: RunCheckpoint, discovered: list) -> list:
+    """The sharded run's hashtags: the interrupted run's unfinished ones first,
+    then newly discovered ones up to TOP_HASHTAGS_TO_DISCOVER in all."""
+    for hashtag in discovered:
+        if len(checkpoint.state['hashtags']) >= TOP_HASHTAGS_TO_DISCOVER:
+            break
+        checkpoint.add_hashtag(hashtag)
+    return checkpoint.remaining_hashtags()
+
+def open_checkpoint() -> RunCheckpoint:
+    """The checkpoint to resume per RESUME_RUN, or a fresh one for this VERSION_ID."""
+    directory = os.path.join(STATE_DIR, 'checkpoints')
+    checkpoint = None
+    if RESUME_RUN == 'auto':
+        checkpoint = RunCheckpoint.latest(directory, CHECKPOINT_MAX_AGE_HOURS)
+    elif RESUME_RUN != 'off':
+        checkpoint = RunCheckpoint.load(directory, RESUME_RUN)
+        if checkpoint is None:
+            print(f"⚠️  No checkpoint for run {RESUME_RUN}, starting fresh")
+    if checkpoint is None:
+        return RunCheckpoint(directory, VERSION_ID)
+    print(f"🔁 Resuming run {checkpoint.version_id}: {checkpoint.summary()}\n")
+    return checkpoint
+
+def open_writer(checkpoint: RunCheckpoint = None) -> SupabaseWriter:
+    """The run's Supabase writer, started (which replays the spool)."""
+    return SupabaseWriter(
+        SUPABASE_URL,
+        SUPABASE_KEY,
+        chunk_size=SUPABASE_CHUNK_SIZE,
+        max_retries=SUPABASE_MAX_RETRIES,
+        spool_path=os.path.join(STATE_DIR, SUPABASE_SPOOL_FILE),
+        profiler=PROFILER,
+        on_saved=checkpoint.mark_saved if checkpoint else None
+    ).start()
+
+async def main(hashtags: list = None, discover_only: bool = False):
+    """Log in, discover trending hashtags and analyze them.
+
+    `hashtags` analyzes that list instead of discovering; `discover_only`
+    stops after discovery, so only the trend store and co-occurrence index
+    are updated and Supabase is not needed. Only the full run checkpoints.
+    """
+    global VERSION_ID
     print(f"\n{'='*70}")
     print(f"🔥 INSTAGRAM TREND ANALYZER v2.0 - ADVANCED")
     print(f"{'='*70}\n")
     
-    try:
-        supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-        print("✅ Connected to Supabase\n")
-    except Exception as e:
-        print(f"❌ Supabase connection failed: {e}\n")
-        return
+    os.makedirs(STATE_DIR, exist_ok=True)
+    
+    checkpoint = None
+    if hashtags is None and not discover_only:
+        checkpoint = open_checkpoint()
+        # A resumed run keeps its VERSION_ID so all of its rows stay together
+        VERSION_ID = PROFILER.version_id = checkpoint.version_id
     
-    with sync_playwright() as p:
-        browser = p.chromium.launch(
-            headless=True,  # Changed to True for GitHub Actions
-            args=[
-                '--disable-blink-features=AutomationControlled',
-                '--disable-dev-shm-usage',
-                '--no-sandbox',
-                '--disable-setuid-sandbox',
-                '--disable-gpu'
-            ]
-        )
-        
-        context = browser.new_context(
-            viewport={'width': 1920, 'height': 1080},
-            locale='en-US',
-            timezone_id='Asia/Kolkata',
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        )
-        
-        context.add_init_script("""
-            Object.defineProperty(navigator, 'webdriver', {
-                get: () => undefined
-            });
-        """)
-        
-        page = context.new_page()
+    writer = None
+    if not discover_only:
+        if not SUPABASE_URL or not SUPABASE_KEY:
+            print("❌ Supabase connection failed: SUPABASE_URL and SUPABASE_KEY must be set\n")
+            return
+        writer = open_writer(checkpoint)
+        print("✅ Supabase writer ready\n")
+    
+    # Rows built just before an interruption that never reached the writer
+    for row in checkpoint.pending_rows() if checkpoint else []:
+        writer.add(row)
+    
+    post_cache = PostCache(
+        os.path.join(STATE_DIR, 'post_cache.sqlite3'),
+        ttl_hours=POST_CACHE_TTL_HOURS,
+        max_entries=POST_CACHE_MAX_ENTRIES
+    )
+    
+    # Never under STATE_DIR: the workflow caches that directory
+    session_path = SESSION_STATE_FILE
+    session_state = load_session_state(session_path)
+    
+    async with async_playwright() as p:
+        startup_started = time.monotonic()
+        browser, context, fetch_profile = await open_browser(p, session_state)
+        PROFILER.bytes_source = lambda: fetch_profile.stats['bytes_received']
+        
+        page = await context.new_page()
 
         try:
-            login_instagram(page)
-            hashtags = discover_trending_hashtags_advanced(page)
+            with PROFILER.span('login'):
+                warm_start = bool(session_state) and await session_is_valid(context)
+                if warm_start:
+                    print("✅ Restored saved session, skipping login\n")
+                else:
+                    if session_state:
+                        print("[+] Saved session is no longer valid, logging in again...")
+                        await context.clear_cookies()
+                    await login_instagram(page)
+                    await save_session_state(context, session_path)
+                await HTTP.load_cookies(context)
             
-            if not hashtags:
-                print("❌ No hashtags found. Exiting.\n")
-                return
+            RUN_STATS['startup_seconds'] = time.monotonic() - startup_started
+            print(f"⏱️  Time to first scrape: {RUN_STATS['startup_seconds']:.1f}s ({'warm' if warm_start else 'cold'} start)\n")
+            
+            if discover_only:
+                with PROFILER.span('discovery'):
+                    hashtags = await discover_trending_hashtags_advanced(page, post_cache)
+            elif SHARD_WORKERS > 1:
+                # Shards need the whole list up front; workers get this session in memory
+                if hashtags is None and checkpoint and checkpoint.discovery_complete:
+                    print("[+] Discovery finished in the interrupted run, skipping it")
+                    hashtags = []
+                elif hashtags is None:
+                    with PROFILER.span('discovery'):
+                        hashtags = await discover_trending_hashtags_advanced(page, post_cache)
+                    if checkpoint:
+                        checkpoint.finish_discovery()
+                if checkpoint:
+                    hashtags = queue_sharded_hashtags(checkpoint, hashtags)
+                if hashtags:
+                    # Discovery may have recycled `context`; the live one has the current session
+                    session_state = await (RECYCLER.context or context).storage_state()
+                    with PROFILER.span('analysis'):
+                        RUN_STATS.update(await run_sharded(
+                            hashtags, writer, SHARD_WORKERS, VERSION_ID,
+                            PACING_MIN_INTERVAL, PACING_REQUESTS_PER_MINUTE, ANALYSIS_REQUEST_BUDGET,
+                            cooccurrence=COOCCURRENCE, session_state=session_state,
+                            checkpoint=checkpoint))
+                # Shards that failed leave hashtags without a row for the next run to resume
+                if checkpoint and all(checkpoint.done(tag) for tag in hashtags):
+                    checkpoint.finish()
+            else:
+                # Analysis starts on the first hashtags while discovery is still running
+                # (a given list goes straight in)
+                with PROFILER.span('pipeline'):
+                    hashtags = await run_pipeline(context, writer, post_cache, discovery_page=page,
+                                                  hashtags=hashtags, checkpoint=checkpoint)
             
-            analyze_and_store_hashtags(page, supabase, hashtags)
+            if not hashtags:
+                print("❌ No hashtags found.\n")
             
         except Exception as e:
             print(f"\n❌ Critical error: {e}")
@@ -608,9 +1226,53 @@ def main():
             traceback.print_exc()
             
         finally:
+            fetch_profile.print_summary()
+            HTTP.print_summary()
+            HTTP.close()
+            PACER.print_summary()
+            SELECTORS.print_summary()
+            SELECTORS.save()
+            TRENDS.save()
+            TRENDS.print_summary()
+            COOCCURRENCE.save()
+            COOCCURRENCE.print_summary()
+            RECYCLER.print_summary()
+            post_cache.close()
+            post_cache.print_summary()
             print("\n[+] Closing browser...")
-            browser.close()
+            await browser.close()
+            writer_error = None
+            if writer:
+                print("[+] Flushing Supabase writer...")
+                try:
+                    await asyncio.to_thread(writer.close)
+                except Exception as e:
+                    # Raised once the rest is cleaned up; the checkpoint keeps the unsaved rows
+                    writer_error = e
+                    print(f"❌ Supabase writer failed: {e}")
+                writer.print_summary()
+                PROFILER.add_counters('supabase', writer.stats)
+            if checkpoint and checkpoint.complete and not checkpoint.pending_rows():
+                checkpoint.clear()
+            elif checkpoint:
+                print(f"🔁 Checkpoint kept for resuming: {checkpoint.path}")
+            
+            PROFILER.add_counters('run', RUN_STATS)
+            PROFILER.add_counters('fetch', fetch_profile.stats)
+            PROFILER.add_counters('http', HTTP.stats)
+            PROFILER.add_counters('post_cache', post_cache.stats)
+            PROFILER.add_counters('sentiment', SENTIMENT.stats)
+            SENTIMENT.close()
+            PROFILER.add_counters('memory', RECYCLER.summary())
+            PROFILER.add_counters('selectors', SELECTORS.summary())
+            PROFILER.add_counters('trends', TRENDS.stats)
+            PROFILER.add_counters('cooccurrence', COOCCURRENCE.stats)
+            PROFILER.add_counters('pacing', {'navigations': PACER.navigations, 'idle_seconds': PACER.idle_seconds})
+            PROFILER.print_summary()
+            print(f"📝 Run profile saved to {PROFILER.write(RUN_PROFILE_DIR)}")
+            if writer_error:
+                raise writer_error
             print("✅ Done! 👋\n")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1,77 @@
+"""
+Run-wide pacing for navigations.
+
+Every page.goto in the run asks the scheduler first. It enforces a minimum
+gap between navigations and a requests-per-minute ceiling across all pages,
+and otherwise lets the caller go immediately; waiting for content is left to
+load states and selectors rather than fixed sleeps.
+
+Each caller reserves the next free slot and then sleeps until it on its own,
+so pages wait for their turn side by side instead of queueing behind one
+sleeper. The pacing, not the number of pages, sets the run's ceiling on
+navigations per second.
+"""
+import asyncio
+import random
+import time
+from collections import deque
+
+class PacingScheduler:
+    """Shared navigation pacing with idle/working accounting."""
+
+    def __init__(self, min_interval: float = 2.0, requests_per_minute: int = 20, jitter: float = 0.5,
+                 on_navigate=None):
+        self.min_interval = min_interval
+        self.requests_per_minute = requests_per_minute
+        self.jitter = jitter
+        # Called with the page right before each navigation (profiling, memory sampling)
+        self.on_navigate = on_navigate
+        self.navigations = 0
+        # Pages wait side by side, so this is summed over pages, not wall-clock time
+        self.idle_seconds = 0.0
+        self.started = time.monotonic()
+        # Start times of reserved navigations, some possibly still in the future
+        self._last = None
+        self._window = deque()
+
+    def _reserve(self, now: float) -> float:
+        """Claim the next free navigation slot; returns how long to wait for it.
+
+        Runs without awaiting, so on the event loop it needs no lock.
+        """
+        slot = now
+        if self._last is not None:
+            slot = max(slot, self._last + self.min_interval + random.uniform(0, self.jitter))
+        if self.requests_per_minute:
+            while self._window and slot - self._window[0] >= 60:
+                self._window.popleft()
+            if len(self._window) >= self.requests_per_minute:
+                slot = max(slot, self._window[0] + 60)
+        self._last = slot
+        self._window.append(slot)
+        self.navigations += 1
+        return slot - now
+
+    async def acquire(self):
+        """Wait until this caller's navigation slot comes up."""
+        delay = self._reserve(time.monotonic())
+        if delay:
+            await asyncio.sleep(delay)
+            self.idle_seconds += delay
+
+    async def goto(self, page, url: str, acquired: bool = False, **kwargs):
+        """page.goto once the pacing allows it.
+
+        acquired=True uses a slot the caller already took with acquire()
+        (an HTTP fetch of the same post that fell back to the browser).
+        """
+        if not acquired:
+            await self.acquire()
+        if self.on_navigate:
+            self.on_navigate(page)
+        return await page.goto(url, **kwargs)
+
+    def print_summary(self):
+        elapsed = time.monotonic() - self.started
+        print(f"⏸️  Pacing: {self.navigations} navigation(s) in {elapsed:.1f}s, "
+              f"pages waited {self.idle_seconds:.1f}s in total for their slots")
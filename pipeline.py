@@ -0,0 +1,182 @@
+"""
+A small asyncio pipeline of bounded queues and worker stages.
+
+    pipe = Pipeline()
+    urls = pipe.queue('urls', maxsize=50)
+    pages = pipe.queue('pages', maxsize=50)
+    pipe.stage('fetch', fetch, inbox=urls, outbox=pages, workers=3, resources=browser_pages)
+    pipe.stage('parse', parse, inbox=pages)
+    await pipe.run(producer(urls), into=urls)
+
+A handler receives one item (or a list of up to `batch_size` items) plus the
+worker's resource, and returns a list of items for the outbox. When the
+inbox is finished every worker exits and the stage marks its outbox
+finished, so shutdown ripples down the pipeline. Queue depths are sampled
+while it runs, and per-stage throughput is reported at the end.
+"""
+import asyncio
+import time
+from collections import Counter
+
+DONE = object()
+
+class _QueueStats:
+    def __init__(self, queue: asyncio.Queue):
+        self.queue = queue
+        self.samples = 0
+        self.depth_total = 0
+        self.max_depth = 0
+
+    def sample(self):
+        depth = self.queue.qsize()
+        self.samples += 1
+        self.depth_total += depth
+        self.max_depth = max(self.max_depth, depth)
+
+    @property
+    def avg_depth(self) -> float:
+        return self.depth_total / self.samples if self.samples else 0.0
+
+class _Stage:
+    def __init__(self, name, handler, inbox, outbox, workers, resources, batch_size, on_error):
+        self.name = name
+        self.handler = handler
+        self.inbox = inbox
+        self.outbox = outbox
+        self.workers = workers
+        self.resources = resources or [None] * workers
+        self.batch_size = batch_size
+        self.on_error = on_error
+        self.stats = Counter()
+        self.busy_seconds = 0.0
+        self.started = None
+        self.finished = None
+        self._alive = workers
+
+    async def _next_batch(self):
+        """Up to batch_size items, waiting only for the first."""
+        item = await self.inbox.get()
+        if item is DONE or self.batch_size == 1:
+            return item
+        batch = [item]
+        while len(batch) < self.batch_size:
+            try:
+                item = self.inbox.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            if item is DONE:
+                # Leave the marker for the next read so this batch is still handled
+                self.inbox.put_nowait(DONE)
+                break
+            batch.append(item)
+        return batch
+
+    async def _emit(self, items):
+        if self.outbox is None:
+            return
+        for out in items or []:
+            await self.outbox.put(out)
+            self.stats['out'] += 1
+
+    async def worker(self, resource):
+        if self.started is None:
+            self.started = time.monotonic()
+        while True:
+            item = await self._next_batch()
+            if item is DONE:
+                # Let sibling workers see the end of input too
+                self.inbox.put_nowait(DONE)
+                break
+            self.stats['in'] += len(item) if self.batch_size > 1 else 1
+            began = time.monotonic()
+            try:
+                produced = await self.handler(item, resource)
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f"    ⚠️  {self.name} stage error: {str(e)[:60]}")
+                produced = self.on_error(item) if self.on_error else []
+            self.busy_seconds += time.monotonic() - began
+            await self._emit(produced)
+
+        self._alive -= 1
+        if self._alive == 0:
+            self.finished = time.monotonic()
+            if self.outbox is not None:
+                await self.outbox.put(DONE)
+
+    def summary(self) -> dict:
+        elapsed = (self.finished or time.monotonic()) - (self.started or time.monotonic())
+        return {
+            'workers': self.workers,
+            'in': self.stats['in'],
+            'out': self.stats['out'],
+            'errors': self.stats['errors'],
+            'busy_seconds': round(self.busy_seconds, 3),
+            'elapsed_seconds': round(elapsed, 3),
+            'items_per_second': round(self.stats['in'] / elapsed, 3) if elapsed > 0 else 0,
+            # Share of worker time spent handling items rather than waiting on the inbox
+            'utilization': round(self.busy_seconds / (elapsed * self.workers), 3) if elapsed > 0 else 0,
+        }
+
+class Pipeline:
+    """Bounded queues connected by worker stages."""
+
+    def __init__(self, monitor_interval: float = 30):
+        self.monitor_interval = monitor_interval
+        self.queues = {}
+        self.stages = []
+
+    def queue(self, name: str, maxsize: int = 0) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize)
+        self.queues[name] = _QueueStats(queue)
+        return queue
+
+    def stage(self, name: str, handler, inbox: asyncio.Queue, outbox: asyncio.Queue = None,
+              workers: int = 1, resources: list = None, batch_size: int = 1, on_error=None):
+        """Add a stage; `resources` (e.g. browser pages) are handed out one per worker."""
+        if resources is not None:
+            workers = len(resources)
+        self.stages.append(_Stage(name, handler, inbox, outbox, workers, resources, batch_size, on_error))
+
+    def depths(self) -> str:
+        return " | ".join(f"{name} {stats.queue.qsize()}/{stats.queue.maxsize or '∞'}" for name, stats in self.queues.items())
+
+    async def _monitor(self):
+        last_print = time.monotonic()
+        while True:
+            for stats in self.queues.values():
+                stats.sample()
+            if self.monitor_interval and time.monotonic() - last_print >= self.monitor_interval:
+                print(f"    📦 Queues: {self.depths()}")
+                last_print = time.monotonic()
+            await asyncio.sleep(0.5)
+
+    async def run(self, producer, into: asyncio.Queue):
+        """Run every stage until `producer` has filled `into` and all queues drain."""
+        monitor = asyncio.create_task(self._monitor())
+        tasks = [asyncio.create_task(stage.worker(resource)) for stage in self.stages for resource in stage.resources]
+        try:
+            await producer
+            await into.put(DONE)
+            await asyncio.gather(*tasks)
+        finally:
+            monitor.cancel()
+            for task in tasks:
+                task.cancel()
+
+    def summary(self) -> dict:
+        return {
+            'stages': {stage.name: stage.summary() for stage in self.stages},
+            'queues': {name: {'maxsize': s.queue.maxsize, 'avg_depth': round(s.avg_depth, 2), 'max_depth': s.max_depth}
+                       for name, s in self.queues.items()},
+        }
+
+    def print_summary(self):
+        summary = self.summary()
+        print("    Stage        | Workers |   In |  Out | Errors | Items/s | Busy")
+        print("    " + "─" * 62)
+        for name, s in summary['stages'].items():
+            print(f"    {name:12s} | {s['workers']:7d} | {s['in']:4d} | {s['out']:4d} | {s['errors']:6d} | "
+                  f"{s['items_per_second']:7.2f} | {s['utilization'] * 100:3.0f}%")
+        print("    Queue depth  : " + " | ".join(
+            f"{name} avg {q['avg_depth']:.1f} max {q['max_depth']}/{q['maxsize'] or '∞'}" for name, q in summary['queues'].items()))
@@ -0,0 +1,172 @@
+"""
+Columnar per-post records, vectorized aggregation and a Parquet archive.
+
+Scored posts are collected column by column (PostColumns) instead of as a
+list of dicts. aggregate_posts() turns any number of hashtags' posts into
+their instagram-table figures with one groupby pass, and analysis_rows()
+shapes the result into the rows SupabaseWriter inserts.
+
+At the end of a run the posts are appended to a Parquet dataset partitioned
+by run:
+
+    <directory>/version_id=<VERSION_ID>/part-<pid>-<timestamp>.parquet
+
+so a run can be re-aggregated or backfilled later without scraping again:
+
+    rows = analysis_rows(aggregate_posts(PostArchive(POST_ARCHIVE_DIR).read(version_id)), version_id)
+
+Posts of hashtags that were already saved when a run was interrupted are
+not in its checkpoint any more, so they are missing from the archive.
+"""
+import glob
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Archive columns: the hashtag and post index, then post record fields
+COLUMNS = ('hashtag', 'idx', 'url', 'alt', 'caption', 'likes', 'comments', 'engagement',
+           'sentiment_polarity', 'sentiment_subjectivity', 'engagement_source')
+
+DTYPES = {
+    'idx': 'int32',
+    'likes': 'int64',
+    'comments': 'int64',
+    'engagement': 'int64',
+    'sentiment_polarity': 'float64',
+    'sentiment_subjectivity': 'float64',
+}
+
+# Same thresholds as the per-post and per-hashtag sentiment labels
+POSITIVE_ABOVE = 0.1
+NEGATIVE_BELOW = -0.05
+
+class PostColumns:
+    """Scored post records kept as one list per column."""
+
+    def __init__(self):
+        self.data = {column: [] for column in COLUMNS}
+
+    def __len__(self) -> int:
+        return len(self.data['idx'])
+
+    def add(self, hashtag: str, idx: int, record: dict):
+        self.data['hashtag'].append(hashtag)
+        self.data['idx'].append(idx)
+        for field in COLUMNS[2:]:
+            self.data[field].append(record[field])
+
+    def extend(self, other: 'PostColumns'):
+        for column, values in other.data.items():
+            self.data[column].extend(values)
+
+    def frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.data, columns=list(COLUMNS)).astype(DTYPES)
+
+def aggregate_posts(frame: pd.DataFrame) -> pd.DataFrame:
+    """One row of figures per hashtag, in order of first appearance.
+
+    A hashtag's posts are expected in post order; the first post with the
+    highest engagement is its top post.
+    """
+    polarity = frame['sentiment_polarity']
+    positive = polarity > POSITIVE_ABOVE
+    negative = polarity < NEGATIVE_BELOW
+    frame = frame.assign(
+        positive=positive,
+        negative=negative,
+        neutral=~(positive | negative),
+    )
+    grouped = frame.groupby('hashtag', sort=False)
+    aggregated = grouped.agg(
+        posts=('engagement', 'size'),
+        total_engagement=('engagement', 'sum'),
+        total_likes=('likes', 'sum'),
+        total_comments=('comments', 'sum'),
+        sentiment_polarity=('sentiment_polarity', 'mean'),
+        positive_posts=('positive', 'sum'),
+        negative_posts=('negative', 'sum'),
+        neutral_posts=('neutral', 'sum'),
+    )
+    top = frame.loc[grouped['engagement'].idxmax(), ['hashtag', 'url', 'engagement', 'likes', 'comments']]
+    top = top.set_index('hashtag').add_prefix('top_post_')
+
+    aggregated = aggregated.join(top)
+    aggregated['engagement_score'] = aggregated['total_engagement'] / aggregated['posts']
+    aggregated['avg_likes'] = aggregated['total_likes'] / aggregated['posts']
+    aggregated['avg_comments'] = aggregated['total_comments'] / aggregated['posts']
+    aggregated['sentiment_label'] = np.select(
+        [aggregated['sentiment_polarity'] > POSITIVE_ABOVE, aggregated['sentiment_polarity'] < NEGATIVE_BELOW],
+        ['positive', 'negative'],
+        default='neutral',
+    )
+    return aggregated
+
+def analysis_rows(aggregated: pd.DataFrame, version_id: str, scraped_at: str = None) -> list:
+    """instagram-table rows for aggregate_posts() output, with plain Python values."""
+    scraped_at = scraped_at or datetime.utcnow().isoformat()
+    rows = []
+    for hashtag, a in zip(aggregated.index, aggregated.itertuples(index=False)):
+        rows.append({
+            "platform": "Instagram",
+            "topic_hashtag": f"#{hashtag}",
+            "engagement_score": float(a.engagement_score),
+            "sentiment_polarity": float(a.sentiment_polarity),
+            "sentiment_label": a.sentiment_label,
+            "posts": int(a.posts),
+            "views": None,
+            "metadata": {
+                "positive_posts": int(a.positive_posts),
+                "negative_posts": int(a.negative_posts),
+                "neutral_posts": int(a.neutral_posts),
+                "top_post_url": f"https://www.instagram.com{a.top_post_url}",
+                "top_post_engagement": int(a.top_post_engagement),
+                "top_post_likes": int(a.top_post_likes),
+                "top_post_comments": int(a.top_post_comments),
+                "total_engagement": int(a.total_engagement),
+                "total_likes": int(a.total_likes),
+                "total_comments": int(a.total_comments),
+                "avg_likes": float(a.avg_likes),
+                "avg_comments": float(a.avg_comments)
+            },
+            "scraped_at": scraped_at,
+            "version_id": version_id
+        })
+    return rows
+
+class PostArchive:
+    """Parquet dataset of scraped posts, one partition per VERSION_ID."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def partition(self, version_id: str) -> str:
+        return os.path.join(self.directory, f"version_id={version_id}")
+
+    def write(self, frame: pd.DataFrame, version_id: str) -> str:
+        """Append `frame` to the run's partition; returns the new file's path."""
+        directory = self.partition(version_id)
+        os.makedirs(directory, exist_ok=True)
+        name = f"part-{os.getpid()}-{time.time_ns()}.parquet"
+        path = os.path.join(directory, name)
+        # Dot files are skipped by dataset readers, so nobody sees half a file
+        tmp_path = os.path.join(directory, f".{name}.tmp")
+        frame.to_parquet(tmp_path, index=False, compression='zstd')
+        os.replace(tmp_path, path)
+        return path
+
+    def versions(self) -> list:
+        """Archived VERSION_IDs, oldest partition first."""
+        partitions = sorted(glob.glob(os.path.join(self.directory, 'version_id=*')), key=os.path.getmtime)
+        return [os.path.basename(path).split('=', 1)[1] for path in partitions]
+
+    def read(self, version_id: str = None) -> pd.DataFrame:
+        """Posts of one run, or of every archived run with a version_id column."""
+        if version_id is not None:
+            files = sorted(glob.glob(os.path.join(self.partition(version_id), '*.parquet')))
+            if not files:
+                raise FileNotFoundError(f"No archived posts for run {version_id} in {self.directory}")
+            return pd.concat([pd.read_parquet(path) for path in files], ignore_index=True)
+        return pd.read_parquet(self.directory)
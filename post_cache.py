@@ -0,0 +1,120 @@
+"""
+On-disk cache of scraped posts, keyed by shortcode.
+
+Popular hashtags keep showing the same top posts from run to run, and
+discovery often opens posts that analysis visits again later. A fresh cache
+entry answers both without a navigation. Entries expire after `ttl_hours`
+and the least recently fetched ones are evicted once the cache holds more
+than `max_entries` posts.
+
+Sharded workers open the same file at once, so the database runs in WAL
+mode (readers never block the writer) and a connection waits up to
+`busy_timeout` seconds for a lock instead of failing with "database is
+locked".
+"""
+import sqlite3
+import time
+from collections import Counter
+
+from response_extractor import shortcode_from_url
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    shortcode TEXT PRIMARY KEY,
+    likes INTEGER NOT NULL,
+    comments INTEGER NOT NULL,
+    caption TEXT NOT NULL DEFAULT '',
+    source TEXT NOT NULL,
+    sentiment_polarity REAL,
+    sentiment_subjectivity REAL,
+    fetched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS posts_fetched_at ON posts (fetched_at);
+"""
+
+class PostCache:
+    """SQLite-backed post cache with a TTL and an entry cap."""
+
+    def __init__(self, path: str, ttl_hours: float = 12, max_entries: int = 20000, busy_timeout: float = 30):
+        self.path = path
+        self.ttl = ttl_hours * 3600
+        self.max_entries = max_entries
+        self.stats = Counter()
+        self._db = sqlite3.connect(path, timeout=busy_timeout)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._expire()
+
+    def get(self, post_url: str):
+        """Fresh cached engagement for a post, shaped like get_post_engagement's result."""
+        row = self._db.execute(
+            "SELECT likes, comments, caption, sentiment_polarity, sentiment_subjectivity "
+            "FROM posts WHERE shortcode = ? AND fetched_at >= ?",
+            (shortcode_from_url(post_url), time.time() - self.ttl),
+        ).fetchone()
+        if row is None:
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        likes, comments, caption, polarity, subjectivity = row
+        return {
+            'likes': likes,
+            'comments': comments,
+            'total_engagement': likes + comments,
+            'caption': caption,
+            'source': 'cache',
+            'sentiment_polarity': polarity,
+            'sentiment_subjectivity': subjectivity,
+        }
+
+    def put(self, post_url: str, engagement: dict):
+        """Store a freshly scraped post. Failed scrapes ('estimated', zero counts) are never cached."""
+        shortcode = shortcode_from_url(post_url)
+        if not shortcode or engagement.get('source') in ('estimated', 'cache'):
+            return
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO posts "
+                "(shortcode, likes, comments, caption, source, sentiment_polarity, sentiment_subjectivity, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (shortcode, engagement['likes'], engagement['comments'], engagement.get('caption') or '',
+                 engagement['source'], engagement.get('sentiment_polarity'),
+                 engagement.get('sentiment_subjectivity'), time.time()),
+            )
+        self.stats['writes'] += 1
+
+    def set_sentiment(self, post_url: str, polarity: float, subjectivity: float):
+        """Attach a sentiment score to an already cached post."""
+        with self._db:
+            self._db.execute(
+                "UPDATE posts SET sentiment_polarity = ?, sentiment_subjectivity = ? WHERE shortcode = ?",
+                (polarity, subjectivity, shortcode_from_url(post_url)),
+            )
+
+    def _expire(self):
+        """Drop expired rows, then the oldest rows beyond the entry cap."""
+        with self._db:
+            expired = self._db.execute(
+                "DELETE FROM posts WHERE fetched_at < ?", (time.time() - self.ttl,)
+            ).rowcount
+            evicted = self._db.execute(
+                "DELETE FROM posts WHERE shortcode IN ("
+                "SELECT shortcode FROM posts ORDER BY fetched_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+        self.stats['expired'] += expired
+        self.stats['evicted'] += evicted
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+
+    def close(self):
+        self._expire()
+        self._db.close()
+
+    def print_summary(self):
+        lookups = self.stats['hits'] + self.stats['misses']
+        rate = self.stats['hits'] / lookups * 100 if lookups else 0
+        print(f"🗃️  Post cache: {self.stats['hits']} hit(s), {self.stats['misses']} miss(es) "
+              f"({rate:.0f}% hit rate), {self.stats['writes']} stored, "
+              f"{self.stats['expired']} expired, {self.stats['evicted']} evicted")
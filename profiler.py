@@ -0,0 +1,111 @@
+"""
+Lightweight span instrumentation for a scraper run.
+
+    with PROFILER.span('discovery.feed'):
+        ...
+    PROFILER.count('navigations')
+
+Each span records calls, wall time, navigations, selector timeouts (and the
+time they cost) and bytes received while it was open. Counts go to every span open in the current
+task (asyncio tasks inherit the stack), so 'analysis' includes the
+navigations of the 'post.fetch' spans inside it. At the end of the run the
+profile is written as JSON keyed by the run's VERSION_ID and a summary table
+is printed.
+"""
+import contextvars
+import json
+import os
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+_open_spans = contextvars.ContextVar('open_spans', default=())
+
+class _SpanStats:
+    __slots__ = ('calls', 'seconds', 'max_seconds', 'counts')
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.counts = Counter()
+
+    def as_dict(self) -> dict:
+        return {
+            'calls': self.calls,
+            'seconds': round(self.seconds, 4),
+            'avg_seconds': round(self.seconds / self.calls, 4) if self.calls else 0,
+            'max_seconds': round(self.max_seconds, 4),
+            **self.counts,
+        }
+
+class RunProfiler:
+    """Collects per-stage spans and counters for one run."""
+
+    def __init__(self, version_id: str):
+        self.version_id = version_id
+        self.started_at = datetime.utcnow().isoformat()
+        self.started = time.monotonic()
+        self.spans = defaultdict(_SpanStats)
+        self.counters = {}
+        # Returns total bytes received so far; set once the fetch profile exists
+        self.bytes_source = None
+
+    @contextmanager
+    def span(self, name: str):
+        stats = self.spans[name]
+        token = _open_spans.set(_open_spans.get() + (stats,))
+        bytes_before = self.bytes_source() if self.bytes_source else 0
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            _open_spans.reset(token)
+            stats.calls += 1
+            stats.seconds += elapsed
+            stats.max_seconds = max(stats.max_seconds, elapsed)
+            if self.bytes_source:
+                # Overlapping spans on other pages share this delta
+                stats.counts['bytes'] += self.bytes_source() - bytes_before
+
+    def count(self, name: str, amount: int = 1):
+        """Add to a counter on every span open in the current task."""
+        for stats in _open_spans.get():
+            stats.counts[name] += amount
+
+    def add_counters(self, group: str, counters: dict):
+        """Attach a component's own counters (cache, writer, ...) to the profile."""
+        self.counters[group] = dict(counters)
+
+    def as_dict(self) -> dict:
+        return {
+            'version_id': self.version_id,
+            'started_at': self.started_at,
+            'duration_seconds': round(time.monotonic() - self.started, 3),
+            'spans': {name: stats.as_dict() for name, stats in sorted(self.spans.items())},
+            'counters': self.counters,
+        }
+
+    def write(self, directory: str) -> str:
+        """Write the profile to <directory>/<version_id>.json and return the path."""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.version_id}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.as_dict(), f, indent=2, default=str)
+        return path
+
+    def print_summary(self):
+        print(f"\n{'='*70}")
+        print(f"📈 RUN PROFILE ({time.monotonic() - self.started:.1f}s total)")
+        print(f"{'='*70}")
+        print(f"    {'Stage':22s} | {'Calls':>5s} | {'Total s':>8s} | {'Avg s':>6s} | {'Max s':>6s} | {'Navs':>4s} | {'T/O':>4s} | {'T/O s':>6s} | {'MB':>6s}")
+        print("    " + "─" * 91)
+        for name, stats in sorted(self.spans.items()):
+            print(f"    {name:22s} | {stats.calls:5d} | {stats.seconds:8.1f} | "
+                  f"{stats.seconds / stats.calls if stats.calls else 0:6.2f} | {stats.max_seconds:6.1f} | "
+                  f"{stats.counts['navigations']:4d} | {stats.counts['selector_timeouts']:4d} | "
+                  f"{stats.counts['selector_timeout_ms'] / 1000:6.1f} | "
+                  f"{stats.counts['bytes'] / 1_000_000:6.2f}")
+        print()
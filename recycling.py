@@ -0,0 +1,159 @@
+"""
+Page and context recycling, with browser memory sampling.
+
+Chromium grows the longer one page keeps navigating. The recycler swaps a
+page for a fresh one after `max_navigations`, and once the browser passes
+`memory_limit_mb` it opens a whole new context from the old one's storage
+state (cookies and local storage carry over) and moves every page across as
+its worker next asks for it. The old context is closed when its last page is.
+
+Memory is sampled on every navigation as the resident size of the Chromium
+processes under this Python process, read from /proc (0 elsewhere). RSS is
+summed per process, so pages shared between processes count more than once.
+"""
+import os
+import time
+from collections import Counter, defaultdict
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+def _read_proc_table():
+    """pid -> (parent pid, process name) for every process in /proc."""
+    table = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', encoding='utf-8', errors='replace') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The name is in parentheses and may itself contain spaces
+        name = stat[stat.index('(') + 1:stat.rindex(')')]
+        ppid = int(stat[stat.rindex(')') + 2:].split()[1])
+        table[int(entry)] = (ppid, name)
+    return table
+
+def _rss(pid: int) -> int:
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return 0
+
+def browser_rss(root_pid: int = None) -> int:
+    """Resident bytes of the Chromium processes descended from `root_pid` (default: this process)."""
+    if not os.path.isdir('/proc'):
+        return 0
+    table = _read_proc_table()
+    children = defaultdict(list)
+    for pid, (ppid, _) in table.items():
+        children[ppid].append(pid)
+    total = 0
+    stack = [root_pid or os.getpid()]
+    while stack:
+        for child in children[stack.pop()]:
+            stack.append(child)
+            name = table[child][1]
+            if 'chrom' in name or 'headless_shell' in name:
+                total += _rss(child)
+    return total
+
+class PageSlot:
+    """A worker's page; ready() swaps it for a fresh one when it is due."""
+
+    def __init__(self, page, recycler):
+        self.page = page
+        self.recycler = recycler
+
+    async def ready(self):
+        self.page = await self.recycler.fresh(self.page)
+        return self.page
+
+class PageRecycler:
+    """Recycles pages by navigation count and contexts by browser memory."""
+
+    def __init__(self, max_navigations: int = 25, memory_limit_mb: float = 0, report_every: int = 10):
+        self.max_navigations = max_navigations
+        self.memory_limit = memory_limit_mb * 1_000_000
+        self.report_every = report_every
+        self.stats = Counter()
+        # (seconds into the run, browser RSS in MB) per navigation
+        self.samples = []
+        self.peak_rss = 0
+        self.started = time.monotonic()
+        self.context = None
+        self._factory = None
+        self._navigations = {}
+        self._context_navigations = 0
+        self._context_due = False
+
+    def attach(self, context, factory):
+        """Recycle pages of `context`; `factory(storage_state)` opens a replacement context."""
+        self.context = context
+        self._factory = factory
+
+    async def new_page(self, context=None):
+        page = await (self.context or context).new_page()
+        self._navigations[page] = 0
+        return page
+
+    def note_navigation(self, page):
+        """Count a navigation for `page` and sample browser memory (pacer callback)."""
+        self._navigations[page] = self._navigations.get(page, 0) + 1
+        self._context_navigations += 1
+        self.stats['navigations'] += 1
+        rss = browser_rss()
+        self.peak_rss = max(self.peak_rss, rss)
+        self.samples.append((round(time.monotonic() - self.started, 2), round(rss / 1_000_000, 1)))
+        if self.report_every and self.stats['navigations'] % self.report_every == 0:
+            print(f"    🧠 Navigation {self.stats['navigations']}: Chromium {rss / 1_000_000:.0f} MB")
+        # A fresh context needs a few navigations before memory can settle
+        if (self.memory_limit and rss > self.memory_limit and self.context is not None
+                and self._context_navigations >= self.max_navigations):
+            self._context_due = True
+
+    async def fresh(self, page):
+        """`page`, or its replacement if it is due for recycling."""
+        if self.context is None:
+            return page
+        if self._context_due:
+            await self._recycle_context()
+        stale_context = page.context is not self.context
+        if not stale_context and self._navigations.get(page, 0) < self.max_navigations:
+            return page
+        old_context = page.context
+        replacement = await self.new_page()
+        self._navigations.pop(page, None)
+        await page.close()
+        self.stats['pages_recycled'] += 1
+        if stale_context and not old_context.pages:
+            await old_context.close()
+        return replacement
+
+    async def _recycle_context(self):
+        self._context_due = False
+        self._context_navigations = 0
+        old_context = self.context
+        self.context = await self._factory(await old_context.storage_state())
+        self.stats['contexts_recycled'] += 1
+        print(f"    ♻️  Browser at {self.samples[-1][1]:.0f} MB, moving to a fresh context")
+        if not old_context.pages:
+            await old_context.close()
+
+    def summary(self) -> dict:
+        rss = [mb for _, mb in self.samples]
+        return {
+            **self.stats,
+            'rss_first_mb': rss[0] if rss else 0,
+            'rss_last_mb': rss[-1] if rss else 0,
+            'rss_peak_mb': round(self.peak_rss / 1_000_000, 1),
+            'samples': self.samples,
+        }
+
+    def print_summary(self):
+        summary = self.summary()
+        print(f"🧠 Browser memory: {summary['rss_first_mb']:.0f} MB at first navigation, "
+              f"peak {summary['rss_peak_mb']:.0f} MB, {summary['rss_last_mb']:.0f} MB at the last "
+              f"over {self.stats['navigations']} navigation(s); recycled {self.stats['pages_recycled']} page(s), "
+              f"{self.stats['contexts_recycled']} context(s)")
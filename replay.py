@@ -0,0 +1,178 @@
+"""
+Offline replay of a whole scraper run.
+
+A FixtureServer plays Instagram and Supabase on 127.0.0.1: the login form,
+the home feed, hashtag and topic pages, post pages with their media JSON,
+and the PostgREST insert endpoint. The scraper then runs unchanged in a child
+process (`instagram_scraper.py run`, as the workflow starts it), pointed at
+the server through its environment settings, with its own empty state
+directory. Nothing leaves the machine.
+
+The site is either synthetic (generated from a seed, so every replay sees
+the same pages) or recorded: a directory of saved pages mirroring the URL
+paths, served as they are (see FixtureServer.add_directory).
+
+    python replay.py                    # synthetic site
+    python replay.py recordings/        # recorded pages
+
+run_replay() returns what the run did: wall time, exit code, navigations,
+per-stage latency from the run profile and the rows Supabase received.
+"""
+import glob
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from fixture_server import FixtureServer
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Topic pages discovery falls back to while the co-occurrence index is empty
+TOPIC_PAGES = ('today', 'new', 'trending', 'latest')
+
+def populate_synthetic_site(server: FixtureServer, hashtags: int = 30, posts_per_tag: int = 5,
+                            feed_posts: int = 60, cluster_size: int = 5, seed: int = 1) -> list:
+    """Fill `server` with a small deterministic Instagram; returns its hashtags.
+
+    Hashtags come in clusters that are tagged together, and clusters get
+    less popular down the list, so discovery has a clear ranking to find.
+    Every hashtag any page mentions has its own tag page.
+    """
+    rng = random.Random(seed)
+    tags = [f"replay{i // cluster_size:02d}t{i % cluster_size}" for i in range(hashtags)]
+    posts = []
+    for t, tag in enumerate(tags):
+        cluster = tags[t - t % cluster_size:t - t % cluster_size + cluster_size]
+        codes, alts = [], []
+        for i in range(posts_per_tag):
+            code = f"R{t:03d}{i:02d}"
+            post_tags = [tag] + rng.sample([other for other in cluster if other != tag], min(2, len(cluster) - 1))
+            caption = f"Replay post {code} " + " ".join(f"#{other}" for other in post_tags)
+            alt = f"Photo by fixture {' '.join('#' + other for other in post_tags)}"
+            # Most pages embed the JSON, some only meta tags, a few need the browser
+            embed = rng.choices(['json', 'meta', 'none'], [16, 3, 1])[0]
+            server.add_post(code, rng.randint(100, 50_000), rng.randint(0, 2_000), caption, embed=embed)
+            codes.append(code)
+            alts.append(alt)
+            posts.append({'shortcode': code, 'alt': alt, 'weight': 1 / (1 + t // cluster_size)})
+        server.add_tag(tag, codes, alts)
+
+    feed = rng.choices(posts, [post['weight'] for post in posts], k=feed_posts)
+    # One card per post, in feed order
+    feed = list({post['shortcode']: post for post in feed}.values())
+    server.add_feed([{'shortcode': post['shortcode'], 'alt': post['alt']} for post in feed])
+    for topic in TOPIC_PAGES:
+        sample = rng.sample(posts, min(15, len(posts)))
+        server.add_tag(topic, [post['shortcode'] for post in sample], [post['alt'] for post in sample])
+    return tags
+
+def replay_env(server: FixtureServer, state_dir: str, overrides: dict = None) -> dict:
+    """Environment for a main.py run against `server`, keeping all state in `state_dir`."""
+    env = dict(os.environ)
+    env.update({
+        'INSTAGRAM_BASE_URL': server.url,
+        'INSTAGRAM_USERNAME': server.credentials[0],
+        'INSTAGRAM_PASSWORD': server.credentials[1],
+        'SUPABASE_URL': server.url,
+        'SUPABASE_KEY': 'replay-key',
+        'SCRAPER_STATE_DIR': state_dir,
+        'RUN_PROFILE_DIR': os.path.join(state_dir, 'run_profiles'),
+        'RESUME_RUN': 'off',
+        'PACING_MIN_INTERVAL': '0',
+        'PACING_REQUESTS_PER_MINUTE': '0',
+        'PIPELINE_MONITOR_INTERVAL': '0',
+        'MEMORY_REPORT_EVERY': '0',
+        'PYTHONUNBUFFERED': '1',
+    })
+    env.update(overrides or {})
+    return env
+
+def run_replay(recording: str = None, env: dict = None, hashtags: int = 30, posts_per_tag: int = 5,
+               feed_posts: int = 60, seed: int = 1, delay: float = 0.0, timeout: float = 900,
+               command: list = None, state_dir: str = None, kill_when=None) -> dict:
+    """Run the scraper once against a local site and report what it did.
+
+    `env` overrides settings for the run (e.g. {'ANALYSIS_FETCH_BACKEND': 'browser'});
+    `delay` adds that many seconds to every page load. `command` replaces the
+    default full run (e.g. [..., 'instagram_scraper.py', 'discover']). The
+    run's output is kept in the returned 'log' file.
+
+    `state_dir` reuses an earlier replay's state (to resume it, say).
+    `kill_when(state_dir)` is polled while the run goes; once it returns
+    True the process is killed, as a cancelled workflow would be.
+    """
+    server = FixtureServer().start()
+    server.delay = delay
+    state_dir = state_dir or tempfile.mkdtemp(prefix="replay-")
+    try:
+        if recording:
+            pages = server.add_directory(recording)
+            print(f"[+] Replaying {pages} recorded file(s) from {recording}")
+        else:
+            populate_synthetic_site(server, hashtags, posts_per_tag, feed_posts, seed=seed)
+
+        log_path = os.path.join(state_dir, 'replay.log')
+        profiles_before = set(glob.glob(os.path.join(state_dir, 'run_profiles', '*.json')))
+        started = time.perf_counter()
+        killed = False
+        with open(log_path, 'a', encoding='utf-8') as log:
+            process = subprocess.Popen(command or [sys.executable, os.path.join(ROOT, 'instagram_scraper.py'), 'run'],
+                                       cwd=state_dir, env=replay_env(server, state_dir, env),
+                                       stdout=log, stderr=subprocess.STDOUT)
+            try:
+                while process.poll() is None:
+                    if kill_when and kill_when(state_dir):
+                        process.kill()
+                        killed = True
+                        break
+                    if time.perf_counter() - started > timeout:
+                        process.kill()
+                        raise subprocess.TimeoutExpired(process.args, timeout)
+                    time.sleep(0.1)
+            finally:
+                process.wait()
+        elapsed = time.perf_counter() - started
+
+        # This run's profile (a killed run writes none)
+        profiles = set(glob.glob(os.path.join(state_dir, 'run_profiles', '*.json'))) - profiles_before
+        profile = {}
+        if profiles:
+            with open(profiles.pop(), encoding='utf-8') as f:
+                profile = json.load(f)
+        counters = profile.get('counters', {})
+        return {
+            'exit_code': process.returncode,
+            'killed': killed,
+            'seconds': elapsed,
+            'startup_seconds': counters.get('run', {}).get('startup_seconds', 0),
+            'navigations': counters.get('pacing', {}).get('navigations', 0),
+            'page_requests': server.get_requests,
+            'post_requests': server.post_requests,
+            'logins': server.logins,
+            'rows': len(server.rows['instagram']),
+            'inserts': server.requests,
+            'spans': profile.get('spans', {}),
+            'log': log_path,
+            'state_dir': state_dir,
+        }
+    finally:
+        server.stop()
+
+def print_report(result: dict):
+    print(f"\n🎬 Replay: {result['seconds']:.1f}s end to end (exit code {result['exit_code']}), "
+          f"{result['startup_seconds']:.1f}s to first scrape")
+    print(f"    {result['navigations']} navigation(s), {result['page_requests']} page request(s), "
+          f"{result['logins']} login(s), {result['rows']} row(s) in {result['inserts']} insert(s)")
+    print(f"\n    {'Stage':22s} | {'Calls':>5s} | {'Total s':>8s} | {'Avg s':>6s} | {'Navs':>4s}")
+    print("    " + "─" * 56)
+    for name, span in sorted(result['spans'].items()):
+        print(f"    {name:22s} | {span['calls']:5d} | {span['seconds']:8.2f} | "
+              f"{span['avg_seconds']:6.2f} | {span.get('navigations', 0):4d}")
+    print(f"\n    Log: {result['log']}\n")
+
+if __name__ == "__main__":
+    print_report(run_replay(sys.argv[1] if len(sys.argv) > 1 else None))
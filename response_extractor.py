@@ -0,0 +1,116 @@
+"""
+Engagement extraction from the JSON a post page loads over the network.
+
+When a post page opens, Instagram fetches the post's structured data (GraphQL
+or the v1 media API). Reading likes, comments and the caption from that
+payload is exact and is available as soon as the response lands, instead of
+after the DOM settles.
+"""
+import asyncio
+import re
+
+# Responses worth parsing; everything else is ignored without reading the body
+JSON_URL_PATTERNS = re.compile(r'/graphql/query|/api/graphql|/api/v1/media/|[?&]__a=1')
+
+SHORTCODE_RE = re.compile(r'/(?:p|reel)/([A-Za-z0-9_-]+)')
+
+def shortcode_from_url(post_url: str) -> str:
+    """'/p/ABC123/' or a full post URL -> 'ABC123' ('' when there is none)."""
+    match = SHORTCODE_RE.search(post_url or "")
+    return match.group(1) if match else ""
+
+def _count(node: dict, *keys):
+    """First usable count among plain ints and GraphQL {'count': n} edges."""
+    for key in keys:
+        value = node.get(key)
+        if isinstance(value, dict):
+            value = value.get('count')
+        if isinstance(value, int):
+            return value
+    return None
+
+def _caption(node: dict) -> str:
+    caption = node.get('caption')
+    if isinstance(caption, dict):
+        return caption.get('text') or ""
+    if isinstance(caption, str):
+        return caption
+    edges = (node.get('edge_media_to_caption') or {}).get('edges') or []
+    if edges:
+        return (edges[0].get('node') or {}).get('text') or ""
+    return ""
+
+def parse_post_node(node: dict):
+    """Likes/comments/caption from a v1 media item or a GraphQL shortcode_media node.
+
+    Returns None when the node carries no like count (e.g. likes are hidden).
+    """
+    likes = _count(node, 'like_count', 'edge_media_preview_like', 'edge_liked_by')
+    if likes is None:
+        return None
+    comments = _count(node, 'comment_count', 'edge_media_to_parent_comment', 'edge_media_to_comment') or 0
+    return {
+        'likes': likes,
+        'comments': comments,
+        'caption': _caption(node),
+    }
+
+def find_post_node(data, shortcode: str):
+    """Depth-first search of a JSON payload for the media node of `shortcode`."""
+    stack = [data]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            if shortcode and (item.get('code') == shortcode or item.get('shortcode') == shortcode):
+                parsed = parse_post_node(item)
+                if parsed:
+                    return parsed
+            stack.extend(item.values())
+        elif isinstance(item, list):
+            stack.extend(item)
+    return None
+
+class PostResponseWatcher:
+    """Listens to a page's responses and resolves once the post's data arrives.
+
+    Usage:
+        watcher = PostResponseWatcher(shortcode)
+        watcher.attach(page)
+        await page.goto(...)
+        data = await watcher.wait(timeout)
+        watcher.detach()
+    """
+
+    def __init__(self, shortcode: str):
+        self.shortcode = shortcode
+        self.result = asyncio.get_running_loop().create_future()
+        self._page = None
+
+    async def on_response(self, response):
+        if self.result.done() or not JSON_URL_PATTERNS.search(response.url):
+            return
+        if 'json' not in (response.headers.get('content-type') or '') and '__a=1' not in response.url:
+            return
+        try:
+            data = await response.json()
+        except Exception:
+            return
+        parsed = find_post_node(data, self.shortcode)
+        if parsed and not self.result.done():
+            self.result.set_result(parsed)
+
+    def attach(self, page):
+        self._page = page
+        page.on("response", self.on_response)
+
+    def detach(self):
+        if self._page is not None:
+            self._page.remove_listener("response", self.on_response)
+            self._page = None
+
+    async def wait(self, timeout: float):
+        """The parsed post data, or None if nothing matched within `timeout` seconds."""
+        try:
+            return await asyncio.wait_for(asyncio.shield(self.result), timeout)
+        except asyncio.TimeoutError:
+            return None
@@ -0,0 +1,123 @@
+"""
+Racing selector resolution with a learned priority per target.
+
+Instead of trying a list of candidate selectors one after another, each
+with its own timeout, all candidates are waited on at once and the first to
+match wins. When several match together the learned order breaks the tie:
+the candidate that won last time for the same logical target ("login.username",
+"feed.ready", ...) is tried first. Winners are saved to a small JSON file so
+the order carries over between runs.
+
+    selector = await SELECTORS.resolve(page, 'login.username', candidates, timeout=5000)
+
+Every wait that ends in a timeout, raced or not, is reported through
+note_timeout() so the run can show how much time was lost to them.
+"""
+import asyncio
+import json
+import os
+import time
+from collections import Counter
+from datetime import datetime
+
+from playwright.async_api import TimeoutError as PlaywrightTimeout
+
+class SelectorResolver:
+    """Races candidate selectors and remembers which one works per target."""
+
+    def __init__(self, path: str, on_timeout=None):
+        self.path = path
+        # Called with the seconds a timed-out wait took
+        self.on_timeout = on_timeout
+        self.priority = self._load()
+        self.stats = Counter()
+        self.lost_seconds = 0.0
+        # target -> {'selector', 'seconds'} for the latest resolution this run
+        self.resolved = {}
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        """Write the learned winners atomically."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.priority, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def ordered(self, target: str, candidates: list) -> list:
+        """Candidates with the last winner for `target` first, the rest in their given order."""
+        winner = self.priority.get(target, {}).get('winner')
+        if winner in candidates:
+            return [winner] + [c for c in candidates if c != winner]
+        return list(candidates)
+
+    def note_timeout(self, seconds: float):
+        self.stats['timeouts'] += 1
+        self.lost_seconds += seconds
+        if self.on_timeout:
+            self.on_timeout(seconds)
+
+    def _learn(self, target: str, selector: str):
+        entry = self.priority.setdefault(target, {'winner': selector, 'wins': {}})
+        if entry['winner'] != selector:
+            self.stats['winner_changes'] += 1
+        entry['winner'] = selector
+        entry['wins'][selector] = entry['wins'].get(selector, 0) + 1
+        entry['updated_at'] = datetime.utcnow().isoformat()
+
+    async def resolve(self, page, target: str, candidates: list, timeout: float = 10000, state: str = 'visible') -> str:
+        """The first candidate to reach `state`; raises PlaywrightTimeout when none does."""
+        ordered = self.ordered(target, candidates)
+        started = time.monotonic()
+        waits = {
+            asyncio.create_task(page.wait_for_selector(selector, timeout=timeout, state=state)): selector
+            for selector in ordered
+        }
+        winner = None
+        try:
+            pending = set(waits)
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                matched = [waits[task] for task in done if not task.cancelled() and task.exception() is None]
+                if matched:
+                    winner = min(matched, key=ordered.index)
+        finally:
+            for task in waits:
+                task.cancel()
+            await asyncio.gather(*waits, return_exceptions=True)
+
+        elapsed = time.monotonic() - started
+        if winner is None:
+            self.note_timeout(elapsed)
+            raise PlaywrightTimeout(f"None of {len(ordered)} selectors for '{target}' matched within {timeout:.0f} ms")
+
+        # Higher-priority candidates that matched in the same instant still win the tie
+        for selector in ordered[:ordered.index(winner)]:
+            element = await page.query_selector(selector)
+            if element and (state != 'visible' or await element.is_visible()):
+                winner = selector
+                break
+
+        self.stats['resolved'] += 1
+        if winner != ordered[0]:
+            self.stats['fallbacks'] += 1
+        self._learn(target, winner)
+        self.resolved[target] = {'selector': winner, 'seconds': round(elapsed, 3)}
+        return winner
+
+    def summary(self) -> dict:
+        return {**self.stats, 'lost_seconds': round(self.lost_seconds, 2), 'targets': self.resolved}
+
+    def print_summary(self):
+        print(f"🎯 Selectors: {self.stats['resolved']} resolved ({self.stats['fallbacks']} not by the learned winner), "
+              f"{self.stats['timeouts']} timeout(s), {self.lost_seconds:.1f}s lost to timeouts")
+        for target, result in sorted(self.resolved.items()):
+            print(f"    {target:18s} → {result['selector']} ({result['seconds']:.2f}s)")
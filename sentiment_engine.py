@@ -0,0 +1,119 @@
+"""
+Batched, memoized sentiment scoring.
+
+Scores are exactly what TextBlob(text).sentiment returns: TextBlob delegates
+to its default PatternAnalyzer, which is called here directly so no blob
+object is built per text. Results are memoized by a hash of the text in a
+bounded LRU, since identical alt texts and captions are common. Batches can
+run on a process pool so the event loop driving the browser never waits on
+scoring. textblob itself is only imported the first time something is scored.
+"""
+import asyncio
+import hashlib
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+_analyzer = None
+_analyzer_lock = threading.Lock()
+
+def _analyze(text: str):
+    global _analyzer
+    if _analyzer is None:
+        with _analyzer_lock:
+            if _analyzer is None:
+                from textblob.en.sentiments import PatternAnalyzer
+                analyzer = PatternAnalyzer()
+                # Loads the lexicon once, before any other thread can race on it
+                analyzer.analyze("")
+                _analyzer = analyzer
+    sentiment = _analyzer.analyze(text)
+    return (sentiment.polarity, sentiment.subjectivity)
+
+def score_batch(texts: list) -> list:
+    """(polarity, subjectivity) for each text. Runs in pool workers too."""
+    return [_analyze(text) for text in texts]
+
+def text_key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+class SentimentEngine:
+    """TextBlob-equivalent scoring with an LRU memo and optional process pool.
+
+    workers=0 scores in a thread next to the event loop; workers>0 uses a
+    process pool of that size and splits large batches into `batch_size` chunks.
+    """
+
+    def __init__(self, cache_size: int = 50000, workers: int = 0, batch_size: int = 256):
+        self.cache_size = cache_size
+        self.workers = workers
+        self.batch_size = batch_size
+        self.stats = Counter()
+        self._memo = OrderedDict()
+        self._pool = None
+
+    def _lookup(self, key: bytes):
+        result = self._memo.get(key)
+        if result is not None:
+            self._memo.move_to_end(key)
+        return result
+
+    def _remember(self, key: bytes, result: tuple):
+        self._memo[key] = result
+        self._memo.move_to_end(key)
+        if len(self._memo) > self.cache_size:
+            self._memo.popitem(last=False)
+
+    def _split(self, texts: list):
+        """Memo hits as {index: result}, plus the unique texts still to score."""
+        found = {}
+        pending = OrderedDict()
+        for i, text in enumerate(texts):
+            key = text_key(text or "")
+            result = self._lookup(key)
+            if result is not None:
+                found[i] = result
+                self.stats['memo_hits'] += 1
+            else:
+                pending.setdefault(key, (text or "", []))[1].append(i)
+        return found, pending
+
+    def _merge(self, texts: list, found: dict, pending: OrderedDict, scores: list) -> list:
+        for (key, (_, indexes)), result in zip(pending.items(), scores):
+            self._remember(key, result)
+            for i in indexes:
+                found[i] = result
+        self.stats['scored'] += len(scores)
+        return [found[i] for i in range(len(texts))]
+
+    def score(self, text: str) -> tuple:
+        """(polarity, subjectivity) for one text."""
+        return self.score_many([text])[0]
+
+    def score_many(self, texts: list) -> list:
+        """Score a batch in this process, reusing memoized results."""
+        found, pending = self._split(texts)
+        scores = score_batch([text for text, _ in pending.values()]) if pending else []
+        return self._merge(texts, found, pending, scores)
+
+    async def score_many_async(self, texts: list) -> list:
+        """Score a batch off the event loop (thread or process pool)."""
+        found, pending = self._split(texts)
+        unique = [text for text, _ in pending.values()]
+        scores = []
+        if unique:
+            loop = asyncio.get_running_loop()
+            if self.workers:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(self.workers)
+                chunks = [unique[i:i + self.batch_size] for i in range(0, len(unique), self.batch_size)]
+                for chunk_scores in await asyncio.gather(*(loop.run_in_executor(self._pool, score_batch, c) for c in chunks)):
+                    scores.extend(chunk_scores)
+            else:
+                scores = await asyncio.to_thread(score_batch, unique)
+        return self._merge(texts, found, pending, scores)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
@@ -0,0 +1,287 @@
+"""
+Sharded analysis across worker processes.
+
+The hashtag list is split round-robin over `workers` processes. Each one
+launches its own Chromium and context (with the parent's login session,
+passed in memory rather than through a file) and
+runs the normal analysis pipeline on its shard. Navigation pacing and the
+request budget stay global: the parent creates a SharedRateBudget whose
+counters live in shared memory, and every worker reserves its navigation
+slots and budget from it. Rows are not written by the workers; they are sent
+back to the parent and go through its single Supabase writer, so the whole
+run lands under the parent's VERSION_ID in SUPABASE_CHUNK_SIZE chunks (one
+insert only with SUPABASE_CHUNK_SIZE=0). Workers share the parent's post
+cache file; PostCache opens it in WAL mode with a busy timeout.
+"""
+import asyncio
+import multiprocessing
+import os
+import queue
+import time
+from collections import Counter
+
+from pacing import PacingScheduler
+
+class SharedRateBudget:
+    """Navigation slots and request budget shared by every worker process.
+
+    The requests-per-minute ceiling is enforced as an even spacing of
+    60 / requests_per_minute seconds between navigations run-wide.
+    """
+
+    def __init__(self, mp_context, min_interval: float, requests_per_minute: int, budget: int):
+        self.interval = max(min_interval, 60 / requests_per_minute if requests_per_minute else 0)
+        self.limit = budget
+        self._lock = mp_context.Lock()
+        self._next_slot = mp_context.Value('d', 0.0, lock=False)
+        self._navigations = mp_context.Value('i', 0, lock=False)
+        self._used = mp_context.Value('i', 0, lock=False)
+
+    def reserve(self) -> float:
+        """Claim the next navigation slot; returns how long to wait for it."""
+        with self._lock:
+            now = time.time()
+            slot = max(now, self._next_slot.value)
+            self._next_slot.value = slot + self.interval
+            self._navigations.value += 1
+            return slot - now
+
+    def take(self) -> bool:
+        """Reserve one unit of the run-wide request budget."""
+        with self._lock:
+            if self.limit and self._used.value >= self.limit:
+                return False
+            self._used.value += 1
+            return True
+
+    @property
+    def used(self) -> int:
+        return self._used.value
+
+    @property
+    def navigations(self) -> int:
+        return self._navigations.value
+
+class SharedPacingScheduler(PacingScheduler):
+    """A worker's pacer: slots come from the parent's SharedRateBudget."""
+
+    def __init__(self, shared: SharedRateBudget, on_navigate=None):
+        super().__init__(min_interval=shared.interval, requests_per_minute=0, jitter=0, on_navigate=on_navigate)
+        self.shared = shared
+
+    async def acquire(self):
+        delay = self.shared.reserve()
+        if delay:
+            await asyncio.sleep(delay)
+            self.idle_seconds += delay
+        self.navigations += 1
+
+class SharedRequestBudget:
+    """RequestBudget interface over the shared counter."""
+
+    def __init__(self, shared: SharedRateBudget):
+        self.shared = shared
+        self.limit = shared.limit
+
+    @property
+    def used(self) -> int:
+        return self.shared.used
+
+    @property
+    def exhausted(self) -> bool:
+        return bool(self.limit) and self.used >= self.limit
+
+    def take(self) -> bool:
+        return self.shared.take()
+
+class _ResultWriter:
+    """Stands in for SupabaseWriter in a worker; rows go back to the parent."""
+
+    def __init__(self, shard_id: int, results):
+        self.shard_id = shard_id
+        self.results = results
+        self.rows = 0
+
+    def add(self, row: dict):
+        self.rows += 1
+        self.results.put(('row', self.shard_id, row))
+
+class _ResultCheckpoint:
+    """Stands in for the run's RunCheckpoint in a worker.
+
+    The parent owns the checkpoint file: harvested links and per-post records
+    are sent back to it, and what an interrupted run already had for this
+    shard's hashtags comes in as `resume` (hashtag -> harvested, records).
+    """
+
+    def __init__(self, shard_id: int, results, resume: dict):
+        self.shard_id = shard_id
+        self.results = results
+        self.resume = resume
+
+    def done(self, hashtag: str) -> bool:
+        # The parent only hands out hashtags without a row
+        return False
+
+    def remaining_hashtags(self) -> list:
+        return []
+
+    def add_hashtag(self, hashtag: str):
+        pass
+
+    def harvested(self, hashtag: str):
+        return self.resume.get(hashtag, {}).get('harvested')
+
+    def set_harvested(self, hashtag: str, posts: list):
+        self.results.put(('harvested', self.shard_id, (hashtag, posts)))
+
+    def records(self, hashtag: str) -> dict:
+        return self.resume.get(hashtag, {}).get('records', {})
+
+    def add_record(self, hashtag: str, idx: int, record: dict):
+        self.results.put(('record', self.shard_id, (hashtag, idx, record)))
+
+    def add_row(self, hashtag: str, row: dict):
+        # Checkpointed by the parent when the row arrives
+        pass
+
+    def finish(self):
+        pass
+
+# -------------------------
+# WORKER PROCESS
+# -------------------------
+
+async def _run_shard(shard_id: int, hashtags: list, shared: SharedRateBudget, results, session_state=None,
+                     resume: dict = None):
+    import main
+    from playwright.async_api import async_playwright
+
+    main.PACER = SharedPacingScheduler(shared, on_navigate=main.on_navigate)
+    # Observations only; the parent merges them into the persisted index
+    main.COOCCURRENCE = main.CooccurrenceIndex()
+    cache = main.PostCache(
+        os.path.join(main.STATE_DIR, 'post_cache.sqlite3'),
+        ttl_hours=main.POST_CACHE_TTL_HOURS,
+        max_entries=main.POST_CACHE_MAX_ENTRIES
+    )
+    session_state = session_state or main.load_session_state(main.SESSION_STATE_FILE)
+    writer = _ResultWriter(shard_id, results)
+    try:
+        async with async_playwright() as p:
+            browser, context, _ = await main.open_browser(p, session_state)
+            try:
+                await main.HTTP.load_cookies(context)
+                await main.run_pipeline(context, writer, cache, hashtags=hashtags,
+                                        budget=SharedRequestBudget(shared),
+                                        checkpoint=_ResultCheckpoint(shard_id, results, resume or {}))
+            finally:
+                main.RECYCLER.print_summary()
+                await browser.close()
+    finally:
+        # The parent owns the co-occurrence index; this worker's observations go back to it
+        results.put(('cooccurrence', shard_id, main.COOCCURRENCE.observed))
+        cache.close()
+        main.HTTP.close()
+        main.SENTIMENT.close()
+    return main.RUN_STATS
+
+def shard_worker(shard_id: int, hashtags: list, version_id: str, shared: SharedRateBudget, results,
+                 session_state=None, resume: dict = None):
+    """Process entry point: analyze one shard and report back to the parent."""
+    import main
+    main.VERSION_ID = main.PROFILER.version_id = version_id
+    stats = Counter()
+    try:
+        stats = asyncio.run(_run_shard(shard_id, hashtags, shared, results, session_state, resume))
+    except Exception as e:
+        print(f"❌ Shard {shard_id} failed: {e}")
+    finally:
+        results.put(('done', shard_id, dict(stats)))
+
+# -------------------------
+# PARENT
+# -------------------------
+
+async def run_sharded(hashtags: list, writer, workers: int, version_id: str,
+                      min_interval: float, requests_per_minute: int, budget: int, cooccurrence=None,
+                      session_state: dict = None, checkpoint=None) -> dict:
+    """Analyze `hashtags` on `workers` processes; rows are added to `writer`.
+
+    Hashtag co-occurrences the workers observed are added to `cooccurrence`.
+    `session_state` (a Playwright storage state) logs the workers in. With a
+    `checkpoint`, workers start from what it already holds for their
+    hashtags, and the links, records and rows they send back are recorded
+    in it as they arrive.
+
+    Returns the workers' merged run counters plus rows received per shard.
+    """
+    workers = max(1, min(workers, len(hashtags)))
+    mp_context = multiprocessing.get_context('spawn')
+    shared = SharedRateBudget(mp_context, min_interval, requests_per_minute, budget)
+    results = mp_context.Queue()
+    shards = [hashtags[i::workers] for i in range(workers)]
+    resume = [
+        {tag: {'harvested': checkpoint.harvested(tag), 'records': checkpoint.records(tag)} for tag in shard}
+        if checkpoint else {}
+        for shard in shards
+    ]
+
+    print(f"\n{'='*70}")
+    print(f"🧩 SHARDED ANALYSIS: {len(hashtags)} hashtags over {workers} process(es)")
+    print(f"📋 Version ID: {version_id}")
+    print(f"{'='*70}\n")
+
+    started = time.monotonic()
+    processes = [
+        mp_context.Process(target=shard_worker, args=(i, shard, version_id, shared, results, session_state, resume[i]), name=f"shard-{i}")
+        for i, shard in enumerate(shards)
+    ]
+    for process in processes:
+        process.start()
+
+    merged = Counter()
+    rows_per_shard = Counter()
+    remaining = set(range(workers))
+    while remaining:
+        try:
+            kind, shard_id, payload = await asyncio.to_thread(results.get, True, 1.0)
+        except queue.Empty:
+            # Nothing arrived for a second, so a dead worker has nothing left to send
+            for shard_id in list(remaining):
+                if not processes[shard_id].is_alive():
+                    print(f"❌ Shard {shard_id} exited without reporting (exit code {processes[shard_id].exitcode})")
+                    remaining.discard(shard_id)
+            continue
+        if kind == 'row':
+            if checkpoint:
+                checkpoint.add_row(payload['topic_hashtag'].lstrip('#'), payload)
+            writer.add(payload)
+            rows_per_shard[shard_id] += 1
+        elif kind == 'harvested':
+            if checkpoint:
+                checkpoint.set_harvested(*payload)
+        elif kind == 'record':
+            if checkpoint:
+                checkpoint.add_record(*payload)
+        elif kind == 'cooccurrence':
+            if cooccurrence is not None:
+                for tags in payload:
+                    cooccurrence.add(tags)
+        elif kind == 'done':
+            merged.update(payload)
+            remaining.discard(shard_id)
+
+    for process in processes:
+        process.join()
+
+    elapsed = time.monotonic() - started
+    print(f"\n🧩 Shards done in {elapsed:.1f}s: {sum(rows_per_shard.values())}/{len(hashtags)} row(s), "
+          f"{shared.navigations} navigation(s), budget {shared.used}" + (f"/{budget}" if budget else ""))
+    for i, shard in enumerate(shards):
+        print(f"    shard {i}: {rows_per_shard[i]}/{len(shard)} row(s)")
+    merged['shard_seconds'] = elapsed
+    merged['shard_navigations'] = shared.navigations
+    for i in range(workers):
+        merged[f'shard_{i}_rows'] = rows_per_shard[i]
+    return dict(merged)
@@ -0,0 +1,260 @@
+"""
+Background writer for analysis rows.
+
+Rows are buffered and bulk-inserted through Supabase's PostgREST endpoint
+(POST /rest/v1/<table> with a JSON array) on a separate thread, so the
+browser never waits on network I/O. Failed requests are retried with
+exponential backoff; rows that still cannot be written are appended to a
+local spool file which the next run replays before writing anything new.
+Rows Supabase rejects outright (a 4xx outside RETRY_STATUSES) would fail the
+same way on every replay, so they go to `<spool>.rejected` instead and are
+never sent again.
+Anything else going wrong on the thread (the spool or the on_saved callback
+failing) does not stop it; the first such error is raised by close().
+"""
+import json
+import os
+import queue
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter
+from contextlib import nullcontext
+
+# HTTP statuses worth retrying; anything else in 4xx means the payload is bad
+# (409, a unique-key conflict, would fail the same way every time)
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+_STOP = object()
+_REPLAY_DONE = object()
+
+class SupabaseWriter:
+    """Buffers rows and inserts them in chunks from a background thread.
+
+    chunk_size=0 keeps every row until close() and sends them in one request.
+    """
+
+    def __init__(self, url: str, key: str, table: str = 'instagram', chunk_size: int = 5,
+                 max_retries: int = 4, backoff: float = 1.0, spool_path: str = 'supabase_spool.jsonl',
+                 timeout: float = 30, verbose: bool = True, profiler=None, on_saved=None):
+        self.endpoint = f"{url.rstrip('/')}/rest/v1/{table}"
+        self.headers = {
+            'apikey': key,
+            'Authorization': f'Bearer {key}',
+            'Content-Type': 'application/json',
+            'Prefer': 'return=minimal',
+        }
+        self.chunk_size = chunk_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.spool_path = spool_path
+        self.timeout = timeout
+        self.verbose = verbose
+        self.profiler = profiler
+        # Called from the writer thread with each chunk once it is written or spooled
+        self.on_saved = on_saved
+        self.stats = Counter()
+        # First error the writer thread hit outside the send itself; close() raises it
+        self.error = None
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='supabase-writer', daemon=True)
+
+    # -------------------------
+    # PUBLIC API
+    # -------------------------
+
+    def start(self):
+        """Queue any rows spooled by a previous run, then start the writer thread."""
+        for row in self._take_spool():
+            self.stats['replayed'] += 1
+            self._queue.put(row)
+        if self.stats['replayed']:
+            if self.verbose:
+                print(f"📼 Replaying {self.stats['replayed']} spooled row(s) from {self.spool_path}")
+            self._queue.put(_REPLAY_DONE)
+        self._thread.start()
+        return self
+
+    def add(self, row: dict):
+        """Hand a row to the writer. Never blocks on the network."""
+        self.stats['queued'] += 1
+        self._queue.put(row)
+
+    def close(self, timeout: float = None):
+        """Flush everything still buffered and stop the thread.
+
+        Raises the first error the thread hit, once everything else is flushed.
+        """
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+        if self.error is not None:
+            raise self.error
+
+    def saved_hashtags(self, version_id: str) -> set:
+        """topic_hashtag of every row already in the table for `version_id` (one GET, no retries)."""
+        query = urllib.parse.urlencode({'select': 'topic_hashtag', 'version_id': f'eq.{version_id}'})
+        request = urllib.request.Request(f"{self.endpoint}?{query}", headers=self.headers, method='GET')
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return {row['topic_hashtag'] for row in json.loads(response.read())}
+
+    def print_summary(self):
+        print(f"💾 Supabase: {self.stats['written']} row(s) written in {self.stats['requests']} request(s), "
+              f"{self.stats['retries']} retr{'y' if self.stats['retries'] == 1 else 'ies'}, "
+              f"{self.stats['spooled']} spooled for next run"
+              + (f", {self.stats['replayed']} replayed" if self.stats['replayed'] else "")
+              + (f", {self.stats['rejected']} rejected (see {self.rejected_path})" if self.stats['rejected'] else ""))
+
+    # -------------------------
+    # WRITER THREAD
+    # -------------------------
+
+    def _run(self):
+        buffer = []
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            if item is _REPLAY_DONE:
+                # Replayed rows are now written or back in the spool (if that failed,
+                # the replay file keeps them)
+                if self._guarded(self._flush, buffer):
+                    self._guarded(os.remove, self._replay_path)
+                buffer = []
+                continue
+            buffer.append(item)
+            if self.chunk_size and len(buffer) >= self.chunk_size:
+                self._guarded(self._flush, buffer)
+                buffer = []
+        if buffer:
+            self._guarded(self._flush, buffer)
+
+    def _guarded(self, action, *args) -> bool:
+        """Run `action`, keeping an error for close() instead of letting it end the thread."""
+        try:
+            action(*args)
+            return True
+        except Exception as e:
+            self.stats['errors'] += 1
+            if self.error is None:
+                self.error = e
+            if self.verbose:
+                print(f"    ❌ Supabase writer error: {str(e)[:80]}")
+            return False
+
+    def _flush(self, rows: list):
+        if not rows:
+            return
+        try:
+            with self.profiler.span('supabase.flush') if self.profiler else nullcontext():
+                self._send_with_retry(rows)
+            self.stats['written'] += len(rows)
+            if self.verbose:
+                print(f"    ✅ Saved {len(rows)} row(s) to Supabase")
+        except urllib.error.HTTPError as e:
+            if e.code in RETRY_STATUSES:
+                if self.verbose:
+                    print(f"    ❌ Save failed, spooling {len(rows)} row(s): {str(e)[:80]}")
+                self._spool(rows)
+            else:
+                if self.verbose:
+                    print(f"    ❌ Supabase rejected {len(rows)} row(s), moving them to {self.rejected_path}: {str(e)[:80]}")
+                self._reject(rows)
+        except Exception as e:
+            if self.verbose:
+                print(f"    ❌ Save failed, spooling {len(rows)} row(s): {str(e)[:80]}")
+            self._spool(rows)
+        if self.on_saved:
+            self.on_saved(rows)
+
+    def _send_with_retry(self, rows: list):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self._send(rows)
+            except urllib.error.HTTPError as e:
+                if e.code not in RETRY_STATUSES or attempt == self.max_retries:
+                    raise
+            except (urllib.error.URLError, TimeoutError, ConnectionError):
+                if attempt == self.max_retries:
+                    raise
+            self.stats['retries'] += 1
+            time.sleep(self.backoff * (2 ** attempt) * random.uniform(0.8, 1.2))
+
+    def _send(self, rows: list):
+        self.stats['requests'] += 1
+        request = urllib.request.Request(
+            self.endpoint,
+            data=json.dumps(rows, default=str).encode('utf-8'),
+            headers=self.headers,
+            method='POST',
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return response.status
+
+    # -------------------------
+    # SPOOL
+    # -------------------------
+
+    def _spool(self, rows: list):
+        _append_jsonl(self.spool_path, rows)
+        self.stats['spooled'] += len(rows)
+
+    def _reject(self, rows: list):
+        """Dead-letter rows Supabase refused; they are kept for inspection, not replayed."""
+        _append_jsonl(self.rejected_path, rows)
+        self.stats['rejected'] += len(rows)
+
+    @property
+    def rejected_path(self) -> str:
+        return self.spool_path + '.rejected'
+
+    @property
+    def _replay_path(self) -> str:
+        return self.spool_path + '.replay'
+
+    def _take_spool(self) -> list:
+        """Load rows left by earlier runs and move them aside for replay.
+
+        Rows are merged into `<spool>.replay`, which is only deleted once the
+        writer thread has flushed them, so a run killed mid-replay loses
+        nothing. Failures during this run go to a fresh spool file.
+        """
+        rows = _read_jsonl(self._replay_path) + _read_jsonl(self.spool_path)
+        if not rows:
+            return []
+        if os.path.exists(self.spool_path):
+            tmp_path = self._replay_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for row in rows:
+                    f.write(json.dumps(row, default=str) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self._replay_path)
+            os.remove(self.spool_path)
+        return rows
+
+def _append_jsonl(path: str, rows: list):
+    with open(path, 'a', encoding='utf-8') as f:
+        for row in rows:
+            f.write(json.dumps(row, default=str) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+def _read_jsonl(path: str) -> list:
+    if not os.path.exists(path):
+        return []
+    rows = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rows.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A run killed mid-write can leave a torn last line
+                continue
+    return rows
@@ -0,0 +1,213 @@
+"""
+Hashtag trends carried over between runs.
+
+Each run only sees a sample of the feed, so ranking by one run's raw counts
+makes the top list jump around. The store keeps, per hashtag, a count that
+halves every `half_life_hours`, the time it was last seen and its velocity:
+the change in that decayed count per hour between its two latest
+observations (0 for a steady tag, negative for one cooling off). A run
+merges its counts in and hashtags are ranked by
+
+    trend = decayed score + growth_weight * velocity * half_life_hours
+
+so a tag that keeps showing up ranks on its history, and one that is
+rising can still overtake it.
+
+Decay is applied lazily: an entry stores its score as of last_seen, so a
+merge only touches the hashtags the run saw. The file is a compact JSON map
+of tag -> [score, last_seen, velocity], written atomically. On save, tags
+whose decayed score fell below `min_score` are evicted and only the hottest
+`max_tags` are kept.
+"""
+import heapq
+import json
+import os
+import time
+from collections import Counter
+from operator import itemgetter
+
+class TrendStore:
+    """Time-decayed hashtag counts with velocity, persisted between runs."""
+
+    def __init__(self, path: str, half_life_hours: float = 24, max_tags: int = 200000,
+                 growth_weight: float = 0.1, min_score: float = 0.05):
+        self.path = path
+        self.half_life = half_life_hours * 3600
+        self.max_tags = max_tags
+        self.growth_weight = growth_weight
+        self.min_score = min_score
+        self.stats = Counter()
+        # Loaded on first use; sharded workers import this module without needing it
+        self._tags = None
+        self._merged_at = None
+        self._runs = []
+        self._dirty = False
+
+    @property
+    def tags(self) -> dict:
+        if self._tags is None:
+            self._load()
+        return self._tags
+
+    def _load(self):
+        started = time.monotonic()
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        self._tags = state.get('tags', {})
+        self._merged_at = state.get('merged_at')
+        self._runs = state.get('runs', [])
+        self.stats['loaded'] = len(self._tags)
+        self.stats['load_ms'] = round((time.monotonic() - started) * 1000)
+
+    def _decay(self, seconds: float) -> float:
+        return 0.5 ** (max(0.0, seconds) / self.half_life) if self.half_life else 1.0
+
+    def _current(self, entry: list, now: float, count: float = 0):
+        """(score, velocity) of a stored entry at `now`, with `count` new observations."""
+        score, last_seen, velocity = entry
+        decayed = score * self._decay(now - last_seen) + count
+        if count or now - last_seen > 1:
+            velocity = (decayed - score) / max(1.0, (now - last_seen) / 3600)
+        return decayed, velocity
+
+    def _new(self, count: float, now: float):
+        """(score, velocity) of a tag seen for the first time: it rose from nothing since the last run."""
+        hours = (now - self._merged_at) / 3600 if self._merged_at else 1.0
+        return count, count / max(1.0, hours)
+
+    def _now(self, now: float, pending) -> float:
+        # Without pending counts the ranking is the one as of the latest merge
+        return now or (None if pending else self._merged_at) or time.time()
+
+    def trend(self, score: float, velocity: float) -> float:
+        return score + self.growth_weight * velocity * self.half_life / 3600
+
+    # -------------------------
+    # MERGING
+    # -------------------------
+
+    def merge(self, counts: Counter, run_id: str = None, now: float = None) -> int:
+        """Fold one run's hashtag counts into the store; returns how many tags were new.
+
+        A run_id that was already merged (a resumed run) is ignored.
+        """
+        tags = self.tags
+        if run_id and run_id in self._runs:
+            return 0
+        started = time.monotonic()
+        # Whole seconds, as stored, so a ranking as of this merge sees no decay
+        now = round(now or time.time())
+        new = 0
+        for tag, count in counts.items():
+            entry = tags.get(tag)
+            if entry is None:
+                score, velocity = self._new(count, now)
+                new += 1
+            else:
+                score, velocity = self._current(entry, now, count)
+            # Rounded here, so saving can dump the entries as they are
+            tags[tag] = [round(score, 4), now, round(velocity, 4)]
+        self._merged_at = now
+        if run_id:
+            self._runs = (self._runs + [run_id])[-50:]
+        self._dirty = True
+        self.stats['merged'] += len(counts)
+        self.stats['new'] += new
+        self.stats['merge_ms'] += round((time.monotonic() - started) * 1000)
+        return new
+
+    # -------------------------
+    # RANKING
+    # -------------------------
+
+    def rank(self, limit: int, exclude=(), min_score: float = 0, pending: Counter = None,
+             boost: Counter = None, now: float = None) -> list:
+        """The top `limit` hashtags by trend.
+
+        `pending` holds counts not merged yet (the run in progress); they are
+        ranked as if they were, without touching the store. `boost` is added
+        to this ranking only: guesses rather than sightings (related hashtags),
+        which must never be merged, or they would feed back into later runs.
+        """
+        tags = self.tags
+        now = self._now(now, pending)
+        pending = pending or {}
+        boost = boost or {}
+
+        def trends():
+            # Inlined _current(): this runs over every tracked tag
+            half_life, weight = self.half_life or float('inf'), self.growth_weight * self.half_life / 3600
+            for tag, (score, last_seen, velocity) in tags.items():
+                count = pending.get(tag, 0)
+                extra = boost.get(tag, 0)
+                age = now - last_seen
+                decayed = score * 0.5 ** (max(0.0, age) / half_life) + count
+                if decayed + extra < min_score or tag in exclude:
+                    continue
+                if count or age > 1:
+                    velocity = (decayed - score) / max(1.0, age / 3600)
+                yield decayed + extra + weight * velocity, tag
+            for tag, count in pending.items():
+                extra = boost.get(tag, 0)
+                if tag not in tags and count + extra >= min_score and tag not in exclude:
+                    yield self.trend(*self._new(count, now)) + extra, tag
+            # Boosted tags never seen at all rank on the boost alone, with no growth
+            for tag, extra in boost.items():
+                if tag not in tags and tag not in pending and extra >= min_score and tag not in exclude:
+                    yield extra, tag
+
+        # Ties keep the store's order, so equal trends rank the same way every time
+        return [tag for _, tag in heapq.nlargest(limit, trends(), key=itemgetter(0))]
+
+    def describe(self, tag: str, pending: Counter = None, now: float = None) -> dict:
+        """{'score', 'velocity', 'trend'} of one hashtag at `now` (default: as ranked)."""
+        entry = self.tags.get(tag)
+        now = self._now(now, pending)
+        count = (pending or {}).get(tag, 0)
+        score, velocity = self._current(entry, now, count) if entry else self._new(count, now)
+        return {'score': score, 'velocity': velocity, 'trend': self.trend(score, velocity)}
+
+    # -------------------------
+    # PERSISTENCE
+    # -------------------------
+
+    def _evict(self, now: float):
+        tags = self._tags
+        half_life = self.half_life or float('inf')
+        decayed = {tag: score * 0.5 ** (max(0.0, now - seen) / half_life) for tag, (score, seen, _) in tags.items()}
+        cold = [tag for tag, score in decayed.items() if score < self.min_score]
+        for tag in cold:
+            del tags[tag]
+        self.stats['evicted_cold'] += len(cold)
+        if self.max_tags and len(tags) > self.max_tags:
+            overflow = heapq.nsmallest(len(tags) - self.max_tags, tags, key=decayed.__getitem__)
+            for tag in overflow:
+                del tags[tag]
+            self.stats['evicted_overflow'] += len(overflow)
+
+    def save(self, now: float = None):
+        """Evict cold tags and write the store atomically (only if something was merged)."""
+        if not self._dirty:
+            return
+        started = time.monotonic()
+        self._evict(now or time.time())
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tags = self._tags
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            # dumps() takes the C encoder; dump() to a file would encode in Python
+            f.write(json.dumps({'merged_at': self._merged_at, 'runs': self._runs, 'tags': tags}, separators=(',', ':')))
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+        self.stats['saved'] = len(tags)
+        self.stats['save_ms'] = round((time.monotonic() - started) * 1000)
+
+    def print_summary(self):
+        print(f"📈 Trends: {len(self.tags)} hashtag(s) tracked, {self.stats['merged']} merged "
+              f"({self.stats['new']} new), {self.stats['evicted_cold'] + self.stats['evicted_overflow']} evicted, "
+              f"loaded in {self.stats['load_ms']} ms")